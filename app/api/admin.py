@@ -0,0 +1,88 @@
+from typing import Any, Dict, List
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from app.models.user import User
+from app.dependencies.auth import admin_required
+from app.services.profiler import (
+    PROFILER_MAX_SECONDS,
+    PROFILING_ENABLED,
+    SamplingProfiler,
+    get_request_profile,
+    profile_worker,
+)
+from app.services.request_timing import TimedRoute
+from app.services.slow_queries import SLOW_QUERY_LOG_SIZE, get_slow_queries
+
+router = APIRouter(route_class=TimedRoute)
+
+PROFILE_FORMATS = "^(collapsed|speedscope)$"
+
+
+def _check_profiling_enabled():
+    if not PROFILING_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profiling is disabled",
+        )
+
+
+def _profile_response(profiler: SamplingProfiler, profile_format: str, name: str):
+    headers = {
+        "X-Profile-Samples": str(sum(profiler.stacks.values())),
+        "X-Profile-Seconds": f"{profiler.seconds:.3f}",
+    }
+    if profile_format == "speedscope":
+        return JSONResponse(
+            content=profiler.speedscope(name),
+            headers={
+                **headers,
+                "Content-Disposition": f'attachment; filename="{name}.speedscope.json"',
+            },
+        )
+    return PlainTextResponse(content=profiler.collapsed(), headers=headers)
+
+
+@router.post("/admin/profile")
+async def profile_worker_endpoint(
+    seconds: float = Query(10, gt=0, le=PROFILER_MAX_SECONDS),
+    format: str = Query("collapsed", pattern=PROFILE_FORMATS),
+    admin: User = Depends(admin_required),
+):
+    """Sample the stacks of this worker for some seconds (admin only).
+
+    Only the worker that serves this request is profiled.
+    """
+    _check_profiling_enabled()
+    profiler = await profile_worker(seconds)
+    return _profile_response(profiler, format, "worker")
+
+
+@router.get("/admin/profiles/{profile_id}")
+async def get_request_profile_endpoint(
+    profile_id: str,
+    format: str = Query("collapsed", pattern=PROFILE_FORMATS),
+    admin: User = Depends(admin_required),
+):
+    """Get the profile of a request sent with the X-Profile header (admin only)."""
+    _check_profiling_enabled()
+    profiler = get_request_profile(profile_id)
+    if not profiler:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found",
+        )
+    return _profile_response(profiler, format, f"request-{profile_id}")
+
+
+@router.get("/admin/slow-queries", response_model=List[Dict[str, Any]])
+async def get_slow_queries_endpoint(
+    limit: int = Query(50, ge=1, le=SLOW_QUERY_LOG_SIZE),
+    admin: User = Depends(admin_required),
+):
+    """Get the slowest recent statements of this worker, newest first (admin only).
+
+    Entries include the EXPLAIN (ANALYZE, BUFFERS) plan when one was sampled.
+    """
+    return get_slow_queries(limit)
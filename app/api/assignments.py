@@ -7,34 +7,72 @@ from fastapi import (
     UploadFile,
     File,
     Response,
+    Header,
+    Request,
+    BackgroundTasks,
 )
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import and_
-from typing import List, Optional
+import logging
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 from uuid import UUID
 
 from app.database.postgres import get_db
 from app.models.assignment import Assignment
 from app.models.user import User, UserRole
-from app.models.group import Group
 from app.schemas.assignment import (
     AssignmentCreate,
     AssignmentResponse,
     AssignmentUpdate,
     AssignmentWithDetailsResponse,
     FileResponse,
+    UploadSessionCreate,
+    UploadSessionResponse,
 )
+from app.services.directory import directory
 from app.dependencies.auth import (
     get_current_active_user_dependency,
     teacher_required,
     admin_required,
+    check_group_access,
+)
+from app.services.file_storage import (
+    upload_file,
+    get_file,
+    open_cached_file,
+    accepts_encoding,
+    decode_chunks,
+    get_content_encoding,
+    iter_file_content,
+    read_stored_content,
+)
+from app.services.file_cache import (
+    CachedFileResponse,
+    get_file_cache,
+    iter_cached_file,
+)
+from app.services.file_archive import iter_zip_archive
+from app.services.file_gc import schedule_file_deletion, sweep_orphaned_files
+from app.services.upload_sessions import (
+    create_upload_session,
+    get_upload_session,
+    expected_chunk_length,
+    read_limited,
+    write_upload_chunk,
+    finalize_upload_session,
+    abort_upload_session,
+    session_to_response,
 )
-from app.services.file_storage import upload_file, get_file, delete_file
 from app.services.notifications import notify_new_assignment, notify_file_upload
+from app.services.request_timing import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
+
+logger = logging.getLogger(__name__)
 
 
 @router.post(
@@ -44,10 +82,16 @@ router = APIRouter()
 )
 async def create_assignment(
     assignment: AssignmentCreate,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(teacher_required),
     db: AsyncSession = Depends(get_db),
 ):
-    """Create a new assignment (teacher or admin only)."""
+    """Create a new assignment (teacher or admin only).
+
+    Teachers can only assign work to groups they teach.
+    """
+    await check_group_access(assignment.group_id, current_user, db)
+
     # Убедимся, что deadline не содержит информацию о часовом поясе
     deadline = assignment.deadline
     if deadline and deadline.tzinfo:
@@ -67,11 +111,13 @@ async def create_assignment(
     await db.commit()
     await db.refresh(db_assignment)
 
-    # Notify students about the new assignment
-    await notify_new_assignment(
+    # Notify students about the new assignment after the response is sent
+    background_tasks.add_task(
+        notify_new_assignment,
         teacher=current_user,
         group_id=assignment.group_id,
         assignment_title=assignment.title,
+        assignment_id=db_assignment.id,
     )
 
     return db_assignment
@@ -83,16 +129,7 @@ async def get_assignments(
     db: AsyncSession = Depends(get_db),
 ):
     """Get assignments with optional filtering."""
-    # Включаем информацию о группе и преподавателе в запрос
-    query = (
-        select(
-            Assignment,
-            Group.name.label("group_name"),
-            User.full_name.label("teacher_name"),
-        )
-        .join(Group, Assignment.group_id == Group.id)
-        .join(User, Assignment.teacher_id == User.id)
-    )
+    query = select(Assignment)
 
     # Filter by group ID
     if group_id:
@@ -102,12 +139,19 @@ async def get_assignments(
     query = query.order_by(Assignment.created_at.desc())
 
     result = await db.execute(query)
-    rows = result.all()
+    rows = result.scalars().all()
+
+    # Names come from the in-memory directory instead of joins
+    group_names = await directory.group_names(
+        db, [assignment.group_id for assignment in rows]
+    )
+    teacher_names = await directory.user_names(
+        db, [assignment.teacher_id for assignment in rows]
+    )
 
     # Преобразуем результаты в объекты AssignmentWithDetailsResponse
     assignments = []
-    for row in rows:
-        assignment, group_name, teacher_name = row
+    for assignment in rows:
         assignments.append(
             AssignmentWithDetailsResponse(
                 id=assignment.id,
@@ -118,8 +162,8 @@ async def get_assignments(
                 file_ids=assignment.file_ids,
                 created_at=assignment.created_at,
                 deadline=assignment.deadline,
-                group_name=group_name,
-                teacher_name=teacher_name,
+                group_name=group_names[assignment.group_id],
+                teacher_name=teacher_names[assignment.teacher_id],
             )
         )
 
@@ -134,27 +178,22 @@ async def get_assignment(
     db: AsyncSession = Depends(get_db),
 ):
     """Get a specific assignment by ID with details."""
-    # Get assignment with group and teacher data
+    # Get assignment
     query = (
-        select(
-            Assignment,
-            Group.name.label("group_name"),
-            User.full_name.label("teacher_name"),
-        )
-        .join(Group, Assignment.group_id == Group.id)
-        .join(User, Assignment.teacher_id == User.id)
+        select(Assignment)
         .where(Assignment.id == assignment_id)
     )
 
     result = await db.execute(query)
-    row = result.first()
+    assignment = result.scalars().first()
 
-    if not row:
+    if not assignment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Assignment not found"
         )
 
-    assignment, group_name, teacher_name = row
+    group_names = await directory.group_names(db, [assignment.group_id])
+    teacher_names = await directory.user_names(db, [assignment.teacher_id])
 
     # Create response with details
     response = AssignmentWithDetailsResponse(
@@ -166,8 +205,8 @@ async def get_assignment(
         file_ids=assignment.file_ids,
         created_at=assignment.created_at,
         deadline=assignment.deadline,
-        group_name=group_name,
-        teacher_name=teacher_name,
+        group_name=group_names[assignment.group_id],
+        teacher_name=teacher_names[assignment.teacher_id],
     )
 
     return response
@@ -250,17 +289,15 @@ async def delete_assignment(
             detail="You can only delete your own assignments",
         )
 
-    # Delete associated files
-    for file_id in db_assignment.file_ids:
-        try:
-            delete_file(file_id)
-        except Exception as e:
-            print(f"Failed to delete file {file_id}: {str(e)}")
+    file_ids = list(db_assignment.file_ids or [])
 
     # Delete the assignment
     await db.delete(db_assignment)
     await db.commit()
 
+    # Delete associated files in the background once nothing references them
+    schedule_file_deletion(file_ids)
+
     return None
 
 
@@ -297,10 +334,11 @@ async def upload_assignment_file(
 
     # Update assignment with file ID
     db_assignment.file_ids = db_assignment.file_ids + [file_id]
-    await db.commit()
 
     # Notify about file upload
-    await notify_file_upload(UUID(assignment_id), file_id)
+    await notify_file_upload(db, UUID(assignment_id), file_id)
+
+    await db.commit()
 
     # Get file info
     file_info = get_file(file_id)
@@ -313,23 +351,238 @@ async def upload_assignment_file(
     )
 
 
+@router.post(
+    "/assignments/{assignment_id}/uploads",
+    response_model=UploadSessionResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+async def start_assignment_upload(
+    assignment_id: str,
+    upload: UploadSessionCreate,
+    current_user: User = Depends(teacher_required),
+    db: AsyncSession = Depends(get_db),
+):
+    """Start a resumable chunked upload to an assignment (teacher or admin only)."""
+    stmt = select(Assignment).where(Assignment.id == assignment_id)
+    result = await db.execute(stmt)
+    db_assignment = result.scalars().first()
+
+    if not db_assignment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Assignment not found"
+        )
+
+    # Check if the user is the teacher of this assignment or an admin
+    if (
+        current_user.role != UserRole.ADMIN
+        and db_assignment.teacher_id != current_user.id
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You can only upload files to your own assignments",
+        )
+
+    session = await create_upload_session(
+        assignment_id=str(db_assignment.id),
+        filename=upload.file_name,
+        content_type=upload.content_type,
+        total_size=upload.total_size,
+        user_id=str(current_user.id),
+    )
+    return session_to_response(session)
+
+
+@router.get("/uploads/{upload_id}", response_model=UploadSessionResponse)
+async def get_upload_status(
+    upload_id: str,
+    current_user: User = Depends(teacher_required),
+):
+    """Get the progress of a resumable upload."""
+    session = await get_upload_session(
+        upload_id, str(current_user.id), current_user.role == UserRole.ADMIN
+    )
+    return session_to_response(session)
+
+
+@router.put("/uploads/{upload_id}", response_model=UploadSessionResponse)
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    offset: int = Query(..., ge=0),
+    current_user: User = Depends(teacher_required),
+):
+    """Upload one chunk of a resumable upload at the given byte offset."""
+    session = await get_upload_session(
+        upload_id, str(current_user.id), current_user.role == UserRole.ADMIN
+    )
+    # Never buffer more than one chunk, whatever the client sends
+    expected = expected_chunk_length(session, offset)
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > expected:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Chunk must be at most {expected} bytes",
+        )
+    data = await read_limited(request.stream(), expected)
+    session = await write_upload_chunk(session, offset, data)
+    return session_to_response(session)
+
+
+@router.post("/uploads/{upload_id}/finalize", response_model=FileResponse)
+async def finalize_upload(
+    upload_id: str,
+    current_user: User = Depends(teacher_required),
+    db: AsyncSession = Depends(get_db),
+):
+    """Complete a resumable upload and attach the file to its assignment."""
+    session = await get_upload_session(
+        upload_id, str(current_user.id), current_user.role == UserRole.ADMIN
+    )
+
+    stmt = select(Assignment).where(Assignment.id == session["assignment_id"])
+    result = await db.execute(stmt)
+    db_assignment = result.scalars().first()
+
+    if not db_assignment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Assignment not found"
+        )
+
+    file_id = await finalize_upload_session(session)
+
+    # Update assignment with file ID
+    if file_id not in db_assignment.file_ids:
+        db_assignment.file_ids = db_assignment.file_ids + [file_id]
+
+        # Notify about file upload
+        await notify_file_upload(db, db_assignment.id, file_id)
+    await db.commit()
+
+    # Get file info
+    file_info = get_file(file_id)
+
+    return FileResponse(
+        id=file_id,
+        file_name=file_info["filename"],
+        content_type=file_info["content_type"],
+        upload_date=file_info["metadata"]["upload_date"],
+    )
+
+
+@router.delete("/uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def cancel_upload(
+    upload_id: str,
+    current_user: User = Depends(teacher_required),
+):
+    """Cancel a resumable upload and discard its chunks."""
+    session = await get_upload_session(
+        upload_id, str(current_user.id), current_user.role == UserRole.ADMIN
+    )
+    await abort_upload_session(session)
+    return None
+
+
+@router.get("/assignments/{assignment_id}/files.zip")
+async def download_assignment_files(
+    assignment_id: str,
+    current_user: User = Depends(get_current_active_user_dependency),
+    db: AsyncSession = Depends(get_db),
+):
+    """Download all files of an assignment as a streamed ZIP archive."""
+    stmt = select(Assignment).where(Assignment.id == assignment_id)
+    result = await db.execute(stmt)
+    db_assignment = result.scalars().first()
+
+    if not db_assignment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Assignment not found"
+        )
+
+    # Resolve file handles up front; chunks are only read while streaming
+    files = []
+    for file_id in db_assignment.file_ids or []:
+        try:
+            files.append(get_file(file_id))
+        except HTTPException as e:
+            logger.warning("Skipping file %s in archive: %s", file_id, e.detail)
+
+    return StreamingResponse(
+        iter_zip_archive(files),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f"attachment; filename=assignment_{assignment_id}.zip"
+        },
+    )
+
+
+def _download_headers(filename: str, content_encoding: Optional[str]):
+    """Build response headers for a file download."""
+    headers = {"Content-Disposition": f"attachment; filename={filename}"}
+    if content_encoding:
+        headers["Content-Encoding"] = content_encoding
+        headers["Vary"] = "Accept-Encoding"
+    return headers
+
+
 @router.get("/files/{file_id}")
 async def download_file(
     file_id: str,
+    accept_encoding: Optional[str] = Header(None),
     current_user: User = Depends(get_current_active_user_dependency),
 ):
-    """Download a file."""
-    # Get file
-    file_info = get_file(file_id)
+    """Download a file.
 
+    Compressed files are sent as stored to clients that accept the encoding
+    and decoded on the fly for everyone else.
+    """
     # TODO: Check if user has access to this file
     # In a real implementation, you would check if the user has access to the assignment
 
+    # Serve hot files from the local disk cache; a miss copies the file
+    # from GridFS, which must not block the event loop
+    cached, file_info = await run_in_threadpool(open_cached_file, file_id)
+    if cached:
+        encoding = cached.content_encoding
+        if encoding and not accepts_encoding(accept_encoding, encoding):
+            return StreamingResponse(
+                decode_chunks(iter_cached_file(cached), encoding),
+                media_type=cached.content_type,
+                headers=_download_headers(cached.filename, None),
+            )
+        return CachedFileResponse(
+            cached, headers=_download_headers(cached.filename, encoding)
+        )
+
+    # Get file, unless the cache already opened it
+    if file_info is None:
+        file_info = await run_in_threadpool(get_file, file_id)
+    encoding = get_content_encoding(file_info["metadata"])
+    if encoding and not accepts_encoding(accept_encoding, encoding):
+        return StreamingResponse(
+            iter_file_content(file_info),
+            media_type=file_info["content_type"],
+            headers=_download_headers(file_info["filename"], None),
+        )
+
     # Return file
     return Response(
-        content=file_info["file"].read(),
+        content=await run_in_threadpool(read_stored_content, file_info),
         media_type=file_info["content_type"],
-        headers={
-            "Content-Disposition": f"attachment; filename={file_info['filename']}"
-        },
+        headers=_download_headers(file_info["filename"], encoding),
     )
+
+
+@router.get("/files/cache/stats", response_model=Dict[str, Any])
+async def get_file_cache_stats(admin: User = Depends(admin_required)):
+    """Get download cache hit/miss statistics (admin only)."""
+    cache = get_file_cache()
+    if not cache:
+        return {"enabled": False}
+
+    return {"enabled": True, **cache.stats()}
+
+
+@router.post("/files/gc", response_model=Dict[str, Any])
+async def collect_orphaned_files(admin: User = Depends(admin_required)):
+    """Delete GridFS files no assignment references any more (admin only)."""
+    return await sweep_orphaned_files()
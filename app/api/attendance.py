@@ -2,8 +2,10 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import and_, func
+import logging
 from typing import List, Optional, Dict
 from datetime import date
+from uuid import UUID
 from pydantic import UUID4
 
 from app.database.postgres import get_db
@@ -18,13 +20,18 @@ from app.schemas.attendance import (
     BulkAttendanceCreate,
     StudentAttendanceStats,
 )
+from app.services.directory import directory
 from app.dependencies.auth import (
     get_current_active_user_dependency,
     teacher_required,
 )
 from app.services.notifications import notify_attendance_updated
+from app.services.query_counter import query_budget
+from app.services.request_timing import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
+
+logger = logging.getLogger(__name__)
 
 
 @router.post(
@@ -84,16 +91,18 @@ async def create_attendance(
     )
 
     db.add(db_attendance)
-    await db.commit()
-    await db.refresh(db_attendance)
 
     # Notify student about attendance update
     await notify_attendance_updated(
+        db,
         student_id=attendance.student_id,
         schedule_id=attendance.schedule_id,
         status=attendance.status,
     )
 
+    await db.commit()
+    await db.refresh(db_attendance)
+
     return db_attendance
 
 
@@ -102,6 +111,7 @@ async def create_attendance(
     response_model=Dict[str, str],
     status_code=status.HTTP_201_CREATED,
 )
+@query_budget(8)
 async def create_bulk_attendance(
     bulk_attendance: BulkAttendanceCreate,
     current_user: User = Depends(teacher_required),
@@ -130,40 +140,57 @@ async def create_bulk_attendance(
             detail="You can only mark attendance for your own schedules",
         )
 
+    try:
+        attendance_data = {
+            UUID(student_id): status
+            for student_id, status in bulk_attendance.attendance_data.items()
+        }
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Student ids must be UUIDs",
+        )
+
+    # Load the existing records of all students with one query
+    existing_stmt = select(Attendance).where(
+        and_(
+            Attendance.schedule_id == bulk_attendance.schedule_id,
+            Attendance.student_id.in_(attendance_data),
+        )
+    )
+    existing_result = await db.execute(existing_stmt)
+    existing_records = {
+        attendance.student_id: attendance
+        for attendance in existing_result.scalars().all()
+    }
+
     # Process each attendance record
     records_created = 0
     records_updated = 0
 
-    for student_id, status in bulk_attendance.attendance_data.items():
-        # Check if attendance record already exists
-        existing_stmt = select(Attendance).where(
-            and_(
-                Attendance.schedule_id == bulk_attendance.schedule_id,
-                Attendance.student_id == student_id,
-            )
-        )
-        existing_result = await db.execute(existing_stmt)
-        existing_attendance = existing_result.scalars().first()
+    for student_id, attendance_status in attendance_data.items():
+        existing_attendance = existing_records.get(student_id)
 
         if existing_attendance:
             # Update existing record
-            existing_attendance.status = status
+            existing_attendance.status = attendance_status
             records_updated += 1
         else:
             # Create new record
             db_attendance = Attendance(
                 schedule_id=bulk_attendance.schedule_id,
                 student_id=student_id,
-                status=status,
+                status=attendance_status,
             )
             db.add(db_attendance)
             records_created += 1
 
         # Notify student about attendance update
         await notify_attendance_updated(
+            db,
             student_id=student_id,
             schedule_id=bulk_attendance.schedule_id,
-            status=status,
+            status=attendance_status,
         )
 
     await db.commit()
@@ -174,6 +201,7 @@ async def create_bulk_attendance(
 
 
 @router.get("/attendance", response_model=List[AttendanceWithDetailsResponse])
+@query_budget(3)
 async def get_attendance(
     schedule_id: Optional[UUID4] = Query(None),
     student_id: Optional[UUID4] = Query(None),
@@ -182,19 +210,14 @@ async def get_attendance(
     db: AsyncSession = Depends(get_db),
 ):
     """Get attendance records with optional filtering."""
-    # Build query to join attendance with schedule and student data
-    query = (
-        select(
-            Attendance,
-            User.full_name.label("student_name"),
-            Schedule.subject,
-            Schedule.date,
-            Schedule.start_time,
-            Schedule.end_time,
-        )
-        .join(Schedule, Attendance.schedule_id == Schedule.id)
-        .join(User, Attendance.student_id == User.id)
-    )
+    # Build query to join attendance with schedule data
+    query = select(
+        Attendance,
+        Schedule.subject,
+        Schedule.date,
+        Schedule.start_time,
+        Schedule.end_time,
+    ).join(Schedule, Attendance.schedule_id == Schedule.id)
 
     # Apply filters
     if schedule_id:
@@ -214,16 +237,21 @@ async def get_attendance(
     result = await db.execute(query)
     rows = result.all()
 
+    # Student names come from the in-memory directory instead of a join
+    student_names = await directory.user_names(
+        db, [row[0].student_id for row in rows]
+    )
+
     # Construct response
     attendance_list = []
     for row in rows:
-        attendance, student_name, subject, date, start_time, end_time = row
+        attendance, subject, date, start_time, end_time = row
         attendance_detail = AttendanceWithDetailsResponse(
             id=attendance.id,
             schedule_id=attendance.schedule_id,
             student_id=attendance.student_id,
             status=attendance.status,
-            student_name=student_name,
+            student_name=student_names[attendance.student_id],
             subject=subject,
             date=date.strftime("%Y-%m-%d") if date else None,
             start_time=start_time.strftime("%H:%M") if start_time else None,
@@ -318,7 +346,7 @@ async def get_attendance_stats(
                 elif attendance.status == AttendanceStatus.EXCUSED:
                     excused_count += 1
             except Exception as e:
-                print(f"Error processing status: {str(e)}")
+                logger.warning("Error processing status: %s", e)
                 # Если возникла ошибка с enum, просто пропускаем эту запись
                 # и не учитываем её в статистике
                 total_classes -= 1
@@ -359,7 +387,7 @@ async def get_attendance_stats(
         )
     except Exception as e:
         # Логирование ошибки
-        print(f"Error in get_attendance_stats: {str(e)}")
+        logger.error("Error in get_attendance_stats: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error calculating attendance statistics: {str(e)}",
@@ -404,16 +432,17 @@ async def update_attendance(
     # Update attendance data
     db_attendance.status = attendance_update.status
 
-    await db.commit()
-    await db.refresh(db_attendance)
-
     # Notify student about attendance update
     await notify_attendance_updated(
+        db,
         student_id=db_attendance.student_id,
         schedule_id=db_attendance.schedule_id,
         status=db_attendance.status,
     )
 
+    await db.commit()
+    await db.refresh(db_attendance)
+
     return db_attendance
 
 
@@ -421,6 +450,7 @@ async def update_attendance(
     "/attendance/students_by_schedule/{schedule_id}",
     response_model=List[Dict],
 )
+@query_budget(5)
 async def get_students_by_schedule(
     schedule_id: str,
     current_user: User = Depends(teacher_required),
@@ -511,7 +541,7 @@ async def fix_attendance_enum(
                 "ALTER TYPE attendancestatus ADD VALUE IF NOT EXISTS 'LATE';"
             )
         except Exception as e:
-            print(f"Error adding enum value, might already exist: {str(e)}")
+            logger.warning("Error adding enum value, might already exist: %s", e)
 
         # Теперь, чтобы избежать ошибок с enum, заменим прямые запросы на подсчёт
         # Получить количество записей по разным статусам
@@ -541,7 +571,7 @@ async def fix_attendance_enum(
                 elif attendance.status == AttendanceStatus.EXCUSED:
                     excused_count += 1
             except Exception as e:
-                print(f"Error processing status: {str(e)}")
+                logger.warning("Error processing status: %s", e)
 
         return {
             "message": "Attendance enum fixed",
@@ -554,7 +584,7 @@ async def fix_attendance_enum(
             },
         }
     except Exception as e:
-        print(f"Error in fix_attendance_enum: {str(e)}")
+        logger.error("Error in fix_attendance_enum: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error fixing enum: {str(e)}",
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+import logging
 from typing import List
 
 from app.database.postgres import get_db
@@ -12,18 +13,24 @@ from app.schemas.user import (
     UserUpdate,
     UserLogin,
     Token,
+    UserImportReport,
 )
 from app.services.auth import (
     create_access_token,
     authenticate_user,
     get_password_hash,
 )
+from app.services.directory import directory
+from app.services.user_import import import_users, parse_import_file
 from app.dependencies.auth import (
     get_current_active_user_dependency,
     admin_required,
 )
+from app.services.request_timing import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
+
+logger = logging.getLogger(__name__)
 
 
 @router.post(
@@ -58,6 +65,7 @@ async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
     db.add(db_user)
     await db.commit()
     await db.refresh(db_user)
+    directory.set_user(db_user.id, db_user.full_name)
 
     return db_user
 
@@ -93,7 +101,7 @@ async def read_users_me(
         return current_user
     except Exception as e:
         # Логируем ошибку для отладки
-        print(f"Error in read_users_me: {str(e)}")
+        logger.error("Error in read_users_me: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to get user profile: {str(e)}",
@@ -113,6 +121,7 @@ async def update_user(
 
     await db.commit()
     await db.refresh(current_user)
+    directory.set_user(current_user.id, current_user.full_name)
 
     return current_user
 
@@ -129,6 +138,35 @@ async def get_users(
     return users
 
 
+@router.post("/auth/users/import", response_model=UserImportReport)
+async def import_users_file(
+    file: UploadFile = File(...),
+    admin: User = Depends(admin_required),
+    db: AsyncSession = Depends(get_db),
+):
+    """Register users in bulk from a CSV or JSON file (admin only).
+
+    CSV needs a header row with the UserCreate fields; JSON is a list of
+    objects with the same fields. Valid rows are imported, the others are
+    reported by row number.
+    """
+    rows = parse_import_file(await file.read(), file.filename or "")
+    report = await import_users(db, rows)
+    await db.commit()
+
+    for user_id, full_name in report.pop("users"):
+        directory.set_user(user_id, full_name)
+
+    logger.info(
+        "Imported %s of %s users in %.1fs (%.0f rows/s)",
+        report["created"],
+        report["total"],
+        report["seconds"],
+        report["rows_per_second"],
+    )
+    return report
+
+
 @router.get("/auth/users/{user_id}", response_model=UserResponse)
 async def get_user(
     user_id: str,
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import delete, exists, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from typing import List, Optional
@@ -14,13 +15,17 @@ from app.schemas.group import (
     GroupWithStudentsResponse,
 )
 from app.schemas.user import UserResponse
+from app.services.directory import directory
 from app.dependencies.auth import (
     get_current_active_user_dependency,
     admin_required,
+    check_group_access,
     teacher_required,
 )
+from app.services.query_counter import query_budget
+from app.services.request_timing import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.post(
@@ -49,12 +54,13 @@ async def create_group(
     db_group = Group(name=group.name)
     db.add(db_group)
     await db.commit()
-    await db.refresh(db_group)
+    directory.set_group(db_group.id, db_group.name)
 
     return db_group
 
 
 @router.get("/groups", response_model=List[GroupResponse])
+@query_budget(2)
 async def get_groups(
     current_user: User = Depends(get_current_active_user_dependency),
     db: AsyncSession = Depends(get_db),
@@ -121,7 +127,7 @@ async def update_group(
         setattr(group, key, value)
 
     await db.commit()
-    await db.refresh(group)
+    directory.set_group(group.id, group.name)
 
     return group
 
@@ -144,26 +150,33 @@ async def delete_group(
         )
 
     # Check if group has any users
-    if group.users:
+    has_users = await db.scalar(select(exists().where(User.group_id == group_id)))
+    if has_users:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Cannot delete group with users. Move users to another group first.",
         )
 
-    # Delete group
-    await db.delete(group)
+    # Delete group; a bulk delete does not load the group's relationships
+    await db.execute(delete(Group).where(Group.id == group_id))
     await db.commit()
+    directory.remove_group(group_id)
 
 
 @router.get(
     "/groups/{group_id}/students", response_model=GroupWithStudentsResponse
 )
+@query_budget(3)
 async def get_group_with_students_count(
     group_id: UUID,
     current_user: User = Depends(get_current_active_user_dependency),
     db: AsyncSession = Depends(get_db),
+    _: bool = Depends(check_group_access),
 ):
-    """Get group information with student count."""
+    """Get group information with student count.
+
+    Students see only their own group, teachers the groups they teach.
+    """
     stmt = select(Group).where(Group.id == group_id)
     result = await db.execute(stmt)
     group = result.scalars().first()
@@ -173,23 +186,33 @@ async def get_group_with_students_count(
             status_code=status.HTTP_404_NOT_FOUND, detail="Group not found"
         )
 
+    # Count in the database instead of loading every user of the group
+    student_count = await db.scalar(
+        select(func.count()).select_from(User).where(User.group_id == group_id)
+    )
+
     # Create response with student count
     return {
         "id": group.id,
         "name": group.name,
-        "student_count": len(group.users),
+        "student_count": student_count,
     }
 
 
 @router.get(
     "/groups/{group_id}/students/list", response_model=List[UserResponse]
 )
+@query_budget(3)
 async def get_group_students(
     group_id: UUID,
     current_user: User = Depends(get_current_active_user_dependency),
     db: AsyncSession = Depends(get_db),
+    _: bool = Depends(check_group_access),
 ):
-    """Get list of students in a group."""
+    """Get list of students in a group.
+
+    Students see only their own group, teachers the groups they teach.
+    """
     # Проверяем существование группы
     group_stmt = select(Group).where(Group.id == group_id)
     group_result = await db.execute(group_stmt)
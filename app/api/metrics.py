@@ -0,0 +1,15 @@
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import Response
+
+from app.services.metrics import CONTENT_TYPE, METRICS_ENABLED, render_metrics
+from app.services.request_timing import TimedRoute
+
+router = APIRouter(route_class=TimedRoute)
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Expose process metrics in the Prometheus text format."""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
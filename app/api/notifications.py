@@ -0,0 +1,152 @@
+import asyncio
+import json
+import os
+from typing import Optional
+
+from dotenv import load_dotenv
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.database.postgres import get_db
+from app.models.user import User
+from app.models.notification import Notification
+from app.schemas.notification import NotificationPage, UnreadCountResponse
+from app.dependencies.auth import get_current_active_user_dependency, get_stream_user
+from app.services.notification_hub import notification_hub
+from app.services.notification_inbox import get_unread_count, mark_notifications_read
+from app.services.query_counter import query_budget
+from app.services.request_timing import TimedRoute
+
+# Load environment variables
+load_dotenv()
+
+# Stream settings
+NOTIFICATION_HEARTBEAT_SECONDS = float(os.getenv("NOTIFICATION_HEARTBEAT_SECONDS", "15"))
+NOTIFICATION_RETRY_MS = 3000
+
+router = APIRouter(route_class=TimedRoute)
+
+
+def _parse_event_id(last_event_id: Optional[str]) -> Optional[int]:
+    try:
+        return int(last_event_id) if last_event_id else None
+    except ValueError:
+        return None
+
+
+async def _event_stream(subscription):
+    try:
+        yield f"retry: {NOTIFICATION_RETRY_MS}\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(
+                    subscription.queue.get(), NOTIFICATION_HEARTBEAT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                # Comment line keeps proxies from closing an idle connection
+                yield ": heartbeat\n\n"
+                continue
+
+            if event is None:
+                # Fell too far behind; the client reconnects and replays
+                return
+            yield (
+                f"id: {event['id']}\n"
+                f"event: {event.get('type', 'info')}\n"
+                f"data: {json.dumps(event)}\n\n"
+            )
+    finally:
+        notification_hub.unsubscribe(subscription)
+
+
+@router.get("/notifications/stream")
+async def stream_notifications(
+    current_user: User = Depends(get_stream_user),
+    last_event_id: Optional[str] = Header(None),
+):
+    """Stream the current user's notifications as Server-Sent Events."""
+    subscription = notification_hub.subscribe(
+        str(current_user.id), _parse_event_id(last_event_id)
+    )
+    return StreamingResponse(
+        _event_stream(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/notifications", response_model=NotificationPage)
+@query_budget(3)
+async def get_notifications(
+    before_id: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=100),
+    unread_only: bool = False,
+    current_user: User = Depends(get_current_active_user_dependency),
+    db: AsyncSession = Depends(get_db),
+):
+    """Get the current user's notifications, newest first.
+
+    Pass `next_before_id` of a page as `before_id` to get the next one.
+    """
+    stmt = select(Notification).where(Notification.user_id == current_user.id)
+    if before_id is not None:
+        stmt = stmt.where(Notification.id < before_id)
+    if unread_only:
+        stmt = stmt.where(Notification.is_read.is_(False))
+    stmt = stmt.order_by(Notification.id.desc()).limit(limit + 1)
+
+    result = await db.execute(stmt)
+    notifications = result.scalars().all()
+
+    items = notifications[:limit]
+    return {
+        "items": items,
+        "next_before_id": items[-1].id if len(notifications) > limit else None,
+    }
+
+
+@router.get("/notifications/unread-count", response_model=UnreadCountResponse)
+@query_budget(2)
+async def get_notifications_unread_count(
+    current_user: User = Depends(get_current_active_user_dependency),
+    db: AsyncSession = Depends(get_db),
+):
+    """Get the number of unread notifications of the current user."""
+    return {"unread_count": await get_unread_count(db, current_user.id)}
+
+
+@router.post("/notifications/read", response_model=UnreadCountResponse)
+async def mark_all_notifications_read(
+    current_user: User = Depends(get_current_active_user_dependency),
+    db: AsyncSession = Depends(get_db),
+):
+    """Mark all notifications of the current user as read."""
+    await mark_notifications_read(db, current_user.id)
+    await db.commit()
+    return {"unread_count": await get_unread_count(db, current_user.id)}
+
+
+@router.post(
+    "/notifications/{notification_id}/read", response_model=UnreadCountResponse
+)
+async def mark_notification_read(
+    notification_id: int,
+    current_user: User = Depends(get_current_active_user_dependency),
+    db: AsyncSession = Depends(get_db),
+):
+    """Mark one notification of the current user as read."""
+    marked = await mark_notifications_read(db, current_user.id, [notification_id])
+    if not marked:
+        stmt = select(Notification.id).where(
+            Notification.id == notification_id,
+            Notification.user_id == current_user.id,
+        )
+        if (await db.execute(stmt)).scalar() is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Notification not found",
+            )
+    await db.commit()
+    return {"unread_count": await get_unread_count(db, current_user.id)}
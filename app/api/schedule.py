@@ -2,26 +2,32 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import and_, func
+import logging
 from typing import List, Optional
 from datetime import date, datetime
 
 from app.database.postgres import get_db
 from app.models.schedule import Schedule
 from app.models.user import User, UserRole
-from app.models.group import Group
 from app.schemas.schedule import (
     ScheduleCreate,
     ScheduleResponse,
     ScheduleUpdate,
     ScheduleWithDetailsResponse,
 )
+from app.services.directory import directory
+from app.services.access_index import access_index
 from app.dependencies.auth import (
     get_current_active_user_dependency,
     teacher_required,
     admin_required,
 )
+from app.services.query_counter import query_budget
+from app.services.request_timing import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
+
+logger = logging.getLogger(__name__)
 
 
 @router.post(
@@ -49,11 +55,13 @@ async def create_schedule(
     db.add(db_schedule)
     await db.commit()
     await db.refresh(db_schedule)
+    access_index.add(db_schedule.teacher_id, db_schedule.group_id)
 
     return db_schedule
 
 
 @router.get("/schedule", response_model=List[ScheduleWithDetailsResponse])
+@query_budget(4)
 async def get_schedules(
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
@@ -62,16 +70,8 @@ async def get_schedules(
     db: AsyncSession = Depends(get_db),
 ):
     """Get schedules with optional filtering."""
-    # Build base query with joins for detailed info
-    query = (
-        select(
-            Schedule,
-            Group.name.label("group_name"),
-            User.full_name.label("teacher_name"),
-        )
-        .join(Group, Schedule.group_id == Group.id)
-        .join(User, Schedule.teacher_id == User.id)
-    )
+    # Build base query
+    query = select(Schedule)
 
     # Apply filters
     if start_date:
@@ -94,12 +94,19 @@ async def get_schedules(
     query = query.order_by(Schedule.date, Schedule.start_time)
 
     result = await db.execute(query)
-    rows = result.all()
+    rows = result.scalars().all()
+
+    # Names come from the in-memory directory instead of joins
+    group_names = await directory.group_names(
+        db, [schedule.group_id for schedule in rows]
+    )
+    teacher_names = await directory.user_names(
+        db, [schedule.teacher_id for schedule in rows]
+    )
 
     # Convert results to response models
     schedules = []
-    for row in rows:
-        schedule, group_name, teacher_name = row
+    for schedule in rows:
         schedules.append(
             ScheduleWithDetailsResponse(
                 id=schedule.id,
@@ -110,32 +117,94 @@ async def get_schedules(
                 start_time=schedule.start_time,
                 end_time=schedule.end_time,
                 room=schedule.room,
-                group_name=group_name,
-                teacher_name=teacher_name,
+                group_name=group_names[schedule.group_id],
+                teacher_name=teacher_names[schedule.teacher_id],
             )
         )
 
     return schedules
 
 
+# Registered before /schedule/{schedule_id}, which would match "today"
+@router.get("/schedule/today", response_model=List[ScheduleWithDetailsResponse])
+@query_budget(4)
+async def get_schedules_today(
+    current_user: User = Depends(teacher_required),
+    db: AsyncSession = Depends(get_db),
+):
+    """Get today's schedules for the current teacher."""
+    try:
+        today = datetime.now().date()
+        logger.debug(
+            "Получение расписания на сегодня (%s) для пользователя %s",
+            today,
+            current_user.id,
+        )
+
+        # Build query
+        query = (
+            select(Schedule)
+            .where(Schedule.date == today)
+        )
+
+        # For teachers, only show their schedules
+        if current_user.role == UserRole.TEACHER:
+            query = query.where(Schedule.teacher_id == current_user.id)
+
+        # Order by time
+        query = query.order_by(Schedule.start_time)
+
+        result = await db.execute(query)
+        rows = result.scalars().all()
+
+        # Names come from the in-memory directory instead of joins
+        group_names = await directory.group_names(
+            db, [schedule.group_id for schedule in rows]
+        )
+        teacher_names = await directory.user_names(
+            db, [schedule.teacher_id for schedule in rows]
+        )
+
+        logger.debug("Найдено %s пар на сегодня", len(rows))
+
+        # Convert results to response models
+        schedules = []
+        for schedule in rows:
+            schedules.append(
+                ScheduleWithDetailsResponse(
+                    id=schedule.id,
+                    group_id=schedule.group_id,
+                    teacher_id=schedule.teacher_id,
+                    subject=schedule.subject,
+                    date=schedule.date,
+                    start_time=schedule.start_time,
+                    end_time=schedule.end_time,
+                    room=schedule.room,
+                    group_name=group_names[schedule.group_id],
+                    teacher_name=teacher_names[schedule.teacher_id],
+                )
+            )
+
+        return schedules
+    except Exception as e:
+        logger.error("Ошибка при получении расписания на сегодня: %s", e)
+        # Возвращаем пустой список вместо ошибки
+        return []
+
+
 @router.get(
     "/schedule/{schedule_id}", response_model=ScheduleWithDetailsResponse
 )
+@query_budget(4)
 async def get_schedule(
     schedule_id: str,
     current_user: User = Depends(get_current_active_user_dependency),
     db: AsyncSession = Depends(get_db),
 ):
     """Get a specific schedule by ID with details."""
-    # Get schedule with group and teacher data
+    # Get schedule
     query = (
-        select(
-            Schedule,
-            Group.name.label("group_name"),
-            User.full_name.label("teacher_name"),
-        )
-        .join(Group, Schedule.group_id == Group.id)
-        .join(User, Schedule.teacher_id == User.id)
+        select(Schedule)
         .where(Schedule.id == schedule_id)
     )
 
@@ -147,14 +216,15 @@ async def get_schedule(
         query = query.where(Schedule.teacher_id == current_user.id)
 
     result = await db.execute(query)
-    row = result.first()
+    schedule = result.scalars().first()
 
-    if not row:
+    if not schedule:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Schedule not found"
         )
 
-    schedule, group_name, teacher_name = row
+    group_names = await directory.group_names(db, [schedule.group_id])
+    teacher_names = await directory.user_names(db, [schedule.teacher_id])
 
     # Create response with details
     response = ScheduleWithDetailsResponse(
@@ -166,8 +236,8 @@ async def get_schedule(
         start_time=schedule.start_time,
         end_time=schedule.end_time,
         room=schedule.room,
-        group_name=group_name,
-        teacher_name=teacher_name,
+        group_name=group_names[schedule.group_id],
+        teacher_name=teacher_names[schedule.teacher_id],
     )
 
     return response
@@ -202,12 +272,17 @@ async def update_schedule(
         )
 
     # Update schedule data
+    previous = (db_schedule.teacher_id, db_schedule.group_id)
     for key, value in schedule_update.dict(exclude_unset=True).items():
         setattr(db_schedule, key, value)
 
     await db.commit()
     await db.refresh(db_schedule)
 
+    if previous != (db_schedule.teacher_id, db_schedule.group_id):
+        access_index.remove(*previous)
+        access_index.add(db_schedule.teacher_id, db_schedule.group_id)
+
     return db_schedule
 
 
@@ -243,6 +318,7 @@ async def delete_schedule(
     # Delete the schedule
     await db.delete(db_schedule)
     await db.commit()
+    access_index.remove(db_schedule.teacher_id, db_schedule.group_id)
 
     return None
 
@@ -250,6 +326,7 @@ async def delete_schedule(
 @router.get(
     "/schedule/day/{day}", response_model=List[ScheduleWithDetailsResponse]
 )
+@query_budget(4)
 async def get_schedule_by_day(
     day: str,
     current_user: User = Depends(get_current_active_user_dependency),
@@ -278,15 +355,9 @@ async def get_schedule_by_day(
     # Extract day of week from date
     day_of_week = day_mapping[day]
 
-    # Build query with joins for detailed info
+    # Build query
     query = (
-        select(
-            Schedule,
-            Group.name.label("group_name"),
-            User.full_name.label("teacher_name"),
-        )
-        .join(Group, Schedule.group_id == Group.id)
-        .join(User, Schedule.teacher_id == User.id)
+        select(Schedule)
         .where(func.extract('dow', Schedule.date) == day_of_week)
     )
 
@@ -301,12 +372,19 @@ async def get_schedule_by_day(
     query = query.order_by(Schedule.date, Schedule.start_time)
 
     result = await db.execute(query)
-    rows = result.all()
+    rows = result.scalars().all()
+
+    # Names come from the in-memory directory instead of joins
+    group_names = await directory.group_names(
+        db, [schedule.group_id for schedule in rows]
+    )
+    teacher_names = await directory.user_names(
+        db, [schedule.teacher_id for schedule in rows]
+    )
 
     # Convert results to response models
     schedules = []
-    for row in rows:
-        schedule, group_name, teacher_name = row
+    for schedule in rows:
         schedules.append(
             ScheduleWithDetailsResponse(
                 id=schedule.id,
@@ -317,71 +395,9 @@ async def get_schedule_by_day(
                 start_time=schedule.start_time,
                 end_time=schedule.end_time,
                 room=schedule.room,
-                group_name=group_name,
-                teacher_name=teacher_name,
+                group_name=group_names[schedule.group_id],
+                teacher_name=teacher_names[schedule.teacher_id],
             )
         )
 
     return schedules
-
-
-@router.get("/schedule/today", response_model=List[ScheduleWithDetailsResponse])
-async def get_schedules_today(
-    current_user: User = Depends(teacher_required),
-    db: AsyncSession = Depends(get_db),
-):
-    """Get today's schedules for the current teacher."""
-    try:
-        today = datetime.now().date()
-        print(
-            f"Получение расписания на сегодня ({today}) для пользователя {current_user.id}"
-        )
-
-        # Build query with joins for detailed info
-        query = (
-            select(
-                Schedule,
-                Group.name.label("group_name"),
-                User.full_name.label("teacher_name"),
-            )
-            .join(Group, Schedule.group_id == Group.id)
-            .join(User, Schedule.teacher_id == User.id)
-            .where(Schedule.date == today)
-        )
-
-        # For teachers, only show their schedules
-        if current_user.role == UserRole.TEACHER:
-            query = query.where(Schedule.teacher_id == current_user.id)
-
-        # Order by time
-        query = query.order_by(Schedule.start_time)
-
-        result = await db.execute(query)
-        rows = result.all()
-
-        print(f"Найдено {len(rows)} пар на сегодня")
-
-        # Convert results to response models
-        schedules = []
-        for row in rows:
-            schedule, group_name, teacher_name = row
-            schedules.append(
-                ScheduleWithDetailsResponse(
-                    id=schedule.id,
-                    group_id=schedule.group_id,
-                    teacher_id=schedule.teacher_id,
-                    subject=schedule.subject,
-                    date=schedule.date,
-                    start_time=schedule.start_time,
-                    end_time=schedule.end_time,
-                    room=schedule.room,
-                    group_name=group_name,
-                    teacher_name=teacher_name,
-                )
-            )
-
-        return schedules
-    except Exception as e:
-        print(f"Ошибка при получении расписания на сегодня: {str(e)}")
-        # Возвращаем пустой список вместо ошибки
-        return []
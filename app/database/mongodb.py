@@ -1,7 +1,9 @@
+import logging
 import os
 import motor.motor_asyncio
 from gridfs import GridFS
-from pymongo import MongoClient
+from pymongo import ASCENDING, MongoClient
+from pymongo.errors import PyMongoError
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -16,6 +18,8 @@ client = None
 db = None
 fs = None  # GridFS instance
 
+logger = logging.getLogger(__name__)
+
 
 async def connect_to_mongodb():
     """Connect to MongoDB."""
@@ -29,7 +33,16 @@ async def connect_to_mongodb():
     sync_db = sync_client[MONGO_DB_NAME]
     fs = GridFS(sync_db)
 
-    print("Connected to MongoDB")
+    # Upload sessions upsert chunks by (files_id, n); GridFS itself only
+    # creates this index on its first write to an empty bucket
+    try:
+        await db.fs.chunks.create_index(
+            [("files_id", ASCENDING), ("n", ASCENDING)], unique=True
+        )
+    except PyMongoError as e:
+        logger.error("Could not create the GridFS chunks index: %s", e)
+
+    logger.info("Connected to MongoDB")
 
 
 async def close_mongodb_connection():
@@ -37,7 +50,7 @@ async def close_mongodb_connection():
     global client
     if client:
         client.close()
-        print("Disconnected from MongoDB")
+        logger.info("Disconnected from MongoDB")
 
 
 async def get_mongodb():
@@ -1,8 +1,22 @@
+import logging
 import os
-import pika
+import asyncio
 import json
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import aio_pika
+from aio_pika.pool import Pool
 from dotenv import load_dotenv
 
+from app.services.metrics import (
+    mq_publish_duration_seconds,
+    mq_publish_failures_total,
+    mq_published_messages_total,
+)
+from app.services.request_timing import timed
+
 # Load environment variables
 load_dotenv()
 
@@ -13,86 +27,221 @@ RABBITMQ_USER = os.getenv("RABBITMQ_USER", "guest")
 RABBITMQ_PASSWORD = os.getenv("RABBITMQ_PASSWORD", "guest")
 RABBITMQ_VHOST = os.getenv("RABBITMQ_VHOST", "/")
 
+# Publisher settings
+RABBITMQ_CHANNEL_POOL_SIZE = int(os.getenv("RABBITMQ_CHANNEL_POOL_SIZE", "4"))
+PUBLISH_BUFFER_SIZE = int(os.getenv("PUBLISH_BUFFER_SIZE", "10000"))
+PUBLISH_BATCH_SIZE = int(os.getenv("PUBLISH_BATCH_SIZE", "100"))
+PUBLISH_RETRY_SECONDS = 2.0
+PUBLISH_SHUTDOWN_TIMEOUT = 5.0
+
 # RabbitMQ connection
 connection = None
-channel = None
+channel_pool = None
+
+# Messages waiting to be published and the tasks publishing them
+_buffer: Optional[asyncio.Queue] = None
+_flushers: List[asyncio.Task] = []
+_connect_lock: Optional[asyncio.Lock] = None
 
 # Queues
 NOTIFICATION_QUEUE = "notifications"
+NOTIFICATION_DEAD_LETTER_QUEUE = "notifications.dead"
+NOTIFICATION_LIVE_EXCHANGE = "notifications.live"
 FILE_PROCESSING_QUEUE = "file_processing"
 
+logger = logging.getLogger(__name__)
 
-def connect_to_rabbitmq():
-    """Connect to RabbitMQ server."""
-    global connection, channel
 
-    # Create a connection parameters object
-    credentials = pika.PlainCredentials(RABBITMQ_USER, RABBITMQ_PASSWORD)
-    parameters = pika.ConnectionParameters(
-        host=RABBITMQ_HOST,
-        port=RABBITMQ_PORT,
-        virtual_host=RABBITMQ_VHOST,
-        credentials=credentials,
-    )
+async def _connect():
+    """Open the connection and the channel pool, declaring queues."""
+    global connection, channel_pool
 
-    try:
-        # Establish connection
-        connection = pika.BlockingConnection(parameters)
-        channel = connection.channel()
+    async with _connect_lock:
+        if channel_pool is not None:
+            return
+
+        connection = await aio_pika.connect_robust(
+            host=RABBITMQ_HOST,
+            port=RABBITMQ_PORT,
+            login=RABBITMQ_USER,
+            password=RABBITMQ_PASSWORD,
+            virtualhost=RABBITMQ_VHOST,
+        )
+
+        async def get_channel():
+            # Confirms make each publish resolve once the broker has it
+            return await connection.channel(publisher_confirms=True)
+
+        pool = Pool(get_channel, max_size=RABBITMQ_CHANNEL_POOL_SIZE)
 
         # Declare queues
-        channel.queue_declare(queue=NOTIFICATION_QUEUE, durable=True)
-        channel.queue_declare(queue=FILE_PROCESSING_QUEUE, durable=True)
+        async with pool.acquire() as channel:
+            await channel.declare_queue(NOTIFICATION_QUEUE, durable=True)
+            await channel.declare_queue(FILE_PROCESSING_QUEUE, durable=True)
+
+        channel_pool = pool
+        logger.info("Connected to RabbitMQ")
 
-        print("Connected to RabbitMQ")
+
+async def connect_to_rabbitmq():
+    """Start the publisher and connect to RabbitMQ server.
+
+    A broker that is down at startup does not stop the app; messages are
+    buffered and the publisher keeps retrying in the background.
+    """
+    global _buffer, _connect_lock
+
+    _buffer = asyncio.Queue(maxsize=PUBLISH_BUFFER_SIZE)
+    _connect_lock = asyncio.Lock()
+    for _ in range(RABBITMQ_CHANNEL_POOL_SIZE):
+        _flushers.append(asyncio.create_task(_flush_loop()))
+
+    try:
+        await _connect()
         return True
     except Exception as e:
-        print(f"Failed to connect to RabbitMQ: {str(e)}")
+        logger.error("Failed to connect to RabbitMQ: %s", e)
         return False
 
 
-def close_rabbitmq_connection():
-    """Close RabbitMQ connection."""
-    global connection
-    if connection and connection.is_open:
-        connection.close()
-        print("Disconnected from RabbitMQ")
+async def get_connection():
+    """Get the RabbitMQ connection, connecting first if needed."""
+    if channel_pool is None:
+        await _connect()
+    return connection
 
 
-def publish_message(queue, message):
-    """Publish a message to a queue."""
-    global channel
+async def close_rabbitmq_connection():
+    """Flush buffered messages and close RabbitMQ connection."""
+    global connection, channel_pool, _buffer
+
+    if _buffer is not None:
+        try:
+            await asyncio.wait_for(_buffer.join(), PUBLISH_SHUTDOWN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.error("Dropping %s unpublished messages", _buffer.qsize())
+
+    for task in _flushers:
+        task.cancel()
+    _flushers.clear()
+    _buffer = None
+
+    if channel_pool is not None:
+        await channel_pool.close()
+        channel_pool = None
+    if connection is not None and not connection.is_closed:
+        await connection.close()
+        logger.info("Disconnected from RabbitMQ")
+    connection = None
 
-    if not channel or not channel.is_open:
-        if not connect_to_rabbitmq():
-            return False
 
+async def publish_batch(messages: List[Tuple[str, Dict[str, Any]]]):
+    """Publish messages and wait until the broker confirms all of them.
+
+    Confirms for the whole batch are awaited together, so a batch costs
+    about one broker round trip.
+    """
+    started = time.perf_counter()
     try:
-        channel.basic_publish(
-            exchange='',
-            routing_key=queue,
-            body=json.dumps(message),
-            properties=pika.BasicProperties(
-                delivery_mode=2,  # Make message persistent
-            ),
-        )
+        if channel_pool is None:
+            await _connect()
+
+        async with channel_pool.acquire() as channel:
+            await asyncio.gather(
+                *(
+                    channel.default_exchange.publish(
+                        aio_pika.Message(
+                            json.dumps(message).encode(),
+                            content_type="application/json",
+                            delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+                        ),
+                        routing_key=queue,
+                    )
+                    for queue, message in messages
+                )
+            )
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        mq_publish_failures_total.labels("broker_error").inc(len(messages))
+        raise
+
+    mq_publish_duration_seconds.observe(time.perf_counter() - started)
+    for queue, count in Counter(queue for queue, _ in messages).items():
+        mq_published_messages_total.labels(queue).inc(count)
+
+
+async def _flush_loop():
+    while True:
+        batch = [await _buffer.get()]
+        while len(batch) < PUBLISH_BATCH_SIZE and not _buffer.empty():
+            batch.append(_buffer.get_nowait())
+
+        # Keep retrying: while the broker is away the bounded buffer fills
+        # up and publish_message starts rejecting new messages
+        while True:
+            try:
+                await publish_batch(batch)
+                break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Failed to publish %s messages: %s", len(batch), e)
+                await asyncio.sleep(PUBLISH_RETRY_SECONDS)
+
+        for _ in batch:
+            _buffer.task_done()
+
+
+@timed("mq")
+def publish_message(queue, message):
+    """Queue a message for publishing without waiting for the broker."""
+    if _buffer is None:
+        logger.warning("Failed to publish message: publisher is not running")
+        mq_publish_failures_total.labels("not_running").inc()
+        return False
+
+    try:
+        _buffer.put_nowait((queue, message))
         return True
-    except Exception as e:
-        print(f"Failed to publish message: {str(e)}")
+    except asyncio.QueueFull:
+        logger.warning("Failed to publish message: publish buffer is full")
+        mq_publish_failures_total.labels("buffer_full").inc()
         return False
 
 
-def send_notification(user_id, message, notification_type="info"):
+def notification_message(user_id, message, notification_type="info", data=None):
+    """Build a notification message for a single user."""
+    return {
+        "user_id": user_id,
+        "message": message,
+        "type": notification_type,
+        "data": data or {},
+    }
+
+
+def file_task_message(file_id, operation):
+    """Build a file processing task message."""
+    return {"file_id": file_id, "operation": operation}
+
+
+def send_notification(user_id, message, notification_type="info", data=None):
     """Send a notification to a user."""
+    notification = notification_message(user_id, message, notification_type, data)
+    return publish_message(NOTIFICATION_QUEUE, notification)
+
+
+def send_notification_batch(user_ids, message, notification_type="info", data=None):
+    """Send one notification to many users with a single message."""
     notification = {
-        "user_id": user_id,
+        "user_ids": user_ids,
         "message": message,
         "type": notification_type,
+        "data": data or {},
     }
     return publish_message(NOTIFICATION_QUEUE, notification)
 
 
 def queue_file_processing(file_id, operation):
     """Queue a file for processing."""
-    file_task = {"file_id": file_id, "operation": operation}
-    return publish_message(FILE_PROCESSING_QUEUE, file_task)
+    return publish_message(FILE_PROCESSING_QUEUE, file_task_message(file_id, operation))
@@ -1,8 +1,12 @@
-from fastapi import Depends, HTTPException, status
+import logging
+from typing import Optional
+from uuid import UUID
+
+from fastapi import Depends, HTTPException, Query, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database.postgres import get_db
+from app.database.postgres import get_db, SessionLocal
 from app.services.auth import (
     get_current_user,
     get_current_active_user,
@@ -10,18 +14,34 @@ from app.services.auth import (
     check_is_admin,
 )
 from app.models.user import User, UserRole
+from app.services.access_index import access_index
+from app.services.request_timing import track
 
 # OAuth2 scheme for token authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token")
+optional_oauth2_scheme = OAuth2PasswordBearer(
+    tokenUrl="/api/auth/token", auto_error=False
+)
+
+logger = logging.getLogger(__name__)
 
 
 # Function to get the current user from the token
 async def get_current_user_from_token(
-    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)
+    request: Request,
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db),
 ):
-    """Get the current user from the token."""
+    """Get the current user from the token.
+
+    The user is kept in the request state for middleware such as the
+    request profiler, which must not authenticate a second time.
+    """
     try:
-        return await get_current_user(token, db)
+        with track("auth"):
+            user = await get_current_user(token, db)
+        request.state.user = user
+        return user
     except HTTPException as e:
         # Перехватываем исключение и добавляем больше информации
         raise HTTPException(
@@ -41,7 +61,7 @@ async def get_current_active_user_dependency(
     except HTTPException as e:
         # Добавляем больше информации об ошибке
         error_detail = f"User validation failed: {e.detail}"
-        print(f"Authentication error: {error_detail}")
+        logger.warning("Authentication error: %s", error_detail)
         raise HTTPException(
             status_code=e.status_code,
             detail=error_detail,
@@ -50,13 +70,29 @@ async def get_current_active_user_dependency(
     except Exception as e:
         # Обрабатываем неожиданные ошибки
         error_detail = f"Unexpected error during user validation: {str(e)}"
-        print(f"Unexpected error: {error_detail}")
+        logger.error("Unexpected error: %s", error_detail)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=error_detail,
         )
 
 
+# Get the current user of a long-lived streaming connection
+async def get_stream_user(
+    header_token: Optional[str] = Depends(optional_oauth2_scheme),
+    token: Optional[str] = Query(None),
+):
+    """Get the current user from the Authorization header or `token` query.
+
+    EventSource cannot send headers, hence the query parameter. The user is
+    loaded in a short session of its own so the stream does not hold a
+    database connection while it is open.
+    """
+    async with SessionLocal() as db:
+        user = await get_current_user(header_token or token, db)
+    return await get_current_active_user(user)
+
+
 # Check if the user is a teacher
 async def teacher_required(
     current_user: User = Depends(get_current_active_user_dependency),
@@ -75,8 +111,9 @@ async def admin_required(
 
 # Check if the user has access to a specific group
 async def check_group_access(
-    group_id: str,
+    group_id: UUID,
     current_user: User = Depends(get_current_active_user_dependency),
+    db: AsyncSession = Depends(get_db),
 ):
     """Check if the user has access to a specific group."""
     # Admins have access to all groups
@@ -85,13 +122,16 @@ async def check_group_access(
 
     # Teachers can access groups they teach
     if current_user.role == UserRole.TEACHER:
-        # In a real implementation, you would check if the teacher teaches this group
-        # For now, we'll assume they do for simplicity
+        if not await access_index.has_access(db, current_user.id, group_id):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Access denied to this group",
+            )
         return True
 
     # Students can only access their own group
     if current_user.role == UserRole.STUDENT:
-        if str(current_user.group_id) != group_id:
+        if current_user.group_id != group_id:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Access denied to this group",
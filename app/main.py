@@ -2,9 +2,43 @@ from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
-from app.api import auth, schedule, assignments, attendance, groups
+from app.api import (
+    auth,
+    schedule,
+    assignments,
+    attendance,
+    groups,
+    notifications,
+    metrics,
+    admin,
+)
 from app.database import postgres
 from app.database import mongodb
+from app.database import rabbitmq
+from app.services.file_cache import init_file_cache
+from app.services.file_gc import start_file_gc, stop_file_gc
+from app.services.directory import start_directory, stop_directory
+from app.services.access_index import start_access_index, stop_access_index
+from app.services.user_import import shutdown_hash_pool
+from app.services.metrics import METRICS_ENABLED, MetricsMiddleware
+from app.services.query_counter import QueryLogMiddleware
+from app.services.request_timing import ServerTimingMiddleware
+from app.services.loop_watchdog import (
+    LoopWatchdogMiddleware,
+    start_loop_watchdog,
+    stop_loop_watchdog,
+)
+from app.services.log import RequestIdMiddleware, configure_logging, stop_logging
+from app.services.profiler import PROFILING_ENABLED, RequestProfilerMiddleware
+from app.services.outbox import start_outbox_relay, stop_outbox_relay
+from app.services.notification_inbox import (
+    start_notification_retention,
+    stop_notification_retention,
+)
+from app.services.notification_hub import (
+    start_notification_hub,
+    stop_notification_hub,
+)
 
 # Create FastAPI application
 app = FastAPI(
@@ -20,28 +54,67 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Profile-Id", "X-Request-ID"],
 )
 
+# Report where request time went: auth, db, serialize, mq, files
+app.add_middleware(ServerTimingMiddleware)
+# Flag requests that repeat a statement, and enforce query budgets in tests
+app.add_middleware(QueryLogMiddleware)
+# Attribute event-loop blocks to the request that caused them
+app.add_middleware(LoopWatchdogMiddleware)
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+# Admins can profile a single request with the X-Profile header
+if PROFILING_ENABLED:
+    app.add_middleware(RequestProfilerMiddleware)
+# Correlation id for every log line of a request; outermost so all see it
+app.add_middleware(RequestIdMiddleware)
+
 # Include routers
 app.include_router(auth.router, prefix="/api", tags=["Authentication"])
 app.include_router(schedule.router, prefix="/api", tags=["Schedule"])
 app.include_router(assignments.router, prefix="/api", tags=["Assignments"])
 app.include_router(attendance.router, prefix="/api", tags=["Attendance"])
 app.include_router(groups.router, prefix="/api", tags=["Groups"])
+app.include_router(notifications.router, prefix="/api", tags=["Notifications"])
+app.include_router(admin.router, prefix="/api", tags=["Admin"])
+# Scraped by Prometheus at the conventional path, outside /api
+app.include_router(metrics.router, tags=["Metrics"])
 
 
 @app.on_event("startup")
 async def startup_db_client():
     """Initialize database connections on startup."""
+    configure_logging()
+    start_loop_watchdog()
     await postgres.connect_to_postgres()
     await mongodb.connect_to_mongodb()
+    await rabbitmq.connect_to_rabbitmq()
+    init_file_cache()
+    start_file_gc()
+    start_outbox_relay()
+    await start_directory()
+    await start_access_index()
+    start_notification_hub()
+    start_notification_retention()
 
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
     """Close database connections on shutdown."""
+    await stop_file_gc()
+    await stop_outbox_relay()
+    await stop_directory()
+    await stop_access_index()
+    shutdown_hash_pool()
+    await stop_notification_hub()
+    await stop_notification_retention()
+    await rabbitmq.close_rabbitmq_connection()
     await postgres.close_postgres_connection()
     await mongodb.close_mongodb_connection()
+    stop_loop_watchdog()
+    stop_logging()
 
 
 @app.get("/")
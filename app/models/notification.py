@@ -0,0 +1,60 @@
+from sqlalchemy import (
+    Column,
+    String,
+    Text,
+    Boolean,
+    Integer,
+    BigInteger,
+    DateTime,
+    ForeignKey,
+    Index,
+)
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from datetime import datetime
+
+from app.database.postgres import Base
+
+
+class Notification(Base):
+    """Notification delivered to a user's inbox."""
+
+    __tablename__ = "notifications"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    user_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    type = Column(String, nullable=False)
+    message = Column(Text, nullable=False)
+    data = Column(JSONB, nullable=False, default=dict)
+    is_read = Column(Boolean, nullable=False, default=False)
+    created_at = Column(
+        DateTime,
+        default=lambda: datetime.utcnow().replace(tzinfo=None),
+        nullable=False,
+        index=True,
+    )
+
+    # Serves keyset pagination of a user's inbox, newest first
+    __table_args__ = (Index("ix_notifications_user_id_id", "user_id", "id"),)
+
+    def __repr__(self):
+        return f"<Notification {self.id} user={self.user_id}, type={self.type}>"
+
+
+class NotificationCounter(Base):
+    """Denormalized number of unread notifications of a user."""
+
+    __tablename__ = "notification_counters"
+
+    user_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    unread_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<NotificationCounter user={self.user_id}, unread={self.unread_count}>"
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, String, BigInteger, DateTime
+from sqlalchemy.dialects.postgresql import JSONB
+from datetime import datetime
+
+from app.database.postgres import Base
+
+
+class OutboxMessage(Base):
+    """Broker message written in the same transaction as the change it reports."""
+
+    __tablename__ = "outbox_messages"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    queue = Column(String, nullable=False)
+    payload = Column(JSONB, nullable=False)
+    created_at = Column(
+        DateTime,
+        default=lambda: datetime.utcnow().replace(tzinfo=None),
+        nullable=False,
+    )
+
+    def __repr__(self):
+        return f"<OutboxMessage {self.id} queue={self.queue}>"
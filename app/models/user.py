@@ -25,7 +25,7 @@ class User(Base):
     password_hash = Column(String, nullable=False)
     role = Column(Enum(UserRole), nullable=False)
     group_id = Column(
-        UUID(as_uuid=True), ForeignKey("groups.id"), nullable=True
+        UUID(as_uuid=True), ForeignKey("groups.id"), nullable=True, index=True
     )
     full_name = Column(String, nullable=False)
     email = Column(String, unique=True, index=True, nullable=False)
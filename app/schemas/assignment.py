@@ -65,3 +65,21 @@ class FileResponse(BaseModel):
     file_name: str
     content_type: str
     upload_date: datetime
+
+
+class UploadSessionCreate(BaseModel):
+    file_name: str
+    content_type: str
+    total_size: int
+
+
+class UploadSessionResponse(BaseModel):
+    id: str
+    assignment_id: str
+    file_name: str
+    content_type: str
+    total_size: int
+    chunk_size: int
+    received_bytes: int
+    missing_offsets: List[int]
+    expires_at: datetime
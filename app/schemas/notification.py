@@ -0,0 +1,24 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+
+
+class NotificationResponse(BaseModel):
+    id: int
+    type: str
+    message: str
+    data: Dict[str, Any]
+    is_read: bool
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
+
+
+class NotificationPage(BaseModel):
+    items: List[NotificationResponse]
+    next_before_id: Optional[int] = None
+
+
+class UnreadCountResponse(BaseModel):
+    unread_count: int
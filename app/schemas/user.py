@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, EmailStr, UUID4
-from typing import Optional
+from typing import List, Optional
 from enum import Enum
 
 
@@ -55,3 +55,21 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     username: Optional[str] = None
     role: Optional[UserRole] = None
+
+
+class UserImportError(BaseModel):
+    row: int
+    username: Optional[str] = None
+    error: str
+
+
+class UserImportReport(BaseModel):
+    total: int
+    created: int
+    failed: int
+    errors: List[UserImportError]
+    method: str
+    seconds: float
+    hash_seconds: float
+    insert_seconds: float
+    rows_per_second: float
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import os
+from typing import Dict, Optional
+from uuid import UUID
+
+from dotenv import load_dotenv
+from sqlalchemy import exists, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.database.postgres import SessionLocal
+from app.models.schedule import Schedule
+
+# Load environment variables
+load_dotenv()
+
+# Access index settings
+ACCESS_INDEX_REFRESH_SECONDS = float(os.getenv("ACCESS_INDEX_REFRESH_SECONDS", "300"))
+
+logger = logging.getLogger(__name__)
+
+
+def _key(teacher_id: UUID, group_id: UUID) -> bytes:
+    return teacher_id.bytes + group_id.bytes
+
+
+class AccessIndex:
+    """Which groups each teacher teaches, derived from the schedule.
+
+    Pairs are kept as 32-byte keys with the number of schedule entries
+    behind them, so deleting one of several lessons keeps the access and
+    a check is a single dict lookup.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._pairs: Dict[bytes, int] = {}
+
+    async def load(self):
+        """Rebuild the index from the schedules table."""
+        async with SessionLocal() as session:
+            result = await session.execute(
+                select(Schedule.teacher_id, Schedule.group_id, func.count()).group_by(
+                    Schedule.teacher_id, Schedule.group_id
+                )
+            )
+            pairs = {
+                _key(teacher_id, group_id): count
+                for teacher_id, group_id, count in result.all()
+            }
+
+        self._pairs = pairs
+        self.version += 1
+
+    def add(self, teacher_id: UUID, group_id: UUID):
+        """Record a new schedule entry."""
+        key = _key(teacher_id, group_id)
+        self._pairs[key] = self._pairs.get(key, 0) + 1
+        self.version += 1
+
+    def remove(self, teacher_id: UUID, group_id: UUID):
+        """Record a deleted schedule entry."""
+        key = _key(teacher_id, group_id)
+        count = self._pairs.get(key, 0) - 1
+        if count > 0:
+            self._pairs[key] = count
+        else:
+            self._pairs.pop(key, None)
+        self.version += 1
+
+    def teaches(self, teacher_id: UUID, group_id: UUID) -> bool:
+        """Check the index only."""
+        return _key(teacher_id, group_id) in self._pairs
+
+    async def has_access(
+        self, db: AsyncSession, teacher_id: UUID, group_id: UUID
+    ) -> bool:
+        """Check if a teacher teaches a group.
+
+        A miss is confirmed against the database, since another worker may
+        have scheduled the lesson since the last refresh.
+        """
+        if self.teaches(teacher_id, group_id):
+            return True
+
+        found = await db.scalar(
+            select(
+                exists().where(
+                    Schedule.teacher_id == teacher_id,
+                    Schedule.group_id == group_id,
+                )
+            )
+        )
+        if found:
+            self._pairs.setdefault(_key(teacher_id, group_id), 1)
+        return bool(found)
+
+
+# Index of this process and its refresh task
+access_index = AccessIndex()
+_refresh_task: Optional[asyncio.Task] = None
+
+
+async def _refresh_loop():
+    while True:
+        await asyncio.sleep(ACCESS_INDEX_REFRESH_SECONDS)
+        try:
+            await access_index.load()
+        except Exception as e:
+            logger.error("Failed to refresh access index: %s", e)
+
+
+async def start_access_index():
+    """Load the access index and keep refreshing it."""
+    global _refresh_task
+
+    try:
+        await access_index.load()
+    except Exception as e:
+        # Checks fall back to the database until the next refresh
+        logger.error("Failed to load access index: %s", e)
+    if ACCESS_INDEX_REFRESH_SECONDS > 0:
+        _refresh_task = asyncio.create_task(_refresh_loop())
+
+
+async def stop_access_index():
+    """Stop refreshing the access index."""
+    global _refresh_task
+
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+        await asyncio.gather(_refresh_task, return_exceptions=True)
+    _refresh_task = None
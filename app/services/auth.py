@@ -1,3 +1,4 @@
+import logging
 import os
 from datetime import datetime, timedelta
 from typing import Optional
@@ -27,6 +28,8 @@ ACCESS_TOKEN_EXPIRE_MINUTES = int(
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+logger = logging.getLogger(__name__)
+
 
 def verify_password(plain_password, hashed_password):
     """Verify a password against a hash."""
@@ -88,7 +91,7 @@ async def get_current_user(token: str, db: AsyncSession = Depends(get_db)):
     try:
         # Проверим, что токен не пустой
         if not token or token == "undefined":
-            print("Authentication error: Token is missing or invalid")
+            logger.warning("Authentication error: Token is missing or invalid")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Authentication token is missing or invalid",
@@ -98,7 +101,7 @@ async def get_current_user(token: str, db: AsyncSession = Depends(get_db)):
         try:
             payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         except JWTError as e:
-            print(f"JWT decode error: {str(e)}")
+            logger.warning("JWT decode error: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail=f"Token validation failed: {str(e)}",
@@ -107,13 +110,13 @@ async def get_current_user(token: str, db: AsyncSession = Depends(get_db)):
 
         username: str = payload.get("sub")
         if username is None:
-            print("Authentication error: Username not found in token")
+            logger.warning("Authentication error: Username not found in token")
             raise credentials_exception
 
         token_data = TokenData(username=username, role=payload.get("role"))
     except JWTError as e:
         # Добавляем детали ошибки для отладки
-        print(f"JWT error: {str(e)}")
+        logger.warning("JWT error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=f"Token validation failed: {str(e)}",
@@ -122,8 +125,9 @@ async def get_current_user(token: str, db: AsyncSession = Depends(get_db)):
 
     user = await get_user_by_username(db, token_data.username)
     if user is None:
-        print(
-            f"Authentication error: User not found for username {token_data.username}"
+        logger.warning(
+            "Authentication error: User not found for username %s",
+            token_data.username,
         )
         raise credentials_exception
 
@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import os
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from dotenv import load_dotenv
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.database.postgres import SessionLocal
+from app.models.group import Group
+from app.models.user import User
+
+# Load environment variables
+load_dotenv()
+
+# Directory settings
+DIRECTORY_REFRESH_SECONDS = float(os.getenv("DIRECTORY_REFRESH_SECONDS", "300"))
+
+ID_SIZE = 16
+
+logger = logging.getLogger(__name__)
+
+
+class NameTable:
+    """Immutable id→name table packed into three flat buffers.
+
+    Ids are stored as sorted 16-byte UUIDs and found by binary search; the
+    names live in one UTF-8 blob addressed through an offset array. For 50k
+    users that is about 2.6 MB, a third of a dict of UUIDs and strings.
+    """
+
+    def __init__(self, items: Iterable[Tuple[UUID, str]] = ()):
+        pairs = sorted((id_.bytes, name.encode()) for id_, name in items)
+        self._ids = b"".join(id_bytes for id_bytes, _ in pairs)
+        self._names = b"".join(name for _, name in pairs)
+        self._offsets = array("I", [0])
+        for _, name in pairs:
+            self._offsets.append(self._offsets[-1] + len(name))
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def get(self, id_: UUID) -> Optional[str]:
+        """Look up a name by id."""
+        key = id_.bytes
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            if self._ids[middle * ID_SIZE : (middle + 1) * ID_SIZE] < key:
+                low = middle + 1
+            else:
+                high = middle
+        if self._ids[low * ID_SIZE : (low + 1) * ID_SIZE] != key:
+            return None
+        return self._names[self._offsets[low] : self._offsets[low + 1]].decode()
+
+    def nbytes(self) -> int:
+        """Memory used by the buffers."""
+        return (
+            len(self._ids)
+            + len(self._names)
+            + self._offsets.itemsize * len(self._offsets)
+        )
+
+
+def _changed_since(current: Dict, previous: Dict) -> Dict:
+    return {
+        key: value
+        for key, value in current.items()
+        if key not in previous or previous[key] != value
+    }
+
+
+class Directory:
+    """Versioned in-memory directory of group and user names.
+
+    Full snapshots are loaded from the database periodically. Writes in this
+    process go to a small overlay that takes precedence until the next
+    snapshot, and ids missing from both are fetched from the database.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._groups = NameTable()
+        self._users = NameTable()
+        # None marks an entry deleted since the snapshot
+        self._group_overlay: Dict[UUID, Optional[str]] = {}
+        self._user_overlay: Dict[UUID, Optional[str]] = {}
+
+    async def load(self):
+        """Load a fresh snapshot of all names."""
+        group_overlay = dict(self._group_overlay)
+        user_overlay = dict(self._user_overlay)
+
+        async with SessionLocal() as session:
+            groups = (await session.execute(select(Group.id, Group.name))).all()
+            users = (await session.execute(select(User.id, User.full_name))).all()
+
+        # Overlay entries were committed before the snapshot was read, except
+        # those written while it was loading
+        self._groups = await asyncio.to_thread(NameTable, groups)
+        self._users = await asyncio.to_thread(NameTable, users)
+        self._group_overlay = _changed_since(self._group_overlay, group_overlay)
+        self._user_overlay = _changed_since(self._user_overlay, user_overlay)
+        self.version += 1
+
+    def set_group(self, group_id: UUID, name: str):
+        """Record a created or renamed group."""
+        self._group_overlay[group_id] = name
+        self.version += 1
+
+    def remove_group(self, group_id: UUID):
+        """Record a deleted group."""
+        self._group_overlay[group_id] = None
+        self.version += 1
+
+    def set_user(self, user_id: UUID, full_name: str):
+        """Record a created or renamed user."""
+        self._user_overlay[user_id] = full_name
+        self.version += 1
+
+    async def group_names(
+        self, db: AsyncSession, group_ids: Iterable[UUID]
+    ) -> Dict[UUID, str]:
+        """Get names of groups by id."""
+        return await self._names(
+            db, group_ids, self._groups, self._group_overlay, Group.id, Group.name
+        )
+
+    async def user_names(
+        self, db: AsyncSession, user_ids: Iterable[UUID]
+    ) -> Dict[UUID, str]:
+        """Get full names of users by id."""
+        return await self._names(
+            db, user_ids, self._users, self._user_overlay, User.id, User.full_name
+        )
+
+    async def _names(self, db, ids, table, overlay, id_column, name_column):
+        names = {}
+        missing: List[UUID] = []
+        for id_ in set(ids):
+            name = overlay[id_] if id_ in overlay else table.get(id_)
+            if name is None:
+                missing.append(id_)
+            else:
+                names[id_] = name
+
+        # Created by another worker since the last snapshot
+        if missing:
+            result = await db.execute(
+                select(id_column, name_column).where(id_column.in_(missing))
+            )
+            for id_, name in result.all():
+                overlay[id_] = name
+                names[id_] = name
+        return names
+
+    def stats(self) -> Dict[str, int]:
+        """Describe the size of the directory."""
+        return {
+            "version": self.version,
+            "groups": len(self._groups),
+            "users": len(self._users),
+            "overlay": len(self._group_overlay) + len(self._user_overlay),
+            "bytes": self._groups.nbytes() + self._users.nbytes(),
+        }
+
+
+# Directory of this process and its refresh task
+directory = Directory()
+_refresh_task: Optional[asyncio.Task] = None
+
+
+async def _refresh_loop():
+    while True:
+        await asyncio.sleep(DIRECTORY_REFRESH_SECONDS)
+        try:
+            await directory.load()
+        except Exception as e:
+            logger.error("Failed to refresh name directory: %s", e)
+
+
+async def start_directory():
+    """Load the directory and keep refreshing it."""
+    global _refresh_task
+
+    try:
+        await directory.load()
+    except Exception as e:
+        # Lookups fall back to the database until the next refresh
+        logger.error("Failed to load name directory: %s", e)
+    if DIRECTORY_REFRESH_SECONDS > 0:
+        _refresh_task = asyncio.create_task(_refresh_loop())
+
+
+async def stop_directory():
+    """Stop refreshing the directory."""
+    global _refresh_task
+
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+        await asyncio.gather(_refresh_task, return_exceptions=True)
+    _refresh_task = None
@@ -0,0 +1,103 @@
+import os
+import zipfile
+from typing import Any, Dict, Iterator, List, Set
+
+from app.services.file_storage import get_original_length, iter_file_content
+
+# Formats that are already compressed gain nothing from deflate, so they are
+# stored as-is to save CPU
+STORED_CONTENT_TYPES = {
+    "image/jpeg",
+    "image/png",
+    "image/gif",
+    "application/pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+}
+
+
+class _ZipSink:
+    """Write-only, non-seekable target for ZipFile.
+
+    ZipFile falls back to data descriptors when it cannot seek, so every byte
+    it writes can be handed to the client as soon as it is produced.
+    """
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._offset = 0
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _unique_name(filename: str, used: Set[str]) -> str:
+    """Make archive member names unique within one archive."""
+    name = filename.replace("/", "_").replace("\\", "_") or "unnamed_file"
+    base, ext = os.path.splitext(name)
+    counter = 1
+    while name in used:
+        name = f"{base} ({counter}){ext}"
+        counter += 1
+    used.add(name)
+    return name
+
+
+def iter_zip_archive(files: List[Dict[str, Any]]) -> Iterator[bytes]:
+    """Stream a ZIP archive of GridFS files chunk by chunk.
+
+    `files` are dicts as returned by `get_file`. Only one GridFS chunk is held
+    in memory at a time.
+    """
+    sink = _ZipSink()
+    used_names: Set[str] = set()
+
+    with zipfile.ZipFile(sink, mode="w", allowZip64=True) as archive:
+        for file_info in files:
+            upload_date = (file_info.get("metadata") or {}).get("upload_date")
+
+            zinfo = zipfile.ZipInfo(
+                _unique_name(file_info["filename"], used_names),
+                date_time=(
+                    upload_date.timetuple()[:6]
+                    if upload_date
+                    else (1980, 1, 1, 0, 0, 0)
+                ),
+            )
+            zinfo.external_attr = 0o644 << 16
+            zinfo.compress_type = (
+                zipfile.ZIP_STORED
+                if file_info["content_type"] in STORED_CONTENT_TYPES
+                else zipfile.ZIP_DEFLATED
+            )
+            # Lets ZipFile decide on zip64 headers before the data is written
+            zinfo.file_size = get_original_length(file_info)
+
+            with archive.open(zinfo, mode="w") as entry:
+                # Files stored compressed in GridFS are decoded on the fly
+                for chunk in iter_file_content(file_info):
+                    entry.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+
+            data = sink.drain()
+            if data:
+                yield data
+
+    # Central directory
+    yield sink.drain()
@@ -0,0 +1,303 @@
+import logging
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, BinaryIO, Dict, Iterator, NamedTuple, Optional
+
+import anyio
+from dotenv import load_dotenv
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from app.services.metrics import gridfs_bytes_read_total
+
+# Load environment variables
+load_dotenv()
+
+# File cache configuration
+FILE_CACHE_DIR = os.getenv("FILE_CACHE_DIR", "/tmp/university_app_file_cache")
+FILE_CACHE_MAX_BYTES = int(
+    os.getenv("FILE_CACHE_MAX_BYTES", str(512 * 1024 * 1024))
+)
+FILE_CACHE_MAX_FILE_BYTES = int(
+    os.getenv("FILE_CACHE_MAX_FILE_BYTES", str(64 * 1024 * 1024))
+)
+
+# Subdirectory of FILE_CACHE_DIR used by each worker process, plus its pid
+PROCESS_DIR_PREFIX = "worker-"
+
+# ASGI extension that lets the server hand the file descriptor to sendfile()
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+logger = logging.getLogger(__name__)
+
+
+class CachedFile(NamedTuple):
+    """An open handle to a file served from the disk cache."""
+
+    file: BinaryIO
+    size: int
+    filename: str
+    content_type: str
+    content_encoding: Optional[str]
+
+
+class _CacheEntry(NamedTuple):
+    path: str
+    size: int
+    filename: str
+    content_type: str
+    content_encoding: Optional[str]
+
+
+class FileCache:
+    """Byte-bounded LRU cache of GridFS files on local disk."""
+
+    def __init__(self, directory: str, max_bytes: int, max_file_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_file_bytes = min(max_file_bytes, max_bytes)
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_served = 0
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Entries are only tracked in memory, so files left over from a
+        # previous process can never be served and are removed up front.
+        # The directory must belong to this process alone.
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+
+    def open(self, file_id: str) -> Optional[CachedFile]:
+        """Open a cached file, marking it as most recently used."""
+        with self._lock:
+            entry = self._entries.get(file_id)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            # Open under the lock so a concurrent eviction cannot unlink the
+            # file first; an already open descriptor survives the unlink
+            try:
+                handle = open(entry.path, "rb")
+            except FileNotFoundError:
+                self._remove(file_id)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(file_id)
+            self.hits += 1
+
+        return CachedFile(handle, *entry[1:])
+
+    def store(self, file_id: str, file_info: Dict[str, Any]) -> Optional[CachedFile]:
+        """Copy a GridFS file into the cache and return an open handle to it.
+
+        The stored bytes are kept as they are in GridFS, so compressed files
+        stay compressed on disk. Returns None when the file is too large to
+        be cached.
+        """
+        grid_out = file_info["file"]
+        size = grid_out.length
+        if size > self.max_file_bytes:
+            return None
+
+        # Write to a temporary name first so readers never see partial files
+        path = os.path.join(self.directory, file_id)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "wb") as out:
+                chunk = grid_out.readchunk()
+                while chunk:
+                    out.write(chunk)
+                    chunk = grid_out.readchunk()
+            os.replace(tmp_path, path)
+            gridfs_bytes_read_total.inc(size)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        entry = _CacheEntry(
+            path,
+            size,
+            file_info["filename"],
+            file_info["content_type"],
+            (file_info["metadata"] or {}).get("content_encoding"),
+        )
+        with self._lock:
+            if file_id in self._entries:
+                self.total_bytes -= self._entries[file_id].size
+            self._entries[file_id] = entry
+            self.total_bytes += size
+            self._evict()
+            handle = open(path, "rb")
+
+        return CachedFile(handle, *entry[1:])
+
+    def invalidate(self, file_id: str):
+        """Drop a file from the cache."""
+        with self._lock:
+            self._remove(file_id)
+
+    def record_served(self, nbytes: int):
+        """Account bytes sent to a client from the cache."""
+        with self._lock:
+            self.bytes_served += nbytes
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache hit/miss statistics."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "total_bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "miss_rate": self.misses / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "bytes_served": self.bytes_served,
+            }
+
+    def _evict(self):
+        # Caller must hold the lock. The newest entry is never evicted
+        # because store() caps single files at max_bytes.
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            file_id = next(iter(self._entries))
+            self._remove(file_id)
+            self.evictions += 1
+
+    def _remove(self, file_id: str):
+        # Caller must hold the lock
+        entry = self._entries.pop(file_id, None)
+        if entry is None:
+            return
+        self.total_bytes -= entry.size
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+class CachedFileResponse(Response):
+    """Stream a cached file, using zero-copy sendfile when the server can."""
+
+    chunk_size = 64 * 1024
+
+    def __init__(self, cached: CachedFile, headers: Optional[Dict[str, str]] = None):
+        super().__init__(
+            content=None,
+            media_type=cached.content_type,
+            headers=headers,
+        )
+        self.cached = cached
+        self.headers["content-length"] = str(cached.size)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+        try:
+            if ZEROCOPY_EXTENSION in scope.get("extensions", {}):
+                await send(
+                    {
+                        "type": ZEROCOPY_EXTENSION,
+                        "file": self.cached.file,
+                        "count": self.cached.size,
+                    }
+                )
+            else:
+                more_body = True
+                while more_body:
+                    chunk = await anyio.to_thread.run_sync(
+                        self.cached.file.read, self.chunk_size
+                    )
+                    more_body = len(chunk) == self.chunk_size
+                    await send(
+                        {
+                            "type": "http.response.body",
+                            "body": chunk,
+                            "more_body": more_body,
+                        }
+                    )
+        finally:
+            self.cached.file.close()
+
+        if file_cache:
+            file_cache.record_served(self.cached.size)
+        if self.background is not None:
+            await self.background()
+
+
+def iter_cached_file(cached: CachedFile, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Iterate over a cached file chunk by chunk, closing it at the end."""
+    try:
+        chunk = cached.file.read(chunk_size)
+        while chunk:
+            yield chunk
+            chunk = cached.file.read(chunk_size)
+    finally:
+        cached.file.close()
+
+    if file_cache:
+        file_cache.record_served(cached.size)
+
+
+# Disk cache instance (None when disabled)
+file_cache: Optional[FileCache] = None
+
+
+def init_file_cache():
+    """Create the disk cache if it is enabled."""
+    global file_cache
+
+    if FILE_CACHE_MAX_BYTES <= 0:
+        logger.info("File cache disabled")
+        return
+
+    # Every worker process keeps its own cache in its own subdirectory
+    remove_stale_cache_dirs(FILE_CACHE_DIR)
+    directory = os.path.join(FILE_CACHE_DIR, f"{PROCESS_DIR_PREFIX}{os.getpid()}")
+    file_cache = FileCache(directory, FILE_CACHE_MAX_BYTES, FILE_CACHE_MAX_FILE_BYTES)
+    logger.info("File cache enabled at %s", directory)
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Exists, but belongs to another user
+        pass
+    return True
+
+
+def remove_stale_cache_dirs(base_directory: str):
+    """Remove the cache directories of worker processes that have exited."""
+    try:
+        names = os.listdir(base_directory)
+    except FileNotFoundError:
+        return
+
+    for name in names:
+        pid = name[len(PROCESS_DIR_PREFIX) :]
+        if name.startswith(PROCESS_DIR_PREFIX) and pid.isdigit():
+            if int(pid) != os.getpid() and not _process_alive(int(pid)):
+                shutil.rmtree(os.path.join(base_directory, name), ignore_errors=True)
+
+
+def get_file_cache() -> Optional[FileCache]:
+    """Get the disk cache instance for file downloads."""
+    return file_cache
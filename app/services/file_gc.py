@@ -0,0 +1,232 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+from dotenv import load_dotenv
+from sqlalchemy import func, text
+from sqlalchemy.future import select
+
+from app.database import mongodb
+from app.database.postgres import SessionLocal
+from app.models.assignment import Assignment
+from app.services.file_cache import get_file_cache
+from app.services.upload_sessions import cleanup_expired_sessions
+
+# Load environment variables
+load_dotenv()
+
+# Garbage collection settings
+FILE_GC_INTERVAL_SECONDS = float(os.getenv("FILE_GC_INTERVAL_SECONDS", "3600"))
+FILE_GC_GRACE_SECONDS = float(os.getenv("FILE_GC_GRACE_SECONDS", "86400"))
+FILE_DELETE_BATCH_SIZE = int(os.getenv("FILE_DELETE_BATCH_SIZE", "500"))
+FILE_DELETE_FLUSH_SECONDS = 1.0
+
+# Advisory lock key so only one API worker sweeps at a time
+FILE_GC_LOCK_KEY = 0x6C6366696C6573
+
+# Pending deletions and background tasks
+_deletion_queue: Optional[asyncio.Queue] = None
+_tasks: List[asyncio.Task] = []
+
+logger = logging.getLogger(__name__)
+
+
+def _object_ids(file_ids: Iterable[str]) -> List[ObjectId]:
+    obj_ids = []
+    for file_id in file_ids:
+        try:
+            obj_ids.append(ObjectId(file_id))
+        except (InvalidId, TypeError):
+            logger.warning("Skipping invalid file id %s", file_id)
+    return obj_ids
+
+
+async def delete_files_bulk(file_ids: Iterable[str]) -> Dict[str, int]:
+    """Delete GridFS files and their derived artifacts in bulk."""
+    db = mongodb.db
+    obj_ids = _object_ids(file_ids)
+    if not obj_ids:
+        return {"deleted_files": 0, "reclaimed_bytes": 0}
+
+    # Thumbnails and previews go together with their originals
+    derived = db.fs.files.find(
+        {"metadata.derived_from": {"$in": [str(obj_id) for obj_id in obj_ids]}},
+        {"_id": 1},
+    )
+    obj_ids.extend([doc["_id"] async for doc in derived])
+
+    reclaimed_bytes = 0
+    async for doc in db.fs.files.find(
+        {"_id": {"$in": obj_ids}}, {"length": 1}
+    ):
+        reclaimed_bytes += doc.get("length", 0)
+
+    # Chunks go first: if we crash in between, the remaining file document
+    # is unreferenced and the next sweep picks it up
+    await db.fs.chunks.delete_many({"files_id": {"$in": obj_ids}})
+    result = await db.fs.files.delete_many({"_id": {"$in": obj_ids}})
+
+    cache = get_file_cache()
+    if cache:
+        for obj_id in obj_ids:
+            cache.invalidate(str(obj_id))
+
+    return {
+        "deleted_files": result.deleted_count,
+        "reclaimed_bytes": reclaimed_bytes,
+    }
+
+
+def schedule_file_deletion(file_ids: Iterable[str]):
+    """Queue files for asynchronous, batched deletion."""
+    if _deletion_queue is None:
+        # Not started (e.g. in scripts); the sweep will collect them later
+        return
+
+    for file_id in file_ids:
+        _deletion_queue.put_nowait(file_id)
+
+
+async def _deletion_loop():
+    while True:
+        batch = [await _deletion_queue.get()]
+
+        # Gather what else arrives within the flush window
+        deadline = time.monotonic() + FILE_DELETE_FLUSH_SECONDS
+        while len(batch) < FILE_DELETE_BATCH_SIZE:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(
+                    await asyncio.wait_for(_deletion_queue.get(), timeout)
+                )
+            except asyncio.TimeoutError:
+                break
+
+        try:
+            await delete_files_bulk(batch)
+        except Exception as e:
+            # Unreferenced files are collected by the next sweep
+            logger.error("Failed to delete %s files: %s", len(batch), e)
+
+
+async def sweep_orphaned_files(
+    grace_seconds: float = FILE_GC_GRACE_SECONDS,
+) -> Dict[str, Any]:
+    """Mark-and-sweep GridFS files no assignment references any more.
+
+    Files younger than the grace period are kept so uploads whose
+    assignment commit is still in flight are never collected.
+    """
+    started = time.monotonic()
+    report = {
+        "scanned_files": 0,
+        "deleted_files": 0,
+        "reclaimed_bytes": 0,
+        "skipped": False,
+    }
+
+    async with SessionLocal() as session:
+        locked = await session.scalar(
+            text("SELECT pg_try_advisory_xact_lock(:key)"),
+            {"key": FILE_GC_LOCK_KEY},
+        )
+        if not locked:
+            report["skipped"] = True
+            return report
+
+        # Mark
+        referenced = set()
+        result = await session.stream_scalars(
+            select(func.unnest(Assignment.file_ids))
+        )
+        async for file_id in result:
+            referenced.add(file_id)
+
+        # Sweep
+        cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+        cursor = mongodb.db.fs.files.find(
+            {"uploadDate": {"$lt": cutoff}},
+            {"_id": 1, "metadata.derived_from": 1},
+        )
+        orphans = []
+        async for doc in cursor:
+            report["scanned_files"] += 1
+            file_id = str(doc["_id"])
+            parent_id = (doc.get("metadata") or {}).get("derived_from")
+            if file_id in referenced or parent_id in referenced:
+                continue
+
+            orphans.append(file_id)
+            if len(orphans) >= FILE_DELETE_BATCH_SIZE:
+                deleted = await delete_files_bulk(orphans)
+                report["deleted_files"] += deleted["deleted_files"]
+                report["reclaimed_bytes"] += deleted["reclaimed_bytes"]
+                orphans = []
+
+        if orphans:
+            deleted = await delete_files_bulk(orphans)
+            report["deleted_files"] += deleted["deleted_files"]
+            report["reclaimed_bytes"] += deleted["reclaimed_bytes"]
+
+    report["duration_seconds"] = time.monotonic() - started
+    return report
+
+
+async def _sweep_loop():
+    while True:
+        await asyncio.sleep(FILE_GC_INTERVAL_SECONDS)
+        try:
+            report = await sweep_orphaned_files()
+            if not report["skipped"]:
+                logger.info(
+                    "File GC: deleted %s orphaned files, reclaimed %s bytes in %.1fs",
+                    report["deleted_files"],
+                    report["reclaimed_bytes"],
+                    report["duration_seconds"],
+                )
+        except Exception as e:
+            logger.error("File GC failed: %s", e)
+
+        try:
+            expired = await cleanup_expired_sessions()
+            if expired:
+                logger.info("File GC: removed %s expired upload sessions", expired)
+        except Exception as e:
+            logger.error("Upload session cleanup failed: %s", e)
+
+
+def start_file_gc():
+    """Start the batched deleter and the periodic sweep."""
+    global _deletion_queue
+
+    _deletion_queue = asyncio.Queue()
+    _tasks.append(asyncio.create_task(_deletion_loop()))
+    if FILE_GC_INTERVAL_SECONDS > 0:
+        _tasks.append(asyncio.create_task(_sweep_loop()))
+
+
+async def stop_file_gc():
+    """Flush pending deletions and stop background tasks."""
+    global _deletion_queue
+
+    pending = []
+    while _deletion_queue and not _deletion_queue.empty():
+        pending.append(_deletion_queue.get_nowait())
+
+    for task in _tasks:
+        task.cancel()
+    _tasks.clear()
+    _deletion_queue = None
+
+    if pending:
+        try:
+            await delete_files_bulk(pending)
+        except Exception as e:
+            logger.error("Failed to delete %s files: %s", len(pending), e)
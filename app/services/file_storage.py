@@ -1,11 +1,47 @@
+import logging
 import os
-from typing import BinaryIO, Optional, Dict, Any
+import zlib
+from typing import BinaryIO, Optional, Dict, Any, Iterable, Iterator, Tuple
 from fastapi import HTTPException, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
 from bson.objectid import ObjectId
 from datetime import datetime
+from dotenv import load_dotenv
 import mimetypes
 
 from app.database.mongodb import get_gridfs
+from app.services.file_cache import CachedFile, get_file_cache
+from app.services.metrics import gridfs_bytes_read_total, gridfs_bytes_written_total
+from app.services.request_timing import timed
+
+# Load environment variables
+load_dotenv()
+
+# Compression settings
+FILE_COMPRESSION_LEVEL = int(os.getenv("FILE_COMPRESSION_LEVEL", "6"))
+# Sampled types are only compressed if the sample shrinks below this ratio
+FILE_COMPRESSION_MIN_RATIO = float(
+    os.getenv("FILE_COMPRESSION_MIN_RATIO", "0.8")
+)
+COMPRESSION_SAMPLE_SIZE = 256 * 1024
+UPLOAD_READ_SIZE = 1024 * 1024
+
+# Content types that are always worth compressing
+COMPRESSIBLE_CONTENT_TYPES = {
+    "text/plain",
+    "application/msword",
+    "application/vnd.ms-excel",
+    "application/vnd.ms-powerpoint",
+}
+# Content types that are compressed only when a sample compresses well
+# (PDFs with uncompressed content streams or embedded fonts)
+SAMPLED_CONTENT_TYPES = {"application/pdf"}
+
+GZIP_ENCODING = "gzip"
+# wbits for zlib to read and write the gzip container
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+logger = logging.getLogger(__name__)
 
 
 def validate_file_type(content_type: str, filename: str) -> bool:
@@ -43,6 +79,7 @@ def create_file_metadata(
     }
 
 
+@timed("files")
 async def upload_file(file: UploadFile, assignment_id: str) -> str:
     """Upload a file to GridFS."""
     fs = get_gridfs()
@@ -65,14 +102,27 @@ async def upload_file(file: UploadFile, assignment_id: str) -> str:
     # Create metadata
     metadata = create_file_metadata(assignment_id, filename, content_type)
 
-    # Store file in GridFS
+    # Store file in GridFS; compressing and writing block, so keep them
+    # off the event loop
     try:
-        file_id = fs.put(
-            file.file,
-            filename=filename,
-            metadata=metadata,
-            content_type=content_type,
-        )
+        if content_type in COMPRESSIBLE_CONTENT_TYPES | SAMPLED_CONTENT_TYPES:
+            file_id = await run_in_threadpool(
+                store_compressible_file,
+                fs,
+                file.file,
+                filename,
+                content_type,
+                metadata,
+            )
+        else:
+            file_id = await run_in_threadpool(
+                fs.put,
+                file.file,
+                filename=filename,
+                metadata=metadata,
+                content_type=content_type,
+            )
+            gridfs_bytes_written_total.inc(file.file.tell())
         return str(file_id)
     except Exception as e:
         raise HTTPException(
@@ -81,6 +131,139 @@ async def upload_file(file: UploadFile, assignment_id: str) -> str:
         )
 
 
+def store_compressible_file(
+    fs, source: BinaryIO, filename: str, content_type: str, metadata: Dict[str, Any]
+):
+    """Store a file in GridFS gzip-compressed when it pays off.
+
+    Compressed files get `content_encoding` and `original_length` in their
+    metadata so downloads can pass the stream through or decode it.
+    """
+    sample = source.read(COMPRESSION_SAMPLE_SIZE)
+
+    def read_source() -> Iterator[bytes]:
+        data = sample
+        while data:
+            yield data
+            data = source.read(UPLOAD_READ_SIZE)
+
+    if content_type in SAMPLED_CONTENT_TYPES and sample:
+        ratio = len(zlib.compress(sample, FILE_COMPRESSION_LEVEL)) / len(sample)
+        if ratio > FILE_COMPRESSION_MIN_RATIO:
+            grid_in = fs.new_file(
+                filename=filename, metadata=metadata, content_type=content_type
+            )
+            _write_grid_file(grid_in, read_source())
+            grid_in.close()
+            return grid_in._id
+
+    compressor = zlib.compressobj(FILE_COMPRESSION_LEVEL, zlib.DEFLATED, GZIP_WBITS)
+    original_length = 0
+
+    def compress_source() -> Iterator[bytes]:
+        nonlocal original_length
+        for data in read_source():
+            original_length += len(data)
+            yield compressor.compress(data)
+        yield compressor.flush()
+
+    grid_in = fs.new_file(filename=filename, content_type=content_type)
+    _write_grid_file(grid_in, compress_source())
+    # The file document is only written on close
+    grid_in.metadata = {
+        **metadata,
+        "content_encoding": GZIP_ENCODING,
+        "original_length": original_length,
+    }
+    grid_in.close()
+    return grid_in._id
+
+
+def _write_grid_file(grid_in, chunks: Iterable[bytes]):
+    """Write chunks to a GridFS file, removing partial chunks on failure."""
+    try:
+        for chunk in chunks:
+            grid_in.write(chunk)
+            gridfs_bytes_written_total.inc(len(chunk))
+    except Exception:
+        grid_in.abort()
+        raise
+
+
+def get_content_encoding(metadata: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Get the encoding a file is stored with, if any."""
+    return (metadata or {}).get("content_encoding")
+
+
+def get_original_length(file_info: Dict[str, Any]) -> int:
+    """Get the decoded size of a file."""
+    metadata = file_info["metadata"] or {}
+    return metadata.get("original_length", file_info["file"].length)
+
+
+def accepts_encoding(accept_encoding: Optional[str], encoding: str) -> bool:
+    """Check an Accept-Encoding header for an encoding."""
+    for item in (accept_encoding or "").split(","):
+        name, _, params = item.strip().partition(";")
+        if name.strip().lower() not in (encoding, "*"):
+            continue
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                return float(params[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+def decode_chunks(
+    chunks: Iterable[bytes], encoding: Optional[str]
+) -> Iterator[bytes]:
+    """Decode a stream of stored chunks into the original content."""
+    if encoding != GZIP_ENCODING:
+        yield from chunks
+        return
+
+    decompressor = zlib.decompressobj(GZIP_WBITS)
+    for chunk in chunks:
+        data = decompressor.decompress(chunk)
+        if data:
+            yield data
+    data = decompressor.flush()
+    if data:
+        yield data
+
+
+def iter_file_content(file_info: Dict[str, Any]) -> Iterator[bytes]:
+    """Iterate over the decoded content of a GridFS file chunk by chunk."""
+    grid_out = file_info["file"]
+    return decode_chunks(
+        count_read_chunks(iter(grid_out.readchunk, b"")),
+        get_content_encoding(file_info["metadata"]),
+    )
+
+
+def count_read_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Pass chunks read from GridFS through, counting their bytes."""
+    for chunk in chunks:
+        gridfs_bytes_read_total.inc(len(chunk))
+        yield chunk
+
+
+def read_stored_content(file_info: Dict[str, Any]) -> bytes:
+    """Read the content of a GridFS file as stored, without decoding."""
+    content = file_info["file"].read()
+    gridfs_bytes_read_total.inc(len(content))
+    return content
+
+
+def read_file_content(file_info: Dict[str, Any]) -> bytes:
+    """Read the whole decoded content of a GridFS file."""
+    return b"".join(iter_file_content(file_info))
+
+
+@timed("files")
 def get_file(file_id: str):
     """Get a file from GridFS."""
     fs = get_gridfs()
@@ -113,6 +296,7 @@ def get_file(file_id: str):
         )
 
 
+@timed("files")
 def delete_file(file_id: str) -> bool:
     """Delete a file from GridFS."""
     fs = get_gridfs()
@@ -131,9 +315,47 @@ def delete_file(file_id: str) -> bool:
             )
 
         fs.delete(obj_id)
+
+        # Remove thumbnails and previews generated by the processing worker
+        for derived in fs.find({"metadata.derived_from": file_id}):
+            fs.delete(derived._id)
+
+        cache = get_file_cache()
+        if cache:
+            cache.invalidate(file_id)
+
         return True
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to delete file: {str(e)}",
         )
+
+
+@timed("files")
+def open_cached_file(
+    file_id: str,
+) -> Tuple[Optional[CachedFile], Optional[Dict[str, Any]]]:
+    """Open a file through the disk cache, filling it from GridFS on a miss.
+
+    Returns the cached file, or the GridFS file info when the file was read
+    from GridFS but could not be cached, so callers need not open it again.
+    Both are None when the cache is disabled. Blocks on GridFS on a miss,
+    so call it from a thread.
+    """
+    cache = get_file_cache()
+    if not cache:
+        return None, None
+
+    cached = cache.open(file_id)
+    if cached:
+        return cached, None
+
+    file_info = get_file(file_id)
+    try:
+        return cache.store(file_id, file_info), file_info
+    except OSError as e:
+        logger.warning("Failed to cache file %s: %s", file_id, e)
+        # The copy may have stopped part way through
+        file_info["file"].seek(0)
+        return None, file_info
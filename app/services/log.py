@@ -0,0 +1,208 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from starlette.datastructures import MutableHeaders
+
+from app.services.metrics import log_records_dropped_total, log_records_sampled_total
+
+# Load environment variables
+load_dotenv()
+
+# Logging settings
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Records with the same message template passed per window; 0 disables sampling
+LOG_SAMPLE_BURST = int(os.getenv("LOG_SAMPLE_BURST", "20"))
+LOG_SAMPLE_WINDOW_SECONDS = float(os.getenv("LOG_SAMPLE_WINDOW_SECONDS", "1"))
+# Beyond the burst, one record in this many is passed
+LOG_SAMPLE_RATE = int(os.getenv("LOG_SAMPLE_RATE", "100"))
+
+REQUEST_ID_HEADER = "X-Request-ID"
+_REQUEST_ID_PATTERN = re.compile(r"^[\w.-]{1,64}$")
+# Message templates tracked by the sampler before its state is reset
+MAX_SAMPLED_TEMPLATES = 1000
+
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+_listener: Optional[QueueListener] = None
+_handler: Optional[QueueHandler] = None
+
+
+def current_request_id() -> Optional[str]:
+    """Get the correlation id of the request being handled, if any."""
+    return _request_id.get()
+
+
+class SamplingFilter(logging.Filter):
+    """Pass a burst of records per message template, then one in N.
+
+    Records are keyed by logger and unformatted message, so log with
+    `%s` arguments rather than f-strings. Errors are never sampled. The
+    next record passed carries how many similar ones were dropped.
+    """
+
+    def __init__(self, burst: int, window: float, rate: int):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.rate = rate
+        # Window start, records seen and records dropped per template
+        self._templates: Dict[Tuple[str, str], List] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not self.burst or record.levelno >= logging.ERROR:
+            return True
+
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        state = self._templates.get(key)
+        if state is None or now - state[0] >= self.window:
+            if len(self._templates) >= MAX_SAMPLED_TEMPLATES:
+                self._templates.clear()
+            dropped = state[2] if state else 0
+            state = self._templates[key] = [now, 0, dropped]
+
+        state[1] += 1
+        if state[1] > self.burst and (state[1] - self.burst) % self.rate:
+            state[2] += 1
+            log_records_sampled_total.inc()
+            return False
+
+        if state[2]:
+            record.suppressed = state[2]
+            state[2] = 0
+        return True
+
+
+class ContextFilter(logging.Filter):
+    """Attach the request's correlation id while still in its context."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Hand records to the listener thread, dropping them when it lags."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting happens on the listener thread; only fix the message
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_records_dropped_total.inc()
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        suppressed = getattr(record, "suppressed", None)
+        if suppressed:
+            entry["suppressed"] = suppressed
+        # Structured data passed as `extra={"fields": {...}}`
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def configure_logging():
+    """Send the app's logs through a queue to a JSON writer thread."""
+    global _listener, _handler
+
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter())
+
+    _handler = NonBlockingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    _handler.addFilter(
+        SamplingFilter(LOG_SAMPLE_BURST, LOG_SAMPLE_WINDOW_SECONDS, LOG_SAMPLE_RATE)
+    )
+    _handler.addFilter(ContextFilter())
+
+    logger = logging.getLogger("app")
+    logger.setLevel(LOG_LEVEL)
+    logger.addHandler(_handler)
+    logger.propagate = False
+
+    _listener = QueueListener(_handler.queue, output)
+    _listener.start()
+
+
+def stop_logging():
+    """Write out queued records and stop the writer thread."""
+    global _listener, _handler
+
+    if _listener is None:
+        return
+
+    logger = logging.getLogger("app")
+    logger.removeHandler(_handler)
+    logger.propagate = True
+    _listener.stop()
+    _listener = None
+    _handler = None
+
+
+# Queued records are written out if the process exits without a shutdown
+atexit.register(stop_logging)
+
+
+class RequestIdMiddleware:
+    """Give each request a correlation id, taken from X-Request-ID if sent."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")
+                break
+        if not request_id or not _REQUEST_ID_PATTERN.match(request_id):
+            request_id = uuid.uuid4().hex
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append(REQUEST_ID_HEADER, request_id)
+            await send(message)
+
+        token = _request_id.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            _request_id.reset(token)
+
@@ -0,0 +1,248 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from app.services.metrics import (
+    event_loop_blocks_total,
+    event_loop_lag_seconds,
+    request_method,
+    route_label,
+)
+
+# Load environment variables
+load_dotenv()
+
+# Loop watchdog settings
+LOOP_WATCHDOG_ENABLED = os.getenv("LOOP_WATCHDOG_ENABLED", "true").lower() == "true"
+# How often the watchdog pings the loop; blocks shorter than this can go unseen
+LOOP_LAG_INTERVAL_SECONDS = float(os.getenv("LOOP_LAG_INTERVAL_MS", "20")) / 1000
+LOOP_BLOCK_THRESHOLD_SECONDS = float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "100")) / 1000
+LOOP_BLOCK_STACK_DEPTH = 30
+
+BACKGROUND_ROUTE = "background"
+
+logger = logging.getLogger(__name__)
+
+# Requests being handled, by the task serving them
+_request_scopes: Dict[asyncio.Task, Dict[str, Any]] = {}
+_watchdog: Optional["LoopWatchdog"] = None
+_violations: Optional[List[Dict[str, Any]]] = None
+_enforced_threshold: Optional[float] = None
+
+
+class LoopWatchdog:
+    """Measure event-loop lag from a thread and report long blocks.
+
+    The thread schedules a callback on the loop and times how long it takes
+    to run. If it has not run halfway to the threshold, the loop thread's
+    stack and the request being served are captured, so a block is reported
+    with the code that caused it. Must be created on the loop's thread.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        interval: float = LOOP_LAG_INTERVAL_SECONDS,
+    ):
+        self.loop = loop
+        self.interval = interval
+        self._loop_thread = threading.get_ident()
+        self._stop = threading.Event()
+        self._answered = threading.Event()
+        self._answered_at = 0.0
+        # Notified when a ping is posted, a round is reported and on exit
+        self._progress = threading.Condition()
+        self._rounds = 0
+        self._exited = False
+        self._thread = threading.Thread(
+            target=self._run, name="loop-watchdog", daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _answer(self):
+        self._answered_at = time.perf_counter()
+        self._answered.set()
+
+    def drain(self, timeout: float):
+        """Wait until a block the loop has already got past is reported.
+
+        Blocks are reported by the thread once the loop answers the ping,
+        so a block that just ended may not have been reported yet.
+        """
+        with self._progress:
+            rounds = self._rounds
+            self._progress.wait_for(
+                lambda: self._rounds > rounds
+                or self._exited
+                # A stopped loop cannot be blocked by anything
+                or not (self._answered.is_set() or self.loop.is_running()),
+                timeout,
+            )
+
+    def _notify(self, finished_round: bool = False):
+        with self._progress:
+            if finished_round:
+                self._rounds += 1
+            self._progress.notify_all()
+
+    def _run(self):
+        try:
+            self._watch()
+        finally:
+            self._exited = True
+            self._notify()
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            threshold = _enforced_threshold or LOOP_BLOCK_THRESHOLD_SECONDS
+            self._answered.clear()
+            posted = time.perf_counter()
+            try:
+                self.loop.call_soon_threadsafe(self._answer)
+            except RuntimeError:
+                # The loop was closed
+                return
+            self._notify()
+
+            blocked = None
+            if not self._answered.wait(threshold / 2):
+                blocked = self._capture()
+                while not self._answered.wait(self.interval):
+                    if self._stop.is_set() or self.loop.is_closed():
+                        return
+
+            lag = self._answered_at - posted
+            event_loop_lag_seconds.observe(lag)
+            if lag >= threshold:
+                _report_block(lag, blocked)
+            self._notify(finished_round=True)
+
+    def _capture(self) -> Dict[str, Any]:
+        """Capture what the loop thread is running right now."""
+        frame = sys._current_frames().get(self._loop_thread)
+        stack = []
+        if frame is not None:
+            stack = traceback.StackSummary.extract(
+                traceback.walk_stack(frame),
+                limit=LOOP_BLOCK_STACK_DEPTH,
+                lookup_lines=False,
+            )
+        try:
+            task = asyncio.current_task(self.loop)
+        except RuntimeError:
+            task = None
+        return {
+            "task": task.get_name() if task else None,
+            "scope": _request_scopes.get(task) if task else None,
+            "stack": [
+                f"{entry.filename}:{entry.lineno} in {entry.name}"
+                for entry in reversed(stack)
+            ],
+        }
+
+
+def _report_block(lag: float, blocked: Optional[Dict[str, Any]]):
+    scope = blocked["scope"] if blocked else None
+    route = route_label(scope) if scope else BACKGROUND_ROUTE
+    event_loop_blocks_total.labels(route).inc()
+
+    block = {
+        "blocked_ms": round(lag * 1000, 1),
+        "method": request_method(scope) if scope else None,
+        "route": route,
+        "path": scope["path"] if scope else None,
+        "task": blocked["task"] if blocked else None,
+        # Missing when the block ended before it could be sampled
+        "stack": blocked["stack"] if blocked else None,
+    }
+    if _violations is not None:
+        if scope:
+            _violations.append(block)
+        return
+    logger.warning("loop_blocked", extra={"fields": block})
+
+
+def ensure_loop_watchdog():
+    """Watch the running loop, replacing a watchdog of an earlier loop."""
+    global _watchdog
+
+    loop = asyncio.get_running_loop()
+    if _watchdog is not None and _watchdog.loop is loop:
+        return
+    if _watchdog is not None:
+        _watchdog.stop()
+    _watchdog = LoopWatchdog(loop)
+    _watchdog.start()
+
+
+def start_loop_watchdog():
+    """Start watching the event loop of this worker."""
+    if LOOP_WATCHDOG_ENABLED:
+        ensure_loop_watchdog()
+
+
+def stop_loop_watchdog():
+    """Stop the watchdog thread."""
+    global _watchdog
+
+    if _watchdog is not None:
+        _watchdog.stop()
+        _watchdog = None
+
+
+def drain_loop_watchdog(timeout: float = 1.0):
+    """Wait for the watchdog to report blocks that have already ended."""
+    watchdog = _watchdog
+    if watchdog is not None:
+        watchdog.drain(timeout)
+
+
+def enforce_loop_blocks(max_ms: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Start collecting requests that block the loop; returns the list."""
+    global _violations, _enforced_threshold
+
+    _violations = []
+    _enforced_threshold = max_ms / 1000 if max_ms else None
+    return _violations
+
+
+def stop_enforcing_loop_blocks():
+    """Stop collecting blocks."""
+    global _violations, _enforced_threshold
+
+    _violations = None
+    _enforced_threshold = None
+
+
+class LoopWatchdogMiddleware:
+    """Remember which request each task serves, to attribute blocks."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (
+            LOOP_WATCHDOG_ENABLED or _violations is not None
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        ensure_loop_watchdog()
+        task = asyncio.current_task()
+        _request_scopes[task] = scope
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_scopes.pop(task, None)
@@ -0,0 +1,403 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Metrics settings
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+# Label combinations kept per metric; further ones are folded into "other"
+METRICS_MAX_SERIES = int(os.getenv("METRICS_MAX_SERIES", "500"))
+
+# Starlette appends the charset
+CONTENT_TYPE = "text/plain; version=0.0.4"
+OVERFLOW_LABEL = "other"
+UNMATCHED_ROUTE = "unmatched"
+KNOWN_METHODS = {"GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"}
+# Responses that stay open for as long as the client listens
+STREAMING_CONTENT_TYPES = (b"text/event-stream",)
+
+# Seconds; tuned for API requests and broker round trips
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(
+    names: Sequence[str], values: Sequence[str], extra: str = ""
+) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Registry:
+    """Metrics rendered by the /metrics endpoint."""
+
+    def __init__(self):
+        self._metrics: List["_Metric"] = []
+
+    def register(self, metric: "_Metric"):
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text format."""
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: Optional[Registry] = REGISTRY,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+        if not self.labelnames:
+            # Reported as zero before the first observation
+            self.labels()
+
+    def labels(self, *values: str):
+        """Get the series for a combination of label values."""
+        child = self._children.get(values)
+        if child is not None:
+            return child
+
+        with self._lock:
+            if values not in self._children:
+                if len(self._children) >= METRICS_MAX_SERIES:
+                    values = (OVERFLOW_LABEL,) * len(self.labelnames)
+                if values not in self._children:
+                    self._children[values] = self._new_child()
+            return self._children[values]
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _series(self):
+        with self._lock:
+            return list(self._children.items())
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self, lock: threading.Lock):
+        self.value = 0.0
+        self._lock = lock
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    """A value that only goes up."""
+
+    type_name = "counter"
+
+    def _new_child(self):
+        return _CounterChild(self._lock)
+
+    def inc(self, amount: float = 1):
+        """Increment a counter without labels."""
+        self.labels().inc(amount)
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, values)} "
+            f"{_format_value(child.value)}"
+            for values, child in self._series()
+        ]
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Gauge(_Metric):
+    """A value that goes up and down, or is read when scraped."""
+
+    type_name = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._function: Optional[Callable[[], float]] = None
+
+    def _new_child(self):
+        return _GaugeChild(self._lock)
+
+    def set_function(self, function: Callable[[], float]):
+        """Read the value from a function on every scrape."""
+        self._function = function
+
+    def samples(self) -> List[str]:
+        if self._function is not None:
+            return [f"{self.name} {_format_value(self._function())}"]
+        return [
+            f"{self.name}{_format_labels(self.labelnames, values)} "
+            f"{_format_value(child.value)}"
+            for values, child in self._series()
+        ]
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...], lock: threading.Lock):
+        self.buckets = buckets
+        # One slot per bucket plus +Inf, not cumulative
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = lock
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self):
+        """Context manager observing the duration of a block."""
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ("_child", "_started")
+
+    def __init__(self, child: _HistogramChild):
+        self._child = child
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._child.observe(time.perf_counter() - self._started)
+
+
+class Histogram(_Metric):
+    """Observations counted into fixed buckets."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        registry: Optional[Registry] = REGISTRY,
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets, self._lock)
+
+    def observe(self, value: float):
+        """Observe a value without labels."""
+        self.labels().observe(value)
+
+    def time(self):
+        """Time a block without labels."""
+        return self.labels().time()
+
+    def samples(self) -> List[str]:
+        lines = []
+        for values, child in self._series():
+            with self._lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                bucket_labels = _format_labels(
+                    self.labelnames, values, f'le="{_format_value(bound)}"'
+                )
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+# HTTP
+http_requests_total = Counter(
+    "http_requests_total",
+    "HTTP requests by route template and status class.",
+    ("method", "route", "status"),
+)
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds",
+    "Time until the response was sent, by route template.",
+    ("method", "route"),
+)
+http_requests_in_flight = Gauge(
+    "http_requests_in_flight",
+    "Requests being handled, by route template.",
+    ("method", "route"),
+)
+
+# Event loop
+event_loop_lag_seconds = Histogram(
+    "event_loop_lag_seconds",
+    "Delay before the event loop ran a callback scheduled by the watchdog.",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+event_loop_blocks_total = Counter(
+    "event_loop_blocks_total",
+    "Times the event loop was blocked past the threshold, by route template.",
+    ("route",),
+)
+
+# Database
+db_queries_total = Counter("db_queries_total", "SQL statements executed.")
+db_query_duration_seconds = Histogram(
+    "db_query_duration_seconds", "Time spent executing SQL statements."
+)
+db_pool_checkout_wait_seconds = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the pool.",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+db_pool_checked_out = Gauge(
+    "db_pool_checked_out", "Connections currently checked out of the pool."
+)
+db_pool_size = Gauge("db_pool_size", "Connections currently held by the pool.")
+
+# GridFS
+gridfs_bytes_read_total = Counter(
+    "gridfs_bytes_read_total", "Bytes read from GridFS, as stored."
+)
+gridfs_bytes_written_total = Counter(
+    "gridfs_bytes_written_total", "Bytes written to GridFS, as stored."
+)
+
+# RabbitMQ
+mq_publish_duration_seconds = Histogram(
+    "mq_publish_duration_seconds",
+    "Time until the broker confirmed a batch of messages.",
+)
+mq_published_messages_total = Counter(
+    "mq_published_messages_total", "Messages confirmed by the broker.", ("queue",)
+)
+mq_publish_failures_total = Counter(
+    "mq_publish_failures_total",
+    "Messages whose publish attempt failed, by reason; retries count again.",
+    ("reason",),
+)
+
+
+# Logging
+log_records_dropped_total = Counter(
+    "log_records_dropped_total", "Log records dropped because the log queue was full."
+)
+log_records_sampled_total = Counter(
+    "log_records_sampled_total", "Repeated log records dropped by sampling."
+)
+
+
+def render_metrics() -> str:
+    """Render the process's metrics for a scrape."""
+    return REGISTRY.render()
+
+
+class MetricsMiddleware:
+    """Record request counts and latency labelled by route template.
+
+    Paths are never used as labels: requests that match no route are
+    counted under "unmatched", so ids in URLs cannot blow up the series.
+    Event streams are counted but kept out of the latency histogram, as
+    their duration is how long the client stayed connected.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+        streaming = False
+
+        async def send_with_status(message):
+            nonlocal status_code, streaming
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                streaming = is_streaming_response(message)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            method = request_method(scope)
+            route = route_label(scope)
+            if not streaming:
+                http_request_duration_seconds.labels(method, route).observe(
+                    time.perf_counter() - started
+                )
+            http_requests_total.labels(
+                method, route, f"{status_code // 100}xx"
+            ).inc()
+
+
+def is_streaming_response(message) -> bool:
+    """Check an `http.response.start` message for a long-lived stream."""
+    for name, value in message.get("headers", []):
+        if name.lower() == b"content-type":
+            return value.split(b";")[0].strip() in STREAMING_CONTENT_TYPES
+    return False
+
+
+def request_method(scope) -> str:
+    method = scope["method"]
+    return method if method in KNOWN_METHODS else OVERFLOW_LABEL
+
+
+def route_label(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
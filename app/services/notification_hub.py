@@ -0,0 +1,144 @@
+import asyncio
+import json
+import logging
+import os
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+import aio_pika
+from dotenv import load_dotenv
+
+from app.database import rabbitmq
+from app.database.rabbitmq import NOTIFICATION_LIVE_EXCHANGE
+
+# Load environment variables
+load_dotenv()
+
+# Live notification settings
+NOTIFICATION_REPLAY_SIZE = int(os.getenv("NOTIFICATION_REPLAY_SIZE", "10000"))
+NOTIFICATION_STREAM_QUEUE_SIZE = int(os.getenv("NOTIFICATION_STREAM_QUEUE_SIZE", "100"))
+NOTIFICATION_RECONNECT_SECONDS = 5.0
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """Events waiting to be streamed to one connection."""
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.overflowed = False
+
+
+class NotificationHub:
+    """In-process pub/sub of live notifications keyed by user id.
+
+    Recent events are kept in a ring buffer so a reconnecting client can
+    catch up from its Last-Event-ID.
+    """
+
+    def __init__(
+        self,
+        replay_size: int = NOTIFICATION_REPLAY_SIZE,
+        queue_size: int = NOTIFICATION_STREAM_QUEUE_SIZE,
+    ):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._recent: Deque[Tuple[int, str, Dict[str, Any]]] = deque(
+            maxlen=replay_size
+        )
+
+    def subscribe(
+        self, user_id: str, last_event_id: Optional[int] = None
+    ) -> Subscription:
+        """Register a connection, queueing the events it missed."""
+        subscription = Subscription(user_id)
+        if last_event_id is not None:
+            for event_id, recipient, event in self._recent:
+                if recipient == user_id and event_id > last_event_id:
+                    subscription.queue.put_nowait(event)
+
+        self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Forget a closed connection."""
+        subscriptions = self._subscribers.get(subscription.user_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscribers[subscription.user_id]
+
+    def publish(self, user_id: str, event: Dict[str, Any]):
+        """Send an event to every connection of a user."""
+        self._recent.append((int(event["id"]), user_id, event))
+
+        for subscription in self._subscribers.get(user_id, ()):
+            if subscription.overflowed:
+                continue
+            if subscription.queue.qsize() >= self.queue_size:
+                # A client this far behind reconnects and replays instead
+                subscription.overflowed = True
+                subscription.queue.put_nowait(None)
+                continue
+            subscription.queue.put_nowait(event)
+
+    def connections(self) -> int:
+        """Number of open connections."""
+        return sum(len(subscriptions) for subscriptions in self._subscribers.values())
+
+
+# Hub of this process and the task feeding it from the broker
+notification_hub = NotificationHub()
+_consumer_task: Optional[asyncio.Task] = None
+
+
+def dispatch_live_message(body: Dict[str, Any]):
+    """Publish a batch broadcast by the notification worker to the hub."""
+    notifications: Dict[str, List[Dict[str, Any]]] = body.get("notifications", {})
+    for user_id, events in notifications.items():
+        for event in events:
+            notification_hub.publish(user_id, event)
+
+
+async def _consume_live():
+    while True:
+        try:
+            connection = await rabbitmq.get_connection()
+            channel = await connection.channel()
+            exchange = await channel.declare_exchange(
+                NOTIFICATION_LIVE_EXCHANGE, aio_pika.ExchangeType.FANOUT
+            )
+            # Every API worker gets its own copy of each broadcast
+            queue = await channel.declare_queue(exclusive=True, auto_delete=True)
+            await queue.bind(exchange)
+
+            async with queue.iterator(no_ack=True) as messages:
+                async for message in messages:
+                    try:
+                        dispatch_live_message(json.loads(message.body))
+                    except (ValueError, KeyError, TypeError) as e:
+                        logger.warning("Dropping malformed live notification: %s", e)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Live notification consumer failed: %s", e)
+            await asyncio.sleep(NOTIFICATION_RECONNECT_SECONDS)
+
+
+def start_notification_hub():
+    """Start feeding the hub from the live notification exchange."""
+    global _consumer_task
+
+    _consumer_task = asyncio.create_task(_consume_live())
+
+
+async def stop_notification_hub():
+    """Stop feeding the hub."""
+    global _consumer_task
+
+    if _consumer_task is not None:
+        _consumer_task.cancel()
+        await asyncio.gather(_consumer_task, return_exceptions=True)
+    _consumer_task = None
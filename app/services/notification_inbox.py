@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import os
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from dotenv import load_dotenv
+from sqlalchemy import bindparam, delete, func, insert, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.database.postgres import SessionLocal
+from app.models.notification import Notification, NotificationCounter
+
+# Load environment variables
+load_dotenv()
+
+# Inbox settings
+NOTIFICATION_RETENTION_DAYS = int(os.getenv("NOTIFICATION_RETENTION_DAYS", "90"))
+NOTIFICATION_PRUNE_INTERVAL_SECONDS = float(
+    os.getenv("NOTIFICATION_PRUNE_INTERVAL_SECONDS", "3600")
+)
+NOTIFICATION_PRUNE_BATCH_SIZE = int(os.getenv("NOTIFICATION_PRUNE_BATCH_SIZE", "5000"))
+
+_prune_task: Optional[asyncio.Task] = None
+
+logger = logging.getLogger(__name__)
+
+
+async def store_notifications(
+    session: AsyncSession, notifications: Dict[str, List[Dict[str, Any]]]
+):
+    """Insert notifications and bump the unread counters of their users.
+
+    Each notification dict gets the `id` and `created_at` of its row.
+    """
+    now = datetime.utcnow()
+    flat = [
+        (user_id, notification)
+        for user_id, items in notifications.items()
+        for notification in items
+    ]
+    if not flat:
+        return
+
+    result = await session.execute(
+        insert(Notification).returning(
+            Notification.id, sort_by_parameter_order=True
+        ),
+        [
+            {
+                "user_id": UUID(user_id),
+                "type": notification["type"],
+                "message": notification["message"],
+                "data": notification["data"],
+                "created_at": now,
+            }
+            for user_id, notification in flat
+        ],
+    )
+    for (_, notification), notification_id in zip(flat, result.scalars()):
+        notification["id"] = notification_id
+        notification["created_at"] = now.isoformat()
+
+    # One upsert for all users; sorted so concurrent batches lock in order
+    counts = Counter(user_id for user_id, _ in flat)
+    stmt = pg_insert(NotificationCounter).values(
+        [
+            {"user_id": UUID(user_id), "unread_count": count}
+            for user_id, count in sorted(counts.items())
+        ]
+    )
+    await session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[NotificationCounter.user_id],
+            set_={
+                "unread_count": NotificationCounter.unread_count
+                + stmt.excluded.unread_count
+            },
+        )
+    )
+
+
+async def get_unread_count(session: AsyncSession, user_id: UUID) -> int:
+    """Get the number of unread notifications with a primary key read."""
+    counter = await session.get(NotificationCounter, user_id)
+    return counter.unread_count if counter else 0
+
+
+async def mark_notifications_read(
+    session: AsyncSession, user_id: UUID, ids: Optional[List[int]] = None
+) -> int:
+    """Mark some or all notifications of a user as read.
+
+    Returns the number of notifications that were unread before.
+    """
+    stmt = update(Notification).where(
+        Notification.user_id == user_id, Notification.is_read.is_(False)
+    )
+    if ids is not None:
+        stmt = stmt.where(Notification.id.in_(ids))
+    result = await session.execute(
+        stmt.values(is_read=True).execution_options(synchronize_session=False)
+    )
+
+    # Decrement rather than recount, so concurrent inserts are not lost
+    marked = result.rowcount
+    if marked:
+        await session.execute(
+            update(NotificationCounter)
+            .where(NotificationCounter.user_id == user_id)
+            .values(
+                unread_count=func.greatest(NotificationCounter.unread_count - marked, 0)
+            )
+            .execution_options(synchronize_session=False)
+        )
+    return marked
+
+
+async def prune_notifications(
+    retention_days: int = NOTIFICATION_RETENTION_DAYS,
+) -> int:
+    """Delete notifications older than the retention period in batches.
+
+    Batches are locked with SKIP LOCKED, so API workers pruning at the same
+    time split the work instead of waiting for each other.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    decrement = (
+        update(NotificationCounter.__table__)
+        .where(NotificationCounter.user_id == bindparam("counter_user_id"))
+        .values(
+            unread_count=func.greatest(
+                NotificationCounter.unread_count - bindparam("unread"), 0
+            )
+        )
+    )
+
+    deleted = 0
+    while True:
+        async with SessionLocal() as session:
+            batch = (
+                select(Notification.id)
+                .where(Notification.created_at < cutoff)
+                .order_by(Notification.id)
+                .limit(NOTIFICATION_PRUNE_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+                .scalar_subquery()
+            )
+            result = await session.execute(
+                delete(Notification)
+                .where(Notification.id.in_(batch))
+                .returning(Notification.user_id, Notification.is_read)
+                .execution_options(synchronize_session=False)
+            )
+            rows = result.all()
+
+            unread = Counter(user_id for user_id, is_read in rows if not is_read)
+            if unread:
+                await session.execute(
+                    decrement,
+                    [
+                        {"counter_user_id": user_id, "unread": count}
+                        for user_id, count in sorted(unread.items())
+                    ],
+                )
+            await session.commit()
+
+        deleted += len(rows)
+        if len(rows) < NOTIFICATION_PRUNE_BATCH_SIZE:
+            return deleted
+
+
+async def _prune_loop():
+    while True:
+        await asyncio.sleep(NOTIFICATION_PRUNE_INTERVAL_SECONDS)
+        try:
+            deleted = await prune_notifications()
+            if deleted:
+                logger.info("Pruned %s old notifications", deleted)
+        except Exception as e:
+            logger.error("Notification pruning failed: %s", e)
+
+
+def start_notification_retention():
+    """Start the periodic retention job."""
+    global _prune_task
+
+    if NOTIFICATION_PRUNE_INTERVAL_SECONDS > 0:
+        _prune_task = asyncio.create_task(_prune_loop())
+
+
+async def stop_notification_retention():
+    """Stop the retention job."""
+    global _prune_task
+
+    if _prune_task is not None:
+        _prune_task.cancel()
+        await asyncio.gather(_prune_task, return_exceptions=True)
+    _prune_task = None
@@ -1,60 +1,102 @@
+import logging
+import os
 from typing import Dict, Any, List, Optional
 from uuid import UUID
+from dotenv import load_dotenv
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
 
-from app.database.rabbitmq import send_notification, queue_file_processing
-from app.models.user import User
+from app.database.postgres import SessionLocal
+from app.database.rabbitmq import (
+    NOTIFICATION_QUEUE,
+    FILE_PROCESSING_QUEUE,
+    notification_message,
+    file_task_message,
+    send_notification_batch,
+)
+from app.models.user import User, UserRole
+from app.services.outbox import add_outbox_message
 
+# Load environment variables
+load_dotenv()
 
-async def notify_new_assignment(
-    teacher: User, group_id: UUID, assignment_title: str
-):
-    """Notify students about a new assignment."""
-    # In a real implementation, you would query the database to get all students in this group
-    # For now, we'll just simulate the notification
+# Recipients per published fan-out message
+NOTIFICATION_FANOUT_BATCH_SIZE = int(
+    os.getenv("NOTIFICATION_FANOUT_BATCH_SIZE", "500")
+)
 
-    message = f"New assignment '{assignment_title}' has been posted."
+logger = logging.getLogger(__name__)
 
-    # This would typically be a batch operation to send notifications to all students
-    # For this example, we'll just log the notification
-    print(f"Notification to group {group_id}: {message}")
 
-    # In a real implementation, you might do something like this:
-    # for student in students:
-    #     send_notification(student.id, message, "assignment")
+class NotificationType:
+    ASSIGNMENT = "assignment"
+    ATTENDANCE = "attendance"
+    GENERAL = "general"
 
-    return True
 
+async def notify_new_assignment(
+    teacher: User,
+    group_id: UUID,
+    assignment_title: str,
+    assignment_id: Optional[UUID] = None,
+):
+    """Notify students about a new assignment.
 
-async def notify_file_upload(assignment_id: UUID, file_id: str):
-    """Notify about a new file upload and queue it for processing."""
-    # Queue file for processing (e.g., virus scan, thumbnail generation)
-    success = queue_file_processing(file_id, "process_new_upload")
+    Meant to run after the assignment is committed, off the request path:
+    student ids are streamed with a single query and published in batches,
+    one message per batch of recipients.
+    """
+    message = f"New assignment '{assignment_title}' has been posted."
+    data = {
+        "group_id": str(group_id),
+        "assignment_id": str(assignment_id) if assignment_id else None,
+        "teacher_id": str(teacher.id),
+    }
+
+    success = True
+    async with SessionLocal() as session:
+        result = await session.stream_scalars(
+            select(User.id)
+            .where(User.group_id == group_id, User.role == UserRole.STUDENT)
+            .execution_options(yield_per=NOTIFICATION_FANOUT_BATCH_SIZE)
+        )
+        async for student_ids in result.partitions():
+            user_ids: List[str] = [str(student_id) for student_id in student_ids]
+            if not send_notification_batch(
+                user_ids, message, NotificationType.ASSIGNMENT, data
+            ):
+                success = False
 
     if not success:
-        print(f"Failed to queue file {file_id} for processing")
+        logger.warning("Failed to notify some students of group %s", group_id)
 
     return success
 
 
+async def notify_file_upload(db: AsyncSession, assignment_id: UUID, file_id: str):
+    """Queue a new upload for processing once the transaction commits."""
+    # Queue file for processing (e.g., virus scan, thumbnail generation)
+    add_outbox_message(
+        db, FILE_PROCESSING_QUEUE, file_task_message(file_id, "process_new_upload")
+    )
+
+
 async def notify_attendance_updated(
-    student_id: UUID, schedule_id: UUID, status: str
+    db: AsyncSession, student_id: UUID, schedule_id: UUID, status: str
 ):
-    """Notify a student about their attendance being updated."""
+    """Notify a student about their attendance once the transaction commits."""
     message = f"Your attendance status has been updated to '{status}'."
 
-    # Send notification to the student
-    success = send_notification(str(student_id), message, "attendance")
-
-    if not success:
-        print(f"Failed to send notification to student {student_id}")
-
-    return success
-
-
-class NotificationType:
-    ASSIGNMENT = "assignment"
-    ATTENDANCE = "attendance"
-    GENERAL = "general"
+    add_outbox_message(
+        db,
+        NOTIFICATION_QUEUE,
+        notification_message(
+            str(student_id),
+            message,
+            NotificationType.ATTENDANCE,
+            {"schedule_id": str(schedule_id), "status": status},
+        ),
+    )
 
 
 def create_notification_payload(
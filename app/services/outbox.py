@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import delete, event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.database.postgres import SessionLocal
+from app.database.rabbitmq import publish_batch
+from app.models.outbox import OutboxMessage
+from app.services.metrics import mq_publish_failures_total
+
+# Load environment variables
+load_dotenv()
+
+# Relay settings
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "200"))
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "1.0"))
+# Row locks and a pooled connection are held while publishing, so bound it
+OUTBOX_PUBLISH_TIMEOUT_SECONDS = float(
+    os.getenv("OUTBOX_PUBLISH_TIMEOUT_SECONDS", "10")
+)
+OUTBOX_RETRY_SECONDS = 2.0
+
+# Set when a transaction with outbox messages commits
+_wakeup: Optional[asyncio.Event] = None
+_relay_task: Optional[asyncio.Task] = None
+
+logger = logging.getLogger(__name__)
+
+
+def _wake_relay(session):
+    session.info.pop("outbox_pending", None)
+    if _wakeup is not None:
+        _wakeup.set()
+
+
+def add_outbox_message(db: AsyncSession, queue: str, message: Dict[str, Any]):
+    """Add a message to the outbox of the current transaction.
+
+    It is published only if the transaction commits, and survives broker
+    outages until the relay gets it out.
+    """
+    db.add(OutboxMessage(queue=queue, payload=message))
+
+    # Wake the relay right after the commit instead of on its next poll
+    session = db.sync_session
+    if not session.info.get("outbox_pending"):
+        session.info["outbox_pending"] = True
+        event.listen(session, "after_commit", _wake_relay, once=True)
+
+
+async def relay_outbox_batch(limit: int = OUTBOX_BATCH_SIZE) -> int:
+    """Publish and delete one batch of outbox messages.
+
+    Rows are locked with SKIP LOCKED, so relays in several API workers take
+    disjoint batches. A crash or publish timeout between publishing and
+    committing publishes the batch again, so delivery is at least once.
+    """
+    async with SessionLocal() as session:
+        result = await session.execute(
+            select(OutboxMessage.id, OutboxMessage.queue, OutboxMessage.payload)
+            .order_by(OutboxMessage.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        rows = result.all()
+        if not rows:
+            return 0
+
+        try:
+            await asyncio.wait_for(
+                publish_batch([(row.queue, row.payload) for row in rows]),
+                OUTBOX_PUBLISH_TIMEOUT_SECONDS,
+            )
+        except asyncio.TimeoutError:
+            # The rows are unlocked by the rollback and published again later
+            mq_publish_failures_total.labels("timeout").inc(len(rows))
+            raise RuntimeError(
+                f"Publishing took over {OUTBOX_PUBLISH_TIMEOUT_SECONDS} seconds"
+            ) from None
+
+        ids: List[int] = [row.id for row in rows]
+        await session.execute(delete(OutboxMessage).where(OutboxMessage.id.in_(ids)))
+        await session.commit()
+        return len(rows)
+
+
+async def _relay_loop():
+    while True:
+        # Cleared before reading so commits during the batch are not missed
+        _wakeup.clear()
+        try:
+            relayed = await relay_outbox_batch()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Failed to relay outbox messages: %s", e)
+            await asyncio.sleep(OUTBOX_RETRY_SECONDS)
+            continue
+
+        if relayed < OUTBOX_BATCH_SIZE:
+            # Drained; sleep until the next commit or poll
+            try:
+                await asyncio.wait_for(_wakeup.wait(), OUTBOX_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+
+def start_outbox_relay():
+    """Start relaying outbox messages to the broker."""
+    global _wakeup, _relay_task
+
+    _wakeup = asyncio.Event()
+    _relay_task = asyncio.create_task(_relay_loop())
+
+
+async def stop_outbox_relay():
+    """Stop the relay; remaining messages are sent after the next start."""
+    global _wakeup, _relay_task
+
+    if _relay_task is not None:
+        _relay_task.cancel()
+        await asyncio.gather(_relay_task, return_exceptions=True)
+    _relay_task = None
+    _wakeup = None
@@ -0,0 +1,328 @@
+import asyncio
+import contextvars
+import os
+import queue
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from jose import JWTError, jwt
+from starlette.datastructures import MutableHeaders
+
+from app.models.user import UserRole
+from app.services.auth import ALGORITHM, SECRET_KEY
+
+# Load environment variables
+load_dotenv()
+
+# Profiler settings
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILER_INTERVAL_SECONDS = float(os.getenv("PROFILER_INTERVAL_MS", "5")) / 1000
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "60"))
+# Single-request profiles kept for download
+PROFILER_KEEP = int(os.getenv("PROFILER_KEEP", "20"))
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+MAX_STACK_DEPTH = 128
+
+Stack = Tuple[str, ...]
+
+_frame_labels: Dict[Any, str] = {}
+# Set to the profiler's marker in the context of the request it profiles;
+# worker threads run with a copy of that context
+_profiled: contextvars.ContextVar[Optional[object]] = contextvars.ContextVar(
+    "profiled", default=None
+)
+_profiles: "OrderedDict[str, SamplingProfiler]" = OrderedDict()
+# Code objects of the worker thread loops, resolved on first use
+_worker_codes: Optional[Tuple[Any, Any]] = None
+_profiling_lock = threading.Lock()
+
+
+def _frame_label(code) -> str:
+    label = _frame_labels.get(code)
+    if label is None:
+        filename = code.co_filename
+        for path in sorted(sys.path, key=len, reverse=True):
+            if path and filename.startswith(path):
+                filename = filename[len(path) :].lstrip(os.sep)
+                break
+        label = f"{code.co_name} ({filename}:{code.co_firstlineno})"
+        _frame_labels[code] = label
+    return label
+
+
+def _resolve_worker_codes() -> Tuple[Any, Any]:
+    """Find the run loops of anyio and executor worker threads.
+
+    Both are private, so they are looked up lazily and a library that
+    moved them only stops threadpool frames from being attributed.
+    """
+    global _worker_codes
+
+    if _worker_codes is None:
+        try:
+            from anyio._backends._asyncio import WorkerThread
+
+            anyio_code = WorkerThread.run.__code__
+        except (ImportError, AttributeError):
+            anyio_code = None
+        try:
+            from concurrent.futures.thread import _WorkItem
+
+            executor_code = _WorkItem.run.__code__
+        except (ImportError, AttributeError):
+            executor_code = None
+        _worker_codes = (anyio_code, executor_code)
+    return _worker_codes
+
+
+def _thread_context(frame) -> Optional[contextvars.Context]:
+    """Find the context a worker thread is running a function in, if any.
+
+    Covers the anyio threads behind run_in_threadpool and executor threads
+    running a function through `Context.run`, as asyncio.to_thread does.
+    """
+    anyio_code, executor_code = _resolve_worker_codes()
+    if anyio_code is None and executor_code is None:
+        return None
+
+    child = None
+    while frame is not None:
+        code = frame.f_code
+        if code is anyio_code:
+            # Idle workers keep the context of their last call around
+            if child is None or child.f_code is queue.Queue.get.__code__:
+                return None
+            return frame.f_locals.get("context")
+        if code is executor_code:
+            function = getattr(frame.f_locals.get("self"), "fn", None)
+            owner = getattr(function, "__self__", None)
+            return owner if isinstance(owner, contextvars.Context) else None
+        child = frame
+        frame = frame.f_back
+    return None
+
+
+def _stack(frame, thread_name: str) -> Stack:
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.append(thread_name)
+    labels.reverse()
+    return tuple(labels)
+
+
+class SamplingProfiler:
+    """Sample the stacks of running threads from a background thread.
+
+    With a task given, only samples taken while that task runs on its
+    event loop are kept, which profiles a single request without the
+    others served by the same worker. Threads running functions the task
+    handed to the threadpool are sampled too, as long as the task runs
+    with `_profiled` set to the profiler's marker.
+    """
+
+    def __init__(
+        self,
+        interval: float = PROFILER_INTERVAL_SECONDS,
+        task: Optional[asyncio.Task] = None,
+    ):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.ticks = 0
+        self._task = task
+        self.marker = object()
+        self._loop = task.get_loop() if task is not None else None
+        self._loop_thread = threading.get_ident() if task is not None else None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started = 0.0
+        self.seconds = 0.0
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(
+            target=self._run, name="sampling-profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> "SamplingProfiler":
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.seconds = time.perf_counter() - self._started
+        return self
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.ticks += 1
+            if self._task is not None:
+                self._sample_task(own)
+                continue
+
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own:
+                    self.stacks[_stack(frame, names.get(thread_id, str(thread_id)))] += 1
+
+    def _sample_task(self, own: int):
+        frames = sys._current_frames()
+        if asyncio.current_task(self._loop) is self._task:
+            frame = frames.get(self._loop_thread)
+            if frame is not None:
+                self.stacks[_stack(frame, "event-loop")] += 1
+
+        for thread_id, frame in frames.items():
+            if thread_id in (own, self._loop_thread):
+                continue
+            context = _thread_context(frame)
+            if context is not None and context.get(_profiled) is self.marker:
+                self.stacks[_stack(frame, "threadpool")] += 1
+
+    def collapsed(self) -> str:
+        """Profile in the collapsed format read by flamegraph.pl and speedscope."""
+        return "\n".join(
+            f"{';'.join(stack)} {count}" for stack, count in self.stacks.most_common()
+        )
+
+    def speedscope(self, name: str) -> Dict[str, Any]:
+        """Profile in the speedscope file format."""
+        frames: Dict[str, int] = {}
+        samples, weights = [], []
+        interval_ms = self.interval * 1000
+        for stack, count in self.stacks.most_common():
+            samples.append([frames.setdefault(label, len(frames)) for label in stack])
+            weights.append(count * interval_ms)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": [{"name": label} for label in frames]},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": name,
+                    "unit": "milliseconds",
+                    "startValue": 0,
+                    "endValue": sum(weights),
+                    "samples": samples,
+                    "weights": weights,
+                }
+            ],
+            "name": name,
+            "exporter": "university-app",
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "seconds": round(self.seconds, 3),
+            "ticks": self.ticks,
+            "samples": sum(self.stacks.values()),
+            "interval_ms": self.interval * 1000,
+        }
+
+
+async def profile_worker(seconds: float) -> SamplingProfiler:
+    """Sample every thread of this worker for a number of seconds."""
+    seconds = min(seconds, PROFILER_MAX_SECONDS)
+    if not _profiling_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="A profile is already running")
+
+    profiler = SamplingProfiler()
+    try:
+        profiler.start()
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.stop()
+        _profiling_lock.release()
+    return profiler
+
+
+def get_request_profile(profile_id: str) -> Optional[SamplingProfiler]:
+    """Get a stored single-request profile."""
+    return _profiles.get(profile_id)
+
+
+def _store_profile(profile_id: str, profiler: SamplingProfiler):
+    _profiles[profile_id] = profiler
+    while len(_profiles) > PROFILER_KEEP:
+        _profiles.popitem(last=False)
+
+
+def _has_admin_token(scope) -> bool:
+    """Check for a valid bearer token with the admin role claim.
+
+    Only the signature, expiry and claim are checked, so requests of
+    anyone else cost no database lookup. The route's own authentication
+    has the final word; see RequestProfilerMiddleware.
+    """
+    authorization = dict(scope["headers"]).get(b"authorization", b"").decode()
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return False
+    return payload.get("role") == UserRole.ADMIN
+
+
+def _route_user_allowed(scope) -> bool:
+    # Set by the auth dependency; routes without authentication trust the token
+    user = scope.get("state", {}).get("user")
+    return user is None or (user.is_active and user.role == UserRole.ADMIN)
+
+
+class RequestProfilerMiddleware:
+    """Profile single requests of admins that send `X-Profile: 1`.
+
+    The response carries an `X-Profile-Id` header; the profile can be
+    downloaded from /api/admin/profiles/{id} once the request finished.
+    Requests are sampled when their token claims the admin role. The
+    profile is discarded if the route's authentication then finds a user
+    who is not an active admin any more. Only installed when profiling is
+    enabled.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not any(
+            name == PROFILE_HEADER for name, _ in scope["headers"]
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        if not _has_admin_token(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+        keep = True
+
+        async def send_with_profile_id(message):
+            nonlocal keep
+            if message["type"] == "http.response.start":
+                keep = _route_user_allowed(scope)
+                if keep:
+                    MutableHeaders(scope=message).append(PROFILE_ID_HEADER, profile_id)
+            await send(message)
+
+        profiler = SamplingProfiler(task=asyncio.current_task())
+        token = _profiled.set(profiler.marker)
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.stop()
+            _profiled.reset(token)
+            if keep and _route_user_allowed(scope):
+                _store_profile(profile_id, profiler)
@@ -0,0 +1,160 @@
+import logging
+import os
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Query counter settings
+# A statement shape run this many times in one request is flagged as N+1
+QUERY_REPEAT_THRESHOLD = int(os.getenv("QUERY_REPEAT_THRESHOLD", "5"))
+QUERY_WARNINGS_ENABLED = os.getenv("QUERY_WARNINGS_ENABLED", "true").lower() == "true"
+
+_PLACEHOLDER = re.compile(r"\$\d+(?:::[\w\[\]]+)?|%\(\w+\)s|\?")
+_PLACEHOLDER_LIST = re.compile(r"\?(?:, \?)+")
+
+
+def statement_shape(statement: str) -> str:
+    """Normalize a statement so runs with other parameters compare equal.
+
+    Placeholders become `?` and expanded IN lists collapse to one item, so
+    `IN ($1, $2)` and `IN ($1, $2, $3)` have the same shape.
+    """
+    shape = _PLACEHOLDER.sub("?", statement)
+    return " ".join(_PLACEHOLDER_LIST.sub("?, ...", shape).split())
+
+
+class QueryLog:
+    """Statements executed while the log was active."""
+
+    def __init__(self, keep_statements: bool = False):
+        self.count = 0
+        self.shapes: Counter = Counter()
+        self.statements: Optional[List[str]] = [] if keep_statements else None
+
+    def add(self, statement: str):
+        self.count += 1
+        self.shapes[statement_shape(statement)] += 1
+        if self.statements is not None:
+            self.statements.append(statement)
+
+    def repeated(self, threshold: int = QUERY_REPEAT_THRESHOLD) -> Dict[str, int]:
+        """Statement shapes that ran at least `threshold` times."""
+        return {
+            shape: count for shape, count in self.shapes.items() if count >= threshold
+        }
+
+
+_current: ContextVar[Optional[QueryLog]] = ContextVar("query_log", default=None)
+
+# Violations found while budgets are enforced, None when they are not
+_violations: Optional[List[Dict[str, Any]]] = None
+
+logger = logging.getLogger(__name__)
+
+
+def record_statement(statement: str):
+    """Add a statement to the active query log, if there is one."""
+    log = _current.get()
+    if log is not None:
+        log.add(statement)
+
+
+@contextmanager
+def collect_queries(keep_statements: bool = True):
+    """Collect the statements executed inside the block."""
+    log = QueryLog(keep_statements)
+    token = _current.set(log)
+    try:
+        yield log
+    finally:
+        _current.reset(token)
+
+
+def query_budget(max_queries: int):
+    """Declare the most queries a route may run per request.
+
+    Goes below the route decorator:
+
+        @router.get("/schedule")
+        @query_budget(4)
+        async def get_schedules(...):
+    """
+
+    def decorator(func: Callable):
+        func.query_budget = max_queries
+        return func
+
+    return decorator
+
+
+def enforce_query_budgets() -> List[Dict[str, Any]]:
+    """Start collecting budget and N+1 violations; returns the list."""
+    global _violations
+
+    _violations = []
+    return _violations
+
+
+def stop_enforcing_query_budgets():
+    """Stop collecting violations."""
+    global _violations
+
+    _violations = None
+
+
+def check_query_log(scope, log: QueryLog) -> List[Dict[str, Any]]:
+    """Compare a request's queries with its route's budget."""
+    route = scope.get("route")
+    budget = getattr(getattr(route, "endpoint", None), "query_budget", None)
+    route_path = getattr(route, "path", scope["path"])
+
+    problems = []
+    if budget is not None and log.count > budget:
+        problems.append(
+            {
+                "route": route_path,
+                "problem": "over_budget",
+                "queries": log.count,
+                "budget": budget,
+            }
+        )
+    for shape, count in log.repeated().items():
+        problems.append(
+            {
+                "route": route_path,
+                "problem": "repeated_statement",
+                "queries": count,
+                "statement": shape,
+            }
+        )
+    return problems
+
+
+class QueryLogMiddleware:
+    """Count queries per request and flag routes that repeat statements."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        enforcing = _violations is not None
+        if scope["type"] != "http" or not (QUERY_WARNINGS_ENABLED or enforcing):
+            await self.app(scope, receive, send)
+            return
+
+        with collect_queries(keep_statements=False) as log:
+            await self.app(scope, receive, send)
+
+        problems = check_query_log(scope, log)
+        if enforcing:
+            _violations.extend(problems)
+        elif problems:
+            for problem in problems:
+                logger.warning("query_warning", extra={"fields": problem})
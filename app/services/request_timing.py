@@ -0,0 +1,248 @@
+import asyncio
+import functools
+import logging
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional
+
+from dotenv import load_dotenv
+from fastapi.routing import APIRoute
+from starlette.datastructures import MutableHeaders
+
+from app.services.metrics import (
+    http_requests_in_flight,
+    is_streaming_response,
+    request_method,
+)
+
+# Load environment variables
+load_dotenv()
+
+# Request timing settings
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+# Requests slower than this are logged with their breakdown; 0 disables
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+
+# Order of the categories in the Server-Timing header
+TIMING_CATEGORIES = ("auth", "db", "serialize", "mq", "files")
+
+logger = logging.getLogger(__name__)
+
+
+class RequestTiming:
+    """Time spent by one request, summed per category."""
+
+    def __init__(self, scope: Optional[Dict] = None):
+        # ASGI scope of the request, for code that reports where it ran
+        self.scope = scope
+        self.started = time.perf_counter()
+        self.durations: Dict[str, float] = defaultdict(float)
+        self.counts: Dict[str, int] = defaultdict(int)
+        self.endpoint_done: Optional[float] = None
+        # Categories being tracked, so nested calls are not counted twice
+        self.active = set()
+
+    def add(self, category: str, seconds: float, count: int = 1):
+        """Add time spent in a category."""
+        self.durations[category] += seconds
+        self.counts[category] += count
+
+    def total(self) -> float:
+        return time.perf_counter() - self.started
+
+    def breakdown(self) -> Dict[str, float]:
+        """Milliseconds per category, including the total so far."""
+        result = {
+            category: round(self.durations[category] * 1000, 2)
+            for category in TIMING_CATEGORIES
+            if category in self.durations
+        }
+        result["total"] = round(self.total() * 1000, 2)
+        return result
+
+    def header(self) -> str:
+        """Format the timings as a Server-Timing header value."""
+        metrics = []
+        for category, duration in self.breakdown().items():
+            metric = f"{category};dur={duration}"
+            if category == "db":
+                metric += f';desc="{self.counts["db"]} queries"'
+            metrics.append(metric)
+        return ", ".join(metrics)
+
+
+_current: ContextVar[Optional[RequestTiming]] = ContextVar(
+    "request_timing", default=None
+)
+
+
+def current_timing() -> Optional[RequestTiming]:
+    """Get the timing of the request being handled, if any."""
+    return _current.get()
+
+
+def record(category: str, seconds: float, count: int = 1):
+    """Add time to the current request, if there is one."""
+    timing = _current.get()
+    if timing is not None:
+        timing.add(category, seconds, count)
+
+
+@contextmanager
+def track(category: str):
+    """Time a block of code into a category of the current request."""
+    timing = _current.get()
+    if timing is None or category in timing.active:
+        yield
+        return
+
+    timing.active.add(category)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.active.discard(category)
+        timing.add(category, time.perf_counter() - started)
+
+
+def timed(category: str):
+    """Decorator version of `track` for sync and async functions."""
+
+    def decorator(func: Callable):
+        if asyncio.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with track(category):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with track(category):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class TimedRoute(APIRoute):
+    """Route that times response serialization.
+
+    FastAPI validates and encodes the returned value after the endpoint
+    returns, so everything between the endpoint returning and the handler
+    producing the response is counted as `serialize`.
+    """
+
+    def get_route_handler(self) -> Callable:
+        call = self.dependant.call
+
+        if asyncio.iscoroutinefunction(call):
+
+            @functools.wraps(call)
+            async def timed_call(**kwargs):
+                try:
+                    return await call(**kwargs)
+                finally:
+                    _mark_endpoint_done()
+
+        else:
+
+            @functools.wraps(call)
+            def timed_call(**kwargs):
+                try:
+                    return call(**kwargs)
+                finally:
+                    _mark_endpoint_done()
+
+        self.dependant.call = timed_call
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            in_flight = http_requests_in_flight.labels(
+                request_method(request.scope), self.path
+            )
+            in_flight.inc()
+            try:
+                response = await handler(request)
+            finally:
+                in_flight.dec()
+            timing = _current.get()
+            if timing is not None and timing.endpoint_done is not None:
+                timing.add("serialize", time.perf_counter() - timing.endpoint_done)
+                timing.endpoint_done = None
+            return response
+
+        return timed_handler
+
+
+def _mark_endpoint_done():
+    timing = _current.get()
+    if timing is not None:
+        timing.endpoint_done = time.perf_counter()
+
+
+class ServerTimingMiddleware:
+    """Collect per-request timings and report them in `Server-Timing`.
+
+    The header goes out with the response start, so work done while a
+    streaming body is sent only shows up in the slow request log. Event
+    streams are never logged as slow; they are open by design.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming(scope)
+        token = _current.set(timing)
+        status_code = 500
+        streaming = False
+
+        async def send_with_timing(message):
+            nonlocal status_code, streaming
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                streaming = is_streaming_response(message)
+                if SERVER_TIMING_ENABLED:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", timing.header())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            if (
+                SLOW_REQUEST_MS
+                and not streaming
+                and timing.total() * 1000 >= SLOW_REQUEST_MS
+            ):
+                log_slow_request(scope, status_code, timing)
+
+
+def log_slow_request(scope, status_code: int, timing: RequestTiming):
+    """Log a structured line for a slow request."""
+    route = scope.get("route")
+    logger.warning(
+        "slow_request",
+        extra={
+            "fields": {
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": getattr(route, "path", None),
+                "status": status_code,
+                "timings_ms": timing.breakdown(),
+                "db_queries": timing.counts.get("db", 0),
+            }
+        },
+    )
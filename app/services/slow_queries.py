@@ -0,0 +1,143 @@
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import random
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Set
+
+from dotenv import load_dotenv
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.services.metrics import request_method, route_label
+from app.services.query_counter import statement_shape
+from app.services.request_timing import current_timing
+
+# Load environment variables
+load_dotenv()
+
+# Slow query settings
+# Statements slower than this are logged; 0 disables
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# Share of slow SELECTs re-run with EXPLAIN ANALYZE; they run twice, so off by default
+SLOW_QUERY_EXPLAIN_RATE = float(os.getenv("SLOW_QUERY_EXPLAIN_RATE", "0"))
+SLOW_QUERY_EXPLAIN_TIMEOUT_MS = int(
+    os.getenv("SLOW_QUERY_EXPLAIN_TIMEOUT_MS", "10000")
+)
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "200"))
+SLOW_QUERY_MAX_EXPLAINS = 2
+
+logger = logging.getLogger(__name__)
+
+# Recent slow queries, oldest first
+_slow_queries: Deque[Dict[str, Any]] = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+_explain_tasks: Set[asyncio.Task] = set()
+# Set while an EXPLAIN runs, so its own statement is not logged again
+_explaining: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "explaining", default=False
+)
+
+
+def parameter_shape(parameters: Any) -> Any:
+    """Describe bound parameters by type, never by value."""
+    if isinstance(parameters, dict):
+        return {name: parameter_shape(value) for name, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_value_shape(value) for value in parameters]
+    return _value_shape(parameters)
+
+
+def _value_shape(value: Any) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, (list, tuple)):
+        return f"{type(value).__name__}[{len(value)}]"
+    if isinstance(value, (str, bytes)):
+        return f"{type(value).__name__}({len(value)})"
+    return type(value).__name__
+
+
+def record_slow_query(
+    engine: AsyncEngine,
+    statement: str,
+    parameters: Any,
+    seconds: float,
+    executemany: bool,
+):
+    """Log a slow statement and maybe schedule an EXPLAIN of it.
+
+    Called from the engine's cursor hook, in the context of the request
+    that ran the statement.
+    """
+    if _explaining.get():
+        return
+
+    timing = current_timing()
+    scope = timing.scope if timing else None
+    entry = {
+        "id": uuid.uuid4().hex,
+        "at": datetime.utcnow().isoformat(),
+        "duration_ms": round(seconds * 1000, 2),
+        "statement": statement_shape(statement),
+        "parameters": (
+            {"rows": len(parameters), "row": parameter_shape(parameters[0])}
+            if executemany and parameters
+            else parameter_shape(parameters)
+        ),
+        "method": request_method(scope) if scope else None,
+        "route": route_label(scope) if scope else None,
+    }
+    logger.warning("slow_query", extra={"fields": dict(entry)})
+    entry["plan"] = None
+    _slow_queries.append(entry)
+
+    if (
+        not executemany
+        and statement.lstrip()[:6].upper() == "SELECT"
+        and len(_explain_tasks) < SLOW_QUERY_MAX_EXPLAINS
+        and random.random() < SLOW_QUERY_EXPLAIN_RATE
+    ):
+        _schedule_explain(engine, entry, statement, parameters)
+
+
+def _schedule_explain(engine: AsyncEngine, entry, statement: str, parameters: Any):
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+
+    entry["plan"] = "pending"
+    # A fresh context, so the EXPLAIN is not counted against the request
+    coroutine = _explain(engine, entry, statement, parameters)
+    task = contextvars.Context().run(loop.create_task, coroutine)
+    _explain_tasks.add(task)
+    task.add_done_callback(_explain_tasks.discard)
+
+
+async def _explain(engine: AsyncEngine, entry, statement: str, parameters: Any):
+    """Capture the plan of a slow SELECT in a read-only, rolled back transaction."""
+    _explaining.set(True)
+    try:
+        async with engine.connect() as conn:
+            await conn.exec_driver_sql("SET TRANSACTION READ ONLY")
+            await conn.exec_driver_sql(
+                f"SET LOCAL statement_timeout = {SLOW_QUERY_EXPLAIN_TIMEOUT_MS}"
+            )
+            result = await conn.exec_driver_sql(
+                f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}", parameters
+            )
+            plan = result.scalar()
+            await conn.rollback()
+        entry["plan"] = json.loads(plan) if isinstance(plan, str) else plan
+    except Exception as e:
+        entry["plan"] = None
+        entry["plan_error"] = str(e)
+
+
+def get_slow_queries(limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Recent slow queries, newest first."""
+    entries = list(reversed(_slow_queries))
+    return entries[:limit] if limit else entries
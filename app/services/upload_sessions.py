@@ -0,0 +1,246 @@
+import math
+import os
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List
+
+from bson.binary import Binary
+from bson.errors import InvalidId
+from bson.objectid import ObjectId
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.database import mongodb
+from app.services.file_storage import create_file_metadata, validate_file_type
+from app.services.metrics import gridfs_bytes_written_total
+from app.services.request_timing import timed
+
+# Load environment variables
+load_dotenv()
+
+# Upload session settings
+# A chunk is stored as one GridFS chunk document, which must stay below
+# MongoDB's 16 MB document limit
+MAX_UPLOAD_CHUNK_SIZE = 15 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = min(
+    int(os.getenv("UPLOAD_CHUNK_SIZE", str(4 * 1024 * 1024))), MAX_UPLOAD_CHUNK_SIZE
+)
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+UPLOAD_SESSION_TTL_SECONDS = int(os.getenv("UPLOAD_SESSION_TTL_SECONDS", "86400"))
+
+UPLOAD_SESSIONS_COLLECTION = "upload_sessions"
+
+
+def _sessions():
+    if mongodb.db is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="File storage service unavailable",
+        )
+    return mongodb.db[UPLOAD_SESSIONS_COLLECTION]
+
+
+def chunk_count(session: Dict[str, Any]) -> int:
+    """Number of chunks a session needs in total."""
+    return max(1, math.ceil(session["total_size"] / session["chunk_size"]))
+
+
+def session_to_response(session: Dict[str, Any]) -> Dict[str, Any]:
+    """Describe upload progress so a client can resume where it stopped."""
+    received = set(session.get("received", []))
+    chunk_size = session["chunk_size"]
+    total_size = session["total_size"]
+    missing_offsets = [
+        n * chunk_size for n in range(chunk_count(session)) if n not in received
+    ]
+    received_bytes = sum(
+        min(chunk_size, total_size - n * chunk_size) for n in received
+    )
+    return {
+        "id": str(session["_id"]),
+        "assignment_id": session["assignment_id"],
+        "file_name": session["filename"],
+        "content_type": session["content_type"],
+        "total_size": total_size,
+        "chunk_size": chunk_size,
+        "received_bytes": received_bytes,
+        "missing_offsets": missing_offsets,
+        "expires_at": session["expires_at"],
+    }
+
+
+async def create_upload_session(
+    assignment_id: str,
+    filename: str,
+    content_type: str,
+    total_size: int,
+    user_id: str,
+) -> Dict[str, Any]:
+    """Start a resumable upload."""
+    if not validate_file_type(content_type, filename):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File type {content_type} not allowed",
+        )
+    if total_size <= 0 or total_size > UPLOAD_MAX_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File size must be between 1 and {UPLOAD_MAX_BYTES} bytes",
+        )
+
+    now = datetime.utcnow()
+    session = {
+        # Also becomes the GridFS file id, so chunks need no renaming
+        "_id": ObjectId(),
+        "assignment_id": assignment_id,
+        "filename": filename,
+        "content_type": content_type,
+        "total_size": total_size,
+        "chunk_size": UPLOAD_CHUNK_SIZE,
+        "received": [],
+        "created_by": user_id,
+        "created_at": now,
+        "expires_at": now + timedelta(seconds=UPLOAD_SESSION_TTL_SECONDS),
+    }
+    await _sessions().insert_one(session)
+    return session
+
+
+async def get_upload_session(upload_id: str, user_id: str, is_admin: bool):
+    """Get an upload session owned by the user."""
+    try:
+        obj_id = ObjectId(upload_id)
+    except (InvalidId, TypeError):
+        obj_id = None
+
+    session = await _sessions().find_one({"_id": obj_id}) if obj_id else None
+    if not session or session["expires_at"] < datetime.utcnow():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload session not found",
+        )
+    if not is_admin and session["created_by"] != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You can only continue your own uploads",
+        )
+    return session
+
+
+def expected_chunk_length(session: Dict[str, Any], offset: int) -> int:
+    """Check a chunk offset and get the size the chunk there must have."""
+    chunk_size = session["chunk_size"]
+    total_size = session["total_size"]
+    if offset % chunk_size or offset >= total_size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Offset must be a multiple of {chunk_size} below {total_size}",
+        )
+    return min(chunk_size, total_size - offset)
+
+
+async def read_limited(stream: AsyncIterator[bytes], limit: int) -> bytes:
+    """Read a request body, failing as soon as it grows past `limit` bytes."""
+    data = bytearray()
+    async for part in stream:
+        data += part
+        if len(data) > limit:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Chunk must be at most {limit} bytes",
+            )
+    return bytes(data)
+
+
+@timed("files")
+async def write_upload_chunk(
+    session: Dict[str, Any], offset: int, data: bytes
+) -> Dict[str, Any]:
+    """Store one chunk directly as a GridFS chunk document.
+
+    Re-sending a chunk overwrites it, so retries after a dropped
+    connection are safe.
+    """
+    expected = expected_chunk_length(session, offset)
+    if len(data) != expected:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Chunk at offset {offset} must be {expected} bytes",
+        )
+
+    n = offset // session["chunk_size"]
+    await mongodb.db.fs.chunks.replace_one(
+        {"files_id": session["_id"], "n": n},
+        {"files_id": session["_id"], "n": n, "data": Binary(data)},
+        upsert=True,
+    )
+    gridfs_bytes_written_total.inc(len(data))
+
+    # Activity keeps the session alive
+    return await _sessions().find_one_and_update(
+        {"_id": session["_id"]},
+        {
+            "$addToSet": {"received": n},
+            "$set": {
+                "expires_at": datetime.utcnow()
+                + timedelta(seconds=UPLOAD_SESSION_TTL_SECONDS)
+            },
+        },
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+@timed("files")
+async def finalize_upload_session(session: Dict[str, Any]) -> str:
+    """Turn the uploaded chunks into a GridFS file without copying them."""
+    if len(set(session["received"])) != chunk_count(session):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Upload is incomplete",
+        )
+
+    metadata = create_file_metadata(
+        session["assignment_id"], session["filename"], session["content_type"]
+    )
+    try:
+        await mongodb.db.fs.files.insert_one(
+            {
+                "_id": session["_id"],
+                "length": session["total_size"],
+                "chunkSize": session["chunk_size"],
+                "uploadDate": metadata["upload_date"],
+                "filename": session["filename"],
+                "contentType": session["content_type"],
+                "metadata": metadata,
+            }
+        )
+    except DuplicateKeyError:
+        # Already finalized by a retried request
+        pass
+
+    await _sessions().delete_one({"_id": session["_id"]})
+    return str(session["_id"])
+
+
+async def abort_upload_session(session: Dict[str, Any]):
+    """Discard an upload session and its chunks."""
+    await mongodb.db.fs.chunks.delete_many({"files_id": session["_id"]})
+    await _sessions().delete_one({"_id": session["_id"]})
+
+
+async def cleanup_expired_sessions() -> int:
+    """Delete expired upload sessions and their chunks."""
+    sessions = _sessions()
+    expired: List[ObjectId] = [
+        doc["_id"]
+        async for doc in sessions.find(
+            {"expires_at": {"$lt": datetime.utcnow()}}, {"_id": 1}
+        )
+    ]
+    if not expired:
+        return 0
+
+    await mongodb.db.fs.chunks.delete_many({"files_id": {"$in": expired}})
+    await sessions.delete_many({"_id": {"$in": expired}})
+    return len(expired)
@@ -0,0 +1,275 @@
+import asyncio
+import csv
+import io
+import json
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from asyncpg.exceptions import UniqueViolationError
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from sqlalchemy import insert, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.models.group import Group
+from app.models.user import User, UserRole
+from app.schemas.user import UserCreate
+from app.services.auth import get_password_hash
+
+# Load environment variables
+load_dotenv()
+
+# Import settings
+USER_IMPORT_MAX_ROWS = int(os.getenv("USER_IMPORT_MAX_ROWS", "20000"))
+USER_IMPORT_PROCESSES = int(
+    os.getenv("USER_IMPORT_PROCESSES", str(os.cpu_count() or 1))
+)
+
+# Column order used for COPY
+USER_COLUMNS = (
+    "id",
+    "username",
+    "password_hash",
+    "role",
+    "group_id",
+    "full_name",
+    "email",
+    "is_active",
+)
+
+# Hashing pool, started on first use
+_hash_pool: Optional[ProcessPoolExecutor] = None
+
+
+def parse_import_file(content: bytes, filename: str) -> List[Dict[str, Any]]:
+    """Parse an uploaded CSV or JSON file into raw rows."""
+    try:
+        text = content.decode("utf-8-sig")
+        if filename.lower().endswith(".json"):
+            rows = json.loads(text)
+            if not isinstance(rows, list):
+                raise ValueError("JSON import must be a list of users")
+        else:
+            rows = list(csv.DictReader(io.StringIO(text)))
+    except (UnicodeDecodeError, ValueError, csv.Error) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Could not parse import file: {str(e)}",
+        )
+
+    if len(rows) > USER_IMPORT_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Import is limited to {USER_IMPORT_MAX_ROWS} users",
+        )
+    return rows
+
+
+def hash_passwords(passwords: List[str]) -> List[str]:
+    """Hash a chunk of passwords; runs in a pool process."""
+    return [get_password_hash(password) for password in passwords]
+
+
+def _get_hash_pool() -> ProcessPoolExecutor:
+    global _hash_pool
+
+    if _hash_pool is None:
+        # Spawned, not forked: the API process runs threads and an event loop
+        _hash_pool = ProcessPoolExecutor(
+            max_workers=USER_IMPORT_PROCESSES,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _hash_pool
+
+
+def shutdown_hash_pool():
+    """Stop the hashing processes."""
+    global _hash_pool
+
+    if _hash_pool is not None:
+        _hash_pool.shutdown(cancel_futures=True)
+    _hash_pool = None
+
+
+async def _hash_all(passwords: List[str]) -> List[str]:
+    if not passwords:
+        return []
+
+    loop = asyncio.get_running_loop()
+    pool = _get_hash_pool()
+    # A few chunks per process keeps them all busy to the end
+    size = max(1, -(-len(passwords) // (USER_IMPORT_PROCESSES * 4)))
+    chunks = await asyncio.gather(
+        *(
+            loop.run_in_executor(pool, hash_passwords, passwords[i : i + size])
+            for i in range(0, len(passwords), size)
+        )
+    )
+    return [password_hash for chunk in chunks for password_hash in chunk]
+
+
+async def _validate(
+    db: AsyncSession, raw_rows: List[Dict[str, Any]]
+) -> Tuple[List[Tuple[int, UserCreate]], List[Dict[str, Any]]]:
+    errors = []
+    candidates: List[Tuple[int, UserCreate]] = []
+    seen_usernames, seen_emails = set(), set()
+
+    for number, raw in enumerate(raw_rows, start=1):
+        if isinstance(raw, dict) and raw.get("group_id") == "":
+            raw = dict(raw, group_id=None)
+        try:
+            user = UserCreate.parse_obj(raw)
+        except ValidationError as e:
+            first = e.errors()[0]
+            field = ".".join(str(part) for part in first["loc"])
+            errors.append(
+                {
+                    "row": number,
+                    "username": raw.get("username") if isinstance(raw, dict) else None,
+                    "error": f"{field}: {first['msg']}",
+                }
+            )
+            continue
+
+        if user.username in seen_usernames or user.email in seen_emails:
+            errors.append(
+                {
+                    "row": number,
+                    "username": user.username,
+                    "error": "Duplicate username or email in import file",
+                }
+            )
+            continue
+        seen_usernames.add(user.username)
+        seen_emails.add(user.email)
+        candidates.append((number, user))
+
+    if not candidates:
+        return candidates, errors
+
+    # One set-based lookup each for existing users and referenced groups
+    result = await db.execute(
+        select(User.username, User.email).where(
+            or_(
+                User.username.in_(seen_usernames),
+                User.email.in_(seen_emails),
+            )
+        )
+    )
+    taken_usernames, taken_emails = set(), set()
+    for username, email in result.all():
+        taken_usernames.add(username)
+        taken_emails.add(email)
+
+    group_ids = {user.group_id for _, user in candidates if user.group_id}
+    known_groups = set()
+    if group_ids:
+        result = await db.execute(select(Group.id).where(Group.id.in_(group_ids)))
+        known_groups = set(result.scalars().all())
+
+    valid = []
+    for number, user in candidates:
+        if user.username in taken_usernames:
+            error = "Username already exists"
+        elif user.email in taken_emails:
+            error = "Email already exists"
+        elif user.group_id and user.group_id not in known_groups:
+            error = "Group not found"
+        else:
+            valid.append((number, user))
+            continue
+        errors.append({"row": number, "username": user.username, "error": error})
+
+    return valid, errors
+
+
+async def _copy_users(db: AsyncSession, records: List[Tuple]) -> bool:
+    """Load rows with COPY when the driver supports it."""
+    connection = await db.connection()
+    raw_connection = await connection.get_raw_connection()
+    driver_connection = raw_connection.driver_connection
+    if not hasattr(driver_connection, "copy_records_to_table"):
+        return False
+
+    # Runs inside the session's transaction on the same connection
+    await driver_connection.copy_records_to_table(
+        User.__tablename__, records=records, columns=USER_COLUMNS
+    )
+    return True
+
+
+async def import_users(
+    db: AsyncSession, raw_rows: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Validate, hash and insert users, reporting errors per row.
+
+    Valid rows are imported even when others fail; the caller commits.
+    """
+    started = time.perf_counter()
+    valid, errors = await _validate(db, raw_rows)
+
+    hash_started = time.perf_counter()
+    password_hashes = await _hash_all([user.password for _, user in valid])
+    hash_seconds = time.perf_counter() - hash_started
+
+    insert_started = time.perf_counter()
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "username": user.username,
+            "password_hash": password_hash,
+            "role": UserRole(user.role.value),
+            "group_id": user.group_id,
+            "full_name": user.full_name,
+            "email": user.email,
+            "is_active": True,
+        }
+        for (_, user), password_hash in zip(valid, password_hashes)
+    ]
+    method = "none"
+    if rows:
+        # Enum columns store the member name, which COPY has to send as is
+        records = [
+            tuple(
+                row[column].name if column == "role" else row[column]
+                for column in USER_COLUMNS
+            )
+            for row in rows
+        ]
+        try:
+            if await _copy_users(db, records):
+                method = "copy"
+            else:
+                # Sent as multi-row INSERTs by the driver
+                await db.execute(insert(User), rows)
+                method = "insert"
+        except (IntegrityError, UniqueViolationError):
+            # Lost a race with a concurrent registration
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Users were created concurrently; retry the import",
+            )
+    insert_seconds = time.perf_counter() - insert_started
+
+    elapsed = time.perf_counter() - started
+    errors.sort(key=lambda error: error["row"])
+    return {
+        "total": len(raw_rows),
+        "created": len(rows),
+        "failed": len(errors),
+        "errors": errors,
+        "users": [(row["id"], row["full_name"]) for row in rows],
+        "method": method,
+        "seconds": elapsed,
+        "hash_seconds": hash_seconds,
+        "insert_seconds": insert_seconds,
+        "rows_per_second": len(rows) / elapsed if elapsed else 0.0,
+    }
@@ -0,0 +1,45 @@
+"""Pytest plugin failing tests whose requests block the event loop.
+
+Load it with `pytest -p app.testing.loop_blocking`, or with
+`pytest_plugins = ["app.testing.loop_blocking"]` in a conftest. Every test
+then fails if a request it made kept the event loop busy for longer than
+`--max-loop-block-ms` (LOOP_BLOCK_THRESHOLD_MS by default), e.g. with sync
+I/O or password hashing inside an `async def` route.
+"""
+import pytest
+
+from app.services.loop_watchdog import (
+    drain_loop_watchdog,
+    enforce_loop_blocks,
+    stop_enforcing_loop_blocks,
+)
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--max-loop-block-ms",
+        type=float,
+        default=None,
+        help="fail tests whose requests block the event loop for this long",
+    )
+
+
+@pytest.fixture(autouse=True)
+def loop_block_violations(request):
+    """Collect loop blocks of the requests made by a test and fail on any."""
+    blocks = enforce_loop_blocks(request.config.getoption("--max-loop-block-ms"))
+    try:
+        yield blocks
+        # Blocks are reported up to one ping later; collect them for this test
+        drain_loop_watchdog()
+    finally:
+        stop_enforcing_loop_blocks()
+
+    if blocks:
+        lines = []
+        for block in blocks:
+            lines.append(
+                f"{block['method']} {block['route']}: blocked {block['blocked_ms']} ms"
+            )
+            lines.extend(f"    {entry}" for entry in block["stack"] or [])
+        pytest.fail("Event loop blocked:\n" + "\n".join(lines), pytrace=False)
@@ -0,0 +1,46 @@
+"""Pytest plugin failing tests whose requests break their query budget.
+
+Load it with `pytest -p app.testing.query_budget`, or with
+`pytest_plugins = ["app.testing.query_budget"]` in a conftest. Every test
+then fails if a request it made ran more queries than its route declares
+with `query_budget`, or repeated a statement QUERY_REPEAT_THRESHOLD times.
+"""
+import pytest
+
+from app.services.query_counter import (
+    collect_queries,
+    enforce_query_budgets,
+    stop_enforcing_query_budgets,
+)
+
+
+@pytest.fixture(autouse=True)
+def query_budget_violations():
+    """Collect violations of the requests made by a test and fail on any."""
+    violations = enforce_query_budgets()
+    try:
+        yield violations
+    finally:
+        stop_enforcing_query_budgets()
+
+    if violations:
+        lines = []
+        for violation in violations:
+            if violation["problem"] == "over_budget":
+                lines.append(
+                    f"{violation['route']}: {violation['queries']} queries, "
+                    f"budget {violation['budget']}"
+                )
+            else:
+                lines.append(
+                    f"{violation['route']}: ran {violation['queries']} times: "
+                    f"{violation['statement']}"
+                )
+        pytest.fail("Query budget exceeded:\n" + "\n".join(lines), pytrace=False)
+
+
+@pytest.fixture
+def count_queries():
+    """Count the queries run inside a test, e.g. by a service function."""
+    with collect_queries() as log:
+        yield log
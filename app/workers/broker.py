@@ -0,0 +1,215 @@
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+import aio_pika
+
+from app.database.rabbitmq import (
+    RABBITMQ_HOST,
+    RABBITMQ_PORT,
+    RABBITMQ_USER,
+    RABBITMQ_PASSWORD,
+    RABBITMQ_VHOST,
+)
+
+# Messages that cannot be decoded go to "<queue>.dead", like notifications.dead
+DEAD_LETTER_SUFFIX = ".dead"
+ERROR_HEADER = "x-error"
+
+logger = logging.getLogger(__name__)
+
+
+class Delivery:
+    """A consumed message together with its acknowledgement callbacks."""
+
+    def __init__(
+        self,
+        body: Dict[str, Any],
+        headers: Optional[Dict[str, Any]],
+        ack: Callable[[], Awaitable[None]],
+        reject: Callable[[bool], Awaitable[None]],
+    ):
+        self.body = body
+        self.headers = headers or {}
+        self._ack = ack
+        self._reject = reject
+
+    async def ack(self):
+        """Acknowledge the message."""
+        await self._ack()
+
+    async def reject(self, requeue: bool = False):
+        """Reject the message, optionally returning it to the queue."""
+        await self._reject(requeue)
+
+
+class AMQPBroker:
+    """RabbitMQ broker used by the worker processes."""
+
+    def __init__(self):
+        self.connection = None
+
+    async def connect(self):
+        """Connect to RabbitMQ server."""
+        self.connection = await aio_pika.connect_robust(
+            host=RABBITMQ_HOST,
+            port=RABBITMQ_PORT,
+            login=RABBITMQ_USER,
+            password=RABBITMQ_PASSWORD,
+            virtualhost=RABBITMQ_VHOST,
+        )
+        self._publish_channel = await self.connection.channel()
+        self._exchanges = {}
+        logger.info("Connected to RabbitMQ")
+
+    async def close(self):
+        """Close RabbitMQ connection."""
+        if self.connection and not self.connection.is_closed:
+            await self.connection.close()
+            logger.info("Disconnected from RabbitMQ")
+
+    async def declare(self, queue_name: str):
+        """Make sure a durable queue exists."""
+        await self._publish_channel.declare_queue(queue_name, durable=True)
+
+    async def consume(
+        self, queue_name: str, prefetch: int
+    ) -> AsyncIterator[Delivery]:
+        """Consume a queue with at most `prefetch` unacknowledged messages."""
+        channel = await self.connection.channel()
+        await channel.set_qos(prefetch_count=prefetch)
+        queue = await channel.declare_queue(queue_name, durable=True)
+
+        async with queue.iterator() as messages:
+            async for message in messages:
+                try:
+                    body = json.loads(message.body)
+                except ValueError as e:
+                    await self._dead_letter_raw(queue_name, message, str(e))
+                    continue
+
+                yield Delivery(
+                    body,
+                    message.headers,
+                    message.ack,
+                    lambda requeue, m=message: m.reject(requeue=requeue),
+                )
+
+    async def _dead_letter_raw(
+        self, queue_name: str, message: aio_pika.IncomingMessage, error: str
+    ):
+        """Move an undecodable message to the queue's dead-letter queue as is."""
+        dead_letter_queue = queue_name + DEAD_LETTER_SUFFIX
+        logger.warning(
+            "Dead-lettering malformed message from %s: %s", queue_name, error
+        )
+        await self.declare(dead_letter_queue)
+        await self._publish_channel.default_exchange.publish(
+            aio_pika.Message(
+                message.body,
+                headers={**(message.headers or {}), ERROR_HEADER: error[:500]},
+                content_type=message.content_type,
+                delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+            ),
+            routing_key=dead_letter_queue,
+        )
+        # Acked only once the copy is published; a crash before redelivers it
+        await message.ack()
+
+    async def publish(
+        self,
+        queue_name: str,
+        body: Dict[str, Any],
+        headers: Optional[Dict[str, Any]] = None,
+    ):
+        """Publish a persistent message to a queue."""
+        await self._publish_channel.default_exchange.publish(
+            aio_pika.Message(
+                json.dumps(body).encode(),
+                headers=headers,
+                delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+            ),
+            routing_key=queue_name,
+        )
+
+    async def broadcast(self, exchange_name: str, body: Dict[str, Any]):
+        """Publish a transient message to every queue bound to a fanout exchange."""
+        if exchange_name not in self._exchanges:
+            self._exchanges[exchange_name] = (
+                await self._publish_channel.declare_exchange(
+                    exchange_name, aio_pika.ExchangeType.FANOUT
+                )
+            )
+        await self._exchanges[exchange_name].publish(
+            aio_pika.Message(json.dumps(body).encode()), routing_key=""
+        )
+
+
+class InMemoryBroker:
+    """In-process stand-in for RabbitMQ, used by tests and benchmarks.
+
+    Mirrors the prefetch and acknowledgement semantics of AMQPBroker.
+    """
+
+    def __init__(self):
+        self.queues: Dict[str, asyncio.Queue] = {}
+        self.broadcasts: Dict[str, List[Dict[str, Any]]] = {}
+
+    def _queue(self, queue_name: str) -> asyncio.Queue:
+        if queue_name not in self.queues:
+            self.queues[queue_name] = asyncio.Queue()
+        return self.queues[queue_name]
+
+    async def connect(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def declare(self, queue_name: str):
+        """Make sure a queue exists."""
+        self._queue(queue_name)
+
+    async def consume(
+        self, queue_name: str, prefetch: int
+    ) -> AsyncIterator[Delivery]:
+        """Consume a queue with at most `prefetch` unacknowledged messages."""
+        queue = self._queue(queue_name)
+        unacked = asyncio.Semaphore(prefetch)
+
+        while True:
+            await unacked.acquire()
+            body, headers = await queue.get()
+
+            async def ack():
+                unacked.release()
+
+            async def reject(requeue, body=body, headers=headers):
+                if requeue:
+                    queue.put_nowait((body, headers))
+                unacked.release()
+
+            yield Delivery(body, headers, ack, reject)
+
+    async def publish(
+        self,
+        queue_name: str,
+        body: Dict[str, Any],
+        headers: Optional[Dict[str, Any]] = None,
+    ):
+        """Publish a message to a queue."""
+        # Round-trip through JSON like the real broker does
+        self._queue(queue_name).put_nowait(
+            (json.loads(json.dumps(body)), dict(headers or {}))
+        )
+
+    async def broadcast(self, exchange_name: str, body: Dict[str, Any]):
+        """Record a message sent to a fanout exchange."""
+        self.broadcasts.setdefault(exchange_name, []).append(
+            json.loads(json.dumps(body))
+        )
+
+    def pending(self, queue_name: str) -> int:
+        """Number of messages waiting in a queue."""
+        return self._queue(queue_name).qsize()
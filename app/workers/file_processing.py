@@ -0,0 +1,291 @@
+"""Worker that consumes file processing tasks.
+
+Run with: python -m app.workers.file_processing
+"""
+import asyncio
+import io
+import logging
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+import fitz  # PyMuPDF
+from bson.objectid import ObjectId
+from dotenv import load_dotenv
+from gridfs import GridFS
+from PIL import Image
+from pymongo import MongoClient
+
+from app.database.mongodb import MONGO_URI, MONGO_DB_NAME
+from app.database.rabbitmq import FILE_PROCESSING_QUEUE
+from app.services.file_storage import get_original_length, read_file_content
+from app.services.log import configure_logging, stop_logging
+from app.workers.broker import AMQPBroker
+
+# Load environment variables
+load_dotenv()
+
+# Worker configuration
+FILE_PROCESSING_PREFETCH = int(os.getenv("FILE_PROCESSING_PREFETCH", "8"))
+FILE_PROCESSING_PROCESSES = int(
+    os.getenv("FILE_PROCESSING_PROCESSES", str(os.cpu_count() or 1))
+)
+FILE_PROCESSING_REPORT_SECONDS = float(
+    os.getenv("FILE_PROCESSING_REPORT_SECONDS", "60")
+)
+# Files are read into memory and copied to a pool process; larger ones are
+# skipped and get no derivatives
+FILE_PROCESSING_MAX_BYTES = int(
+    os.getenv("FILE_PROCESSING_MAX_BYTES", str(64 * 1024 * 1024))
+)
+THUMBNAIL_SIZE = (320, 320)
+PREVIEW_ZOOM = 1.5
+
+logger = logging.getLogger(__name__)
+
+
+def render_thumbnail(data: bytes) -> bytes:
+    """Render a PNG thumbnail of an image."""
+    with Image.open(io.BytesIO(data)) as image:
+        image.thumbnail(THUMBNAIL_SIZE)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA")
+        out = io.BytesIO()
+        image.save(out, format="PNG", optimize=True)
+        return out.getvalue()
+
+
+def render_pdf_preview(data: bytes) -> bytes:
+    """Render the first page of a PDF as PNG."""
+    with fitz.open(stream=data, filetype="pdf") as document:
+        page = document.load_page(0)
+        pixmap = page.get_pixmap(matrix=fitz.Matrix(PREVIEW_ZOOM, PREVIEW_ZOOM))
+        return pixmap.tobytes("png")
+
+
+# Derived artifacts generated per content type
+RENDERERS: Dict[str, List[Tuple[str, Callable[[bytes], bytes]]]] = {
+    "image/jpeg": [("thumbnail", render_thumbnail)],
+    "image/png": [("thumbnail", render_thumbnail)],
+    "image/gif": [("thumbnail", render_thumbnail)],
+    "application/pdf": [("preview", render_pdf_preview)],
+}
+
+
+def run_renderer(renderer: Callable[[bytes], bytes], data: bytes):
+    """Run a renderer in a pool process and measure the CPU time it used."""
+    started = time.process_time()
+    result = renderer(data)
+    return result, time.process_time() - started
+
+
+class FileProcessingWorker:
+    """Consume `process_new_upload` tasks and store derived artifacts."""
+
+    def __init__(
+        self,
+        broker,
+        db,
+        executor: Executor,
+        prefetch: int,
+        processes: int,
+        max_bytes: int = FILE_PROCESSING_MAX_BYTES,
+    ):
+        self.broker = broker
+        self.db = db
+        self.fs = GridFS(db)
+        self.executor = executor
+        self.prefetch = prefetch
+        self.processes = processes
+        self.max_bytes = max_bytes
+
+        self.processed = 0
+        self.skipped = 0
+        self.failed = 0
+        self.cpu_seconds = 0.0
+        self.started_at = time.monotonic()
+
+    async def run(self):
+        """Consume the queue until cancelled."""
+        tasks = set()
+        report = asyncio.create_task(self._report_loop())
+        try:
+            # The broker never hands out more than `prefetch` unacked
+            # messages, which bounds the number of concurrent tasks
+            async for delivery in self.broker.consume(
+                FILE_PROCESSING_QUEUE, self.prefetch
+            ):
+                task = asyncio.create_task(self.handle(delivery))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        finally:
+            report.cancel()
+            for task in tasks:
+                task.cancel()
+
+    async def handle(self, delivery):
+        """Process a single task message.
+
+        Every message is acked or rejected, whatever it holds; one left
+        unsettled would hold a prefetch slot for good.
+        """
+        file_id = None
+        try:
+            body = delivery.body
+            if not isinstance(body, dict):
+                logger.warning("Rejecting file task that is not an object: %s", body)
+                await delivery.reject(requeue=False)
+                return
+
+            file_id = body.get("file_id")
+            if body.get("operation") != "process_new_upload" or not file_id:
+                logger.warning("Skipping unknown file task: %s", body)
+                await delivery.ack()
+                return
+
+            await self.process_file(file_id)
+            self.processed += 1
+            await delivery.ack()
+        except Exception as e:
+            self.failed += 1
+            logger.error("Failed to process file %s: %s", file_id, e)
+            await delivery.reject(requeue=False)
+
+    async def process_file(self, file_id: str) -> Dict[str, str]:
+        """Generate and store all derived artifacts for a file.
+
+        Safe to run again for the same file, e.g. after a redelivery: the
+        derivatives of earlier runs are replaced, not duplicated.
+        """
+        loop = asyncio.get_running_loop()
+
+        grid_out = await loop.run_in_executor(None, self.fs.get, ObjectId(file_id))
+        renderers = RENDERERS.get(grid_out.content_type, [])
+        if not renderers:
+            return {}
+
+        file_info = {"file": grid_out, "metadata": grid_out.metadata}
+        size = get_original_length(file_info)
+        if size > self.max_bytes:
+            logger.info(
+                "Skipping file %s: %s bytes is above the %s byte limit",
+                file_id,
+                size,
+                self.max_bytes,
+            )
+            self.skipped += 1
+            return {}
+
+        data = await loop.run_in_executor(None, read_file_content, file_info)
+        metadata = grid_out.metadata or {}
+        base_name = os.path.splitext(grid_out.filename or "file")[0]
+
+        derived = {}
+        for kind, renderer in renderers:
+            result, cpu_seconds = await loop.run_in_executor(
+                self.executor, run_renderer, renderer, data
+            )
+            self.cpu_seconds += cpu_seconds
+
+            derived_id = await loop.run_in_executor(
+                None,
+                lambda: self.fs.put(
+                    result,
+                    filename=f"{base_name}.{kind}.png",
+                    content_type="image/png",
+                    metadata={
+                        "assignment_id": metadata.get("assignment_id"),
+                        "derived_from": file_id,
+                        "kind": kind,
+                    },
+                ),
+            )
+            derived[kind] = str(derived_id)
+
+        # Link the artifacts from the original so readers can find them
+        await loop.run_in_executor(
+            None,
+            lambda: self.db.fs.files.update_one(
+                {"_id": ObjectId(file_id)},
+                {
+                    "$set": {
+                        f"metadata.derivatives.{kind}": derived_id
+                        for kind, derived_id in derived.items()
+                    }
+                },
+            ),
+        )
+
+        # Only now drop what earlier runs stored, so links never dangle
+        await loop.run_in_executor(
+            None, self._delete_derivatives, file_id, list(derived.values())
+        )
+        return derived
+
+    def _delete_derivatives(self, file_id: str, keep: List[str]):
+        keep_ids = [ObjectId(derived_id) for derived_id in keep]
+        for stale in self.fs.find(
+            {"metadata.derived_from": file_id, "_id": {"$nin": keep_ids}}
+        ):
+            self.fs.delete(stale._id)
+
+    def stats(self) -> Dict[str, float]:
+        """Get throughput statistics."""
+        elapsed = time.monotonic() - self.started_at
+        return {
+            "processed": self.processed,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "files_per_second": self.processed / elapsed if elapsed else 0.0,
+            "files_per_core_second": (
+                self.processed / self.cpu_seconds if self.cpu_seconds else 0.0
+            ),
+            "cpu_utilization": (
+                self.cpu_seconds / (elapsed * self.processes) if elapsed else 0.0
+            ),
+        }
+
+    async def _report_loop(self):
+        while True:
+            await asyncio.sleep(FILE_PROCESSING_REPORT_SECONDS)
+            stats = self.stats()
+            logger.info(
+                "File processing: %s processed, %s skipped, %s failed, "
+                "%.2f files/s, %.2f files per core-second, %.0f%% pool utilization",
+                stats["processed"],
+                stats["skipped"],
+                stats["failed"],
+                stats["files_per_second"],
+                stats["files_per_core_second"],
+                stats["cpu_utilization"] * 100,
+            )
+
+
+async def main():
+    """Run the file processing worker."""
+    configure_logging()
+    broker = AMQPBroker()
+    await broker.connect()
+
+    client = MongoClient(MONGO_URI)
+    executor = ProcessPoolExecutor(max_workers=FILE_PROCESSING_PROCESSES)
+    worker = FileProcessingWorker(
+        broker,
+        client[MONGO_DB_NAME],
+        executor,
+        prefetch=FILE_PROCESSING_PREFETCH,
+        processes=FILE_PROCESSING_PROCESSES,
+    )
+
+    try:
+        await worker.run()
+    finally:
+        executor.shutdown(cancel_futures=True)
+        client.close()
+        await broker.close()
+        stop_logging()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
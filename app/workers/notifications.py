@@ -0,0 +1,389 @@
+"""Worker that consumes user notifications.
+
+Run with: python -m app.workers.notifications
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from app.database.postgres import SessionLocal
+from app.database.rabbitmq import (
+    NOTIFICATION_QUEUE,
+    NOTIFICATION_DEAD_LETTER_QUEUE,
+    NOTIFICATION_LIVE_EXCHANGE,
+)
+from app.services.notification_inbox import store_notifications
+from app.services.log import configure_logging, stop_logging
+from app.workers.broker import AMQPBroker, Delivery
+
+# Load environment variables
+load_dotenv()
+
+# Worker configuration
+NOTIFICATION_PREFETCH = int(os.getenv("NOTIFICATION_PREFETCH", "500"))
+NOTIFICATION_BATCH_SIZE = int(os.getenv("NOTIFICATION_BATCH_SIZE", "500"))
+NOTIFICATION_BATCH_WINDOW_SECONDS = float(
+    os.getenv("NOTIFICATION_BATCH_WINDOW_SECONDS", "1.0")
+)
+NOTIFICATION_MAX_RETRIES = int(os.getenv("NOTIFICATION_MAX_RETRIES", "5"))
+NOTIFICATION_RETRY_DELAY_SECONDS = 1.0
+NOTIFICATION_REPORT_SECONDS = float(os.getenv("NOTIFICATION_REPORT_SECONDS", "60"))
+
+# Message headers
+RETRIES_HEADER = "x-retries"
+ERROR_HEADER = "x-error"
+
+logger = logging.getLogger(__name__)
+
+# Receives the notifications of one batch grouped by user id
+NotificationSink = Callable[[Dict[str, List[Dict[str, Any]]]], Awaitable[None]]
+
+
+class PoisonMessage(ValueError):
+    """A message that can never be delivered, however often it is retried."""
+
+
+def expand_notification(body: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Turn a queued message into one notification per recipient."""
+    if not isinstance(body, dict) or not body.get("message"):
+        raise PoisonMessage("notification has no message")
+
+    if body.get("user_ids") is not None:
+        user_ids = body["user_ids"]
+    elif body.get("user_id") is not None:
+        user_ids = [body["user_id"]]
+    else:
+        raise PoisonMessage("notification has no recipient")
+    if not isinstance(user_ids, list):
+        raise PoisonMessage("user_ids must be a list")
+
+    data = body.get("data") or {}
+    if not isinstance(data, dict):
+        raise PoisonMessage("data must be an object")
+
+    return [
+        {
+            "user_id": str(user_id),
+            "message": body["message"],
+            "type": body.get("type", "info"),
+            "data": data,
+        }
+        for user_id in user_ids
+    ]
+
+
+def collapse_key(notification: Dict[str, Any]) -> Optional[Tuple[str, ...]]:
+    """Key under which newer notifications replace older ones, if any."""
+    # Only the latest attendance status of a lesson matters to a student
+    schedule_id = notification["data"].get("schedule_id")
+    if notification["type"] == "attendance" and schedule_id:
+        return ("attendance", notification["user_id"], schedule_id)
+    return None
+
+
+def group_by_user(
+    notifications: List[Dict[str, Any]]
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Group notifications by recipient, keeping their order."""
+    grouped = defaultdict(list)
+    for notification in notifications:
+        grouped[notification["user_id"]].append(notification)
+    return dict(grouped)
+
+
+async def log_sink(notifications: Dict[str, List[Dict[str, Any]]]):
+    """Default sink that only reports what would be delivered."""
+    total = sum(len(items) for items in notifications.values())
+    logger.info("Delivered %s notifications to %s users", total, len(notifications))
+
+
+_last_event_id = 0
+
+
+def next_event_id() -> int:
+    """Time-ordered event id, strictly increasing within this worker."""
+    global _last_event_id
+    _last_event_id = max(_last_event_id + 1, time.time_ns() // 1000)
+    return _last_event_id
+
+
+def inbox_sink(session_factory=SessionLocal) -> NotificationSink:
+    """Sink that stores notifications in the users' inboxes."""
+
+    async def deliver(notifications: Dict[str, List[Dict[str, Any]]]):
+        async with session_factory() as session:
+            await store_notifications(session, notifications)
+            await session.commit()
+
+    return deliver
+
+
+def live_sink(broker) -> NotificationSink:
+    """Sink that broadcasts notifications to the live streams of API workers.
+
+    Live delivery is best effort: failures are reported but not retried,
+    since clients catch up from their inbox.
+    """
+
+    async def deliver(notifications: Dict[str, List[Dict[str, Any]]]):
+        created_at = datetime.utcnow().isoformat()
+        events = {
+            user_id: [
+                {
+                    # Inbox ids when stored first, so replay matches the inbox
+                    "id": notification.get("id") or next_event_id(),
+                    "type": notification["type"],
+                    "message": notification["message"],
+                    "data": notification["data"],
+                    "created_at": notification.get("created_at", created_at),
+                }
+                for notification in items
+            ]
+            for user_id, items in notifications.items()
+        }
+        # One broadcast per batch, fanned out per user by each API worker
+        try:
+            await broker.broadcast(
+                NOTIFICATION_LIVE_EXCHANGE, {"notifications": events}
+            )
+        except Exception as e:
+            logger.error("Failed to broadcast live notifications: %s", e)
+
+    return deliver
+
+
+def chain_sinks(*sinks: NotificationSink) -> NotificationSink:
+    """Sink that delivers to several sinks in order."""
+
+    async def deliver(notifications: Dict[str, List[Dict[str, Any]]]):
+        for sink in sinks:
+            await sink(notifications)
+
+    return deliver
+
+
+class NotificationWorker:
+    """Consume the notification queue and deliver notifications in batches.
+
+    Messages are buffered for up to one batch window and handed to the sink
+    grouped per user; attendance updates for the same lesson collapse into
+    the latest one. Failing messages are republished with a retry count and
+    end up in the dead-letter queue once the retries are used up.
+    """
+
+    def __init__(
+        self,
+        broker,
+        deliver: NotificationSink = log_sink,
+        prefetch: int = NOTIFICATION_PREFETCH,
+        batch_size: int = NOTIFICATION_BATCH_SIZE,
+        window_seconds: float = NOTIFICATION_BATCH_WINDOW_SECONDS,
+        max_retries: int = NOTIFICATION_MAX_RETRIES,
+        retry_delay_seconds: float = NOTIFICATION_RETRY_DELAY_SECONDS,
+    ):
+        self.broker = broker
+        self.deliver = deliver
+        self.prefetch = prefetch
+        self.batch_size = batch_size
+        self.window_seconds = window_seconds
+        self.max_retries = max_retries
+        self.retry_delay_seconds = retry_delay_seconds
+
+        self.pending: List[Delivery] = []
+        self._batch_full = asyncio.Event()
+
+        self.received = 0
+        self.settled = 0
+        self.delivered = 0
+        self.collapsed = 0
+        self.retried = 0
+        self.dead_lettered = 0
+        self.batches = 0
+        self.started_at = time.monotonic()
+
+    async def run(self):
+        """Consume the queue until cancelled."""
+        await self.broker.declare(NOTIFICATION_DEAD_LETTER_QUEUE)
+        flusher = asyncio.create_task(self._flush_loop())
+        report = asyncio.create_task(self._report_loop())
+        try:
+            # Unacknowledged messages count against the prefetch limit, so a
+            # prefetch below the batch size flushes on the window instead
+            async for delivery in self.broker.consume(
+                NOTIFICATION_QUEUE, self.prefetch
+            ):
+                self.received += 1
+                self.pending.append(delivery)
+                if len(self.pending) >= self.batch_size:
+                    self._batch_full.set()
+        finally:
+            flusher.cancel()
+            report.cancel()
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._batch_full.wait(), self.window_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_full.clear()
+
+            while self.pending:
+                batch = self.pending[: self.batch_size]
+                del self.pending[: self.batch_size]
+                try:
+                    await self.flush(batch)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    # Unacknowledged messages are redelivered by the broker
+                    logger.error("Failed to flush %s notifications: %s", len(batch), e)
+
+    async def flush(self, batch: List[Delivery]):
+        """Deliver a batch of messages and settle every one of them."""
+        self.batches += 1
+
+        # Expand recipients and drop superseded notifications
+        expanded: List[Tuple[Delivery, List[Dict[str, Any]]]] = []
+        latest: Dict[Tuple[str, ...], Tuple[int, int]] = {}
+        for delivery in batch:
+            try:
+                notifications = expand_notification(delivery.body)
+            except PoisonMessage as e:
+                await self._dead_letter(delivery, str(e))
+                continue
+
+            for position, notification in enumerate(notifications):
+                key = collapse_key(notification)
+                if key is not None:
+                    if key in latest:
+                        self.collapsed += 1
+                    latest[key] = (len(expanded), position)
+            expanded.append((delivery, notifications))
+
+        survivors = [
+            (
+                delivery,
+                [
+                    notification
+                    for position, notification in enumerate(notifications)
+                    if collapse_key(notification) is None
+                    or latest[collapse_key(notification)] == (index, position)
+                ],
+            )
+            for index, (delivery, notifications) in enumerate(expanded)
+        ]
+
+        try:
+            await self._deliver(
+                [n for _, notifications in survivors for n in notifications]
+            )
+            for delivery, _ in survivors:
+                await self._settle(delivery)
+            return
+        except Exception as e:
+            logger.error(
+                "Batch delivery failed, retrying messages one by one: %s", e
+            )
+
+        # Isolate the messages the sink cannot handle
+        failed = False
+        for delivery, notifications in survivors:
+            try:
+                await self._deliver(notifications)
+                await self._settle(delivery)
+            except Exception as e:
+                failed = True
+                await self._retry(delivery, str(e))
+
+        if failed:
+            # Back off so an unavailable sink does not burn through retries
+            await asyncio.sleep(self.retry_delay_seconds)
+
+    async def _deliver(self, notifications: List[Dict[str, Any]]):
+        if notifications:
+            await self.deliver(group_by_user(notifications))
+            self.delivered += len(notifications)
+
+    async def _settle(self, delivery: Delivery):
+        await delivery.ack()
+        self.settled += 1
+
+    async def _retry(self, delivery: Delivery, error: str):
+        retries = int(delivery.headers.get(RETRIES_HEADER, 0)) + 1
+        if retries > self.max_retries:
+            await self._dead_letter(delivery, error)
+            return
+
+        await self.broker.publish(
+            NOTIFICATION_QUEUE, delivery.body, {RETRIES_HEADER: retries}
+        )
+        self.retried += 1
+        await self._settle(delivery)
+
+    async def _dead_letter(self, delivery: Delivery, error: str):
+        logger.error("Dead-lettering notification: %s", error)
+        await self.broker.publish(
+            NOTIFICATION_DEAD_LETTER_QUEUE,
+            delivery.body,
+            {
+                RETRIES_HEADER: int(delivery.headers.get(RETRIES_HEADER, 0)),
+                ERROR_HEADER: error[:500],
+            },
+        )
+        self.dead_lettered += 1
+        await self._settle(delivery)
+
+    def stats(self) -> Dict[str, float]:
+        """Get throughput statistics."""
+        elapsed = time.monotonic() - self.started_at
+        return {
+            "received": self.received,
+            "delivered": self.delivered,
+            "collapsed": self.collapsed,
+            "retried": self.retried,
+            "dead_lettered": self.dead_lettered,
+            "batches": self.batches,
+            "messages_per_second": self.settled / elapsed if elapsed else 0.0,
+        }
+
+    async def _report_loop(self):
+        while True:
+            await asyncio.sleep(NOTIFICATION_REPORT_SECONDS)
+            stats = self.stats()
+            logger.info(
+                "Notifications: %s received, %s delivered, %s collapsed, "
+                "%s retried, %s dead-lettered, %.1f msgs/s",
+                stats["received"],
+                stats["delivered"],
+                stats["collapsed"],
+                stats["retried"],
+                stats["dead_lettered"],
+                stats["messages_per_second"],
+            )
+
+
+async def main():
+    """Run the notification worker."""
+    configure_logging()
+    broker = AMQPBroker()
+    await broker.connect()
+
+    worker = NotificationWorker(
+        broker, chain_sinks(inbox_sink(), live_sink(broker))
+    )
+    try:
+        await worker.run()
+    finally:
+        await broker.close()
+        stop_logging()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
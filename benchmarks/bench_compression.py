@@ -0,0 +1,258 @@
+"""Benchmark transparent GridFS compression on a realistic upload corpus.
+
+Run with: python -m benchmarks.bench_compression [--corpus DIR] [--levels 1,6,9]
+
+Without --corpus a synthetic corpus is generated that mimics what teachers
+upload: lecture notes, grade sheets, legacy Word/Excel/PowerPoint files,
+PDFs with plain and already-deflated content streams, and photos.
+"""
+import argparse
+import io
+import json
+import mimetypes
+import os
+import random
+import struct
+import time
+import zlib
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from app.services import file_storage
+from app.services.file_storage import (
+    COMPRESSIBLE_CONTENT_TYPES,
+    SAMPLED_CONTENT_TYPES,
+    decode_chunks,
+    store_compressible_file,
+)
+
+GRIDFS_CHUNK_SIZE = 255 * 1024
+
+WORDS = (
+    "лекция задание семинар интеграл производная матрица вектор функция "
+    "предел ряд теорема доказательство пример упражнение вариант студент "
+    "lecture assignment deadline theorem proof example exercise matrix "
+    "integral derivative function limit series group schedule room"
+).split()
+
+
+class _MemoryGridIn:
+    def __init__(self, **kwargs):
+        self._buffer = io.BytesIO()
+        self._id = None
+        self.metadata = kwargs.get("metadata")
+
+    def write(self, data: bytes):
+        self._buffer.write(data)
+
+    def close(self):
+        pass
+
+    def abort(self):
+        pass
+
+    def chunks(self) -> List[bytes]:
+        data = self._buffer.getvalue()
+        return [
+            data[i : i + GRIDFS_CHUNK_SIZE]
+            for i in range(0, len(data), GRIDFS_CHUNK_SIZE)
+        ]
+
+
+class _MemoryGridFS:
+    """Just enough of GridFS for store_compressible_file."""
+
+    def new_file(self, **kwargs) -> _MemoryGridIn:
+        self.last = _MemoryGridIn(**kwargs)
+        return self.last
+
+
+def _text(rng: random.Random, size: int) -> bytes:
+    out = []
+    length = 0
+    while length < size:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 18)))
+        sentence = sentence.capitalize() + ".\n"
+        out.append(sentence)
+        length += len(sentence.encode())
+    return "".join(out).encode()[:size]
+
+
+def _grades(rng: random.Random, rows: int) -> bytes:
+    lines = ["student;group;date;subject;grade"]
+    for i in range(rows):
+        lines.append(
+            f"Студент {i};ИВТ-{rng.randint(1, 40)};2024-0{rng.randint(1, 9)}-"
+            f"{rng.randint(10, 28)};{rng.choice(WORDS)};{rng.randint(2, 5)}"
+        )
+    return "\n".join(lines).encode()
+
+
+def _legacy_doc(rng: random.Random, size: int) -> bytes:
+    # OLE2 compound file header, UTF-16 body text and sector padding
+    header = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1" + bytes(504)
+    body = _text(rng, size // 3).decode().encode("utf-16-le")
+    padding = bytes((512 - len(body) % 512) % 512)
+    fat = b"".join(struct.pack("<I", 0xFFFFFFFE) for _ in range(size // 512))
+    return (header + body + padding + fat)[:size]
+
+
+def _legacy_xls(rng: random.Random, rows: int) -> bytes:
+    # BIFF8-like NUMBER and LABEL records
+    out = io.BytesIO()
+    for row in range(rows):
+        for col in range(8):
+            if col == 0:
+                label = f"Студент {row}".encode("utf-16-le")
+                out.write(struct.pack("<HHHHH", 0x0204, 8 + len(label), row, col, 15))
+                out.write(label)
+            else:
+                out.write(struct.pack("<HHHHHd", 0x0203, 14, row, col, 15, rng.randint(2, 5)))
+    return out.getvalue()
+
+
+def _pdf(rng: random.Random, pages: int, deflated: bool) -> bytes:
+    out = io.BytesIO(b"%PDF-1.4\n")
+    for page in range(pages):
+        content = b"BT /F1 12 Tf 72 720 Td (" + _text(rng, 3000) + b") Tj ET"
+        if deflated:
+            content = zlib.compress(content)
+            out.write(
+                b"%d 0 obj << /Length %d /Filter /FlateDecode >> stream\n"
+                % (page + 1, len(content))
+            )
+        else:
+            out.write(b"%d 0 obj << /Length %d >> stream\n" % (page + 1, len(content)))
+        out.write(content + b"\nendstream endobj\n")
+    out.write(b"trailer << /Root 1 0 R >>\n%%EOF\n")
+    return out.getvalue()
+
+
+def synthetic_corpus(seed: int) -> List[Tuple[str, str, bytes]]:
+    """Generate (name, content type, data) triples."""
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(10):
+        corpus.append((f"notes_{i}.txt", "text/plain", _text(rng, rng.randint(20_000, 400_000))))
+    for i in range(5):
+        corpus.append((f"grades_{i}.txt", "text/plain", _grades(rng, rng.randint(500, 5000))))
+    for i in range(8):
+        corpus.append((f"lecture_{i}.doc", "application/msword", _legacy_doc(rng, rng.randint(50_000, 800_000))))
+    for i in range(5):
+        corpus.append((f"journal_{i}.xls", "application/vnd.ms-excel", _legacy_xls(rng, rng.randint(200, 3000))))
+    for i in range(6):
+        corpus.append((f"plain_{i}.pdf", "application/pdf", _pdf(rng, rng.randint(2, 40), deflated=False)))
+    for i in range(6):
+        corpus.append((f"scan_{i}.pdf", "application/pdf", _pdf(rng, rng.randint(2, 40), deflated=True)))
+    for i in range(5):
+        corpus.append((f"photo_{i}.jpg", "image/jpeg", rng.randbytes(rng.randint(100_000, 2_000_000))))
+    return corpus
+
+
+def directory_corpus(path: str) -> List[Tuple[str, str, bytes]]:
+    """Load (name, content type, data) triples from a directory of real files."""
+    corpus = []
+    for name in sorted(os.listdir(path)):
+        full_path = os.path.join(path, name)
+        if not os.path.isfile(full_path):
+            continue
+        content_type, _ = mimetypes.guess_type(name)
+        with open(full_path, "rb") as f:
+            corpus.append((name, content_type or "application/octet-stream", f.read()))
+    return corpus
+
+
+def run(corpus: List[Tuple[str, str, bytes]], level: int) -> Dict[str, Dict[str, float]]:
+    """Store every file through the upload path and decode it back."""
+    file_storage.FILE_COMPRESSION_LEVEL = level
+    totals = defaultdict(lambda: defaultdict(float))
+
+    for name, content_type, data in corpus:
+        row = totals[content_type]
+        row["files"] += 1
+        row["original_bytes"] += len(data)
+
+        if content_type not in COMPRESSIBLE_CONTENT_TYPES | SAMPLED_CONTENT_TYPES:
+            # Stored as-is by upload_file
+            row["stored_bytes"] += len(data)
+            continue
+
+        fs = _MemoryGridFS()
+        started = time.perf_counter()
+        store_compressible_file(fs, io.BytesIO(data), name, content_type, {})
+        row["compress_seconds"] += time.perf_counter() - started
+
+        stored = fs.last.chunks()
+        row["stored_bytes"] += sum(len(chunk) for chunk in stored)
+        encoding = (fs.last.metadata or {}).get("content_encoding")
+        row["compressed_files"] += 1 if encoding else 0
+
+        started = time.perf_counter()
+        decoded = b"".join(decode_chunks(stored, encoding))
+        row["decompress_seconds"] += time.perf_counter() - started
+        assert decoded == data, f"round trip failed for {name}"
+
+    return totals
+
+
+def report(totals: Dict[str, Dict[str, float]], level: int) -> List[Dict[str, float]]:
+    rows = []
+    print(f"\ngzip level {level}")
+    print(
+        f"{'content type':<32} {'files':>5} {'gz':>4} {'original MB':>12} "
+        f"{'stored MB':>10} {'ratio':>6} {'comp MB/s':>10} {'decomp MB/s':>12}"
+    )
+    grand_original = grand_stored = 0.0
+    for content_type, row in sorted(totals.items()):
+        original_mb = row["original_bytes"] / 1e6
+        stored_mb = row["stored_bytes"] / 1e6
+        grand_original += original_mb
+        grand_stored += stored_mb
+        compress_rate = original_mb / row["compress_seconds"] if row["compress_seconds"] else 0.0
+        decompress_rate = original_mb / row["decompress_seconds"] if row["decompress_seconds"] else 0.0
+        ratio = original_mb / stored_mb if stored_mb else 0.0
+        print(
+            f"{content_type[:32]:<32} {int(row['files']):>5} {int(row['compressed_files']):>4} "
+            f"{original_mb:>12.2f} {stored_mb:>10.2f} {ratio:>5.1f}x "
+            f"{compress_rate:>10.1f} {decompress_rate:>12.1f}"
+        )
+        rows.append(
+            {
+                "level": level,
+                "content_type": content_type,
+                "original_mb": original_mb,
+                "stored_mb": stored_mb,
+                "ratio": ratio,
+                "compress_mb_per_s": compress_rate,
+                "decompress_mb_per_s": decompress_rate,
+            }
+        )
+    print(
+        f"{'total':<32} {'':>5} {'':>4} {grand_original:>12.2f} {grand_stored:>10.2f} "
+        f"{grand_original / grand_stored if grand_stored else 0.0:>5.1f}x"
+    )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", help="directory of real files to use instead of the synthetic corpus")
+    parser.add_argument("--levels", default="1,6,9", help="comma-separated gzip levels")
+    parser.add_argument("--seed", type=int, default=2024)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    corpus = directory_corpus(args.corpus) if args.corpus else synthetic_corpus(args.seed)
+    print(f"Corpus: {len(corpus)} files, {sum(len(d) for _, _, d in corpus) / 1e6:.1f} MB")
+
+    results = []
+    for level in (int(level) for level in args.levels.split(",")):
+        results.extend(report(run(corpus, level), level))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
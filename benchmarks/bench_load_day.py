@@ -0,0 +1,507 @@
+"""Replay a teaching day against the real app in-process.
+
+Run with: python -m benchmarks.bench_load_day [--groups 20] [--concurrency 50] [--json day.json] [--compare before.json]
+
+Drives `app.main:app` through an in-process ASGI client, with the app's
+startup and shutdown handlers, against the Postgres, MongoDB and RabbitMQ
+configured in .env. No server or network sockets are involved, so the
+numbers are the app's own cost.
+
+The day is a sequence of phases:
+  login      students signing in at once (bcrypt-bound)
+  morning    teachers loading /schedule/today, students their group's day
+  lessons    bulk attendance for every lesson as it starts
+  downloads  teachers posting assignments with a file, students downloading
+
+A small dataset prefixed with "loadday" is created on the first run and
+reused afterwards. Results per route (throughput and p50/p95/p99 latency)
+are printed and can be saved as JSON and compared with an earlier run.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import time
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, time as dt_time
+from typing import Any, Dict, List, Optional
+
+import httpx
+from sqlalchemy import insert
+from sqlalchemy.future import select
+
+PREFIX = "loadday"
+PASSWORD = "loadday-password"
+SUBJECTS = ["Algebra", "Physics", "History", "Databases", "Networks", "English"]
+
+
+class Recorder:
+    """Latency samples per route template and phase."""
+
+    def __init__(self):
+        self.samples: Dict[str, Dict[str, List[float]]] = defaultdict(
+            lambda: defaultdict(list)
+        )
+        self.errors: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.phase_seconds: Dict[str, float] = {}
+
+    async def request(
+        self, phase: str, route: str, client: httpx.AsyncClient, method: str, url: str, **kwargs
+    ) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except Exception:
+            self.errors[phase][route] += 1
+            return None
+        elapsed = time.perf_counter() - started
+        # Error responses are counted but kept out of the latency percentiles
+        if response.status_code >= 400:
+            self.errors[phase][route] += 1
+        else:
+            self.samples[phase][route].append(elapsed)
+        return response
+
+    def summary(self) -> Dict[str, Any]:
+        phases = {}
+        for phase, seconds in self.phase_seconds.items():
+            routes = {**self.samples[phase], **self.errors[phase]}
+            phases[phase] = {
+                "seconds": round(seconds, 3),
+                "routes": {
+                    route: _summarize(
+                        self.samples[phase][route], seconds, self.errors[phase][route]
+                    )
+                    for route in routes
+                },
+            }
+        return phases
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _summarize(latencies: List[float], seconds: float, errors: int) -> Dict[str, float]:
+    values = sorted(latencies)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "throughput": round(len(values) / seconds, 1) if seconds else 0.0,
+        "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+    }
+
+
+async def prepare_dataset(groups: int, students_per_group: int, teachers: int, lessons: int):
+    """Create the loadday users, groups and today's lessons if missing."""
+    from app.database.postgres import SessionLocal
+    from app.models.group import Group
+    from app.models.schedule import Schedule
+    from app.models.user import User, UserRole
+    from app.services.auth import get_password_hash
+
+    today = date.today()
+    async with SessionLocal() as session:
+        existing = (
+            await session.execute(select(Group).where(Group.name.like(f"{PREFIX}-%")))
+        ).scalars().all()
+        if len(existing) < groups:
+            # One hash for everyone: bcrypt would otherwise dominate setup
+            password_hash = get_password_hash(PASSWORD)
+            new_groups = [
+                {"id": uuid.uuid4(), "name": f"{PREFIX}-group-{number}"}
+                for number in range(len(existing), groups)
+            ]
+            await session.execute(insert(Group), new_groups)
+            users = []
+            for group in new_groups:
+                number = group["name"].rsplit("-", 1)[1]
+                users.extend(
+                    {
+                        "id": uuid.uuid4(),
+                        "username": f"{PREFIX}_student_{number}_{index}",
+                        "password_hash": password_hash,
+                        "role": UserRole.STUDENT,
+                        "group_id": group["id"],
+                        "full_name": f"Student {number}-{index}",
+                        "email": f"{PREFIX}_student_{number}_{index}@example.com",
+                        "is_active": True,
+                    }
+                    for index in range(students_per_group)
+                )
+            have_teachers = set(
+                (
+                    await session.execute(
+                        select(User.username).where(User.role == UserRole.TEACHER)
+                    )
+                ).scalars()
+            )
+            users.extend(
+                {
+                    "id": uuid.uuid4(),
+                    "username": f"{PREFIX}_teacher_{index}",
+                    "password_hash": password_hash,
+                    "role": UserRole.TEACHER,
+                    "group_id": None,
+                    "full_name": f"Teacher {index}",
+                    "email": f"{PREFIX}_teacher_{index}@example.com",
+                    "is_active": True,
+                }
+                for index in range(teachers)
+                if f"{PREFIX}_teacher_{index}" not in have_teachers
+            )
+            if users:
+                await session.execute(insert(User), users)
+            await session.commit()
+
+        group_rows = (
+            await session.execute(
+                select(Group).where(Group.name.like(f"{PREFIX}-%")).order_by(Group.name)
+            )
+        ).scalars().all()[:groups]
+        teacher_rows = (
+            await session.execute(
+                select(User)
+                .where(User.username.like(f"{PREFIX}_teacher_%"))
+                .order_by(User.username)
+            )
+        ).scalars().all()[:teachers]
+        students = (
+            await session.execute(
+                select(User).where(
+                    User.username.like(f"{PREFIX}_student_%"),
+                    User.group_id.in_([group.id for group in group_rows]),
+                )
+            )
+        ).scalars().all()
+
+        scheduled = (
+            await session.execute(
+                select(Schedule).where(
+                    Schedule.date == today,
+                    Schedule.group_id.in_([group.id for group in group_rows]),
+                )
+            )
+        ).scalars().all()
+        if not scheduled:
+            rows = []
+            for group_index, group in enumerate(group_rows):
+                for lesson in range(lessons):
+                    teacher = teacher_rows[(group_index + lesson) % len(teacher_rows)]
+                    rows.append(
+                        {
+                            "id": uuid.uuid4(),
+                            "group_id": group.id,
+                            "teacher_id": teacher.id,
+                            "subject": SUBJECTS[lesson % len(SUBJECTS)],
+                            "date": today,
+                            "start_time": dt_time(8 + lesson * 2, 0),
+                            "end_time": dt_time(9 + lesson * 2, 30),
+                            "room": f"{100 + group_index}",
+                        }
+                    )
+            await session.execute(insert(Schedule), rows)
+            await session.commit()
+            scheduled = (
+                await session.execute(select(Schedule).where(Schedule.date == today))
+            ).scalars().all()
+
+    students_by_group: Dict[uuid.UUID, List[Any]] = defaultdict(list)
+    for student in students:
+        students_by_group[student.group_id].append(student)
+    group_ids = {group.id for group in group_rows}
+    return {
+        "groups": group_rows,
+        "teachers": teacher_rows,
+        "students": students,
+        "students_by_group": students_by_group,
+        "lessons": [lesson for lesson in scheduled if lesson.group_id in group_ids],
+    }
+
+
+def _auth(user) -> Dict[str, str]:
+    from app.services.auth import create_access_token
+
+    token = create_access_token(data={"sub": user.username, "role": user.role.value})
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def _run_all(coroutines, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(coroutine):
+        async with semaphore:
+            return await coroutine
+
+    return await asyncio.gather(*(limited(coroutine) for coroutine in coroutines))
+
+
+async def phase_login(client, recorder, data, rng, count, concurrency):
+    students = rng.sample(data["students"], min(count, len(data["students"])))
+    await _run_all(
+        (
+            recorder.request(
+                "login",
+                "POST /api/auth/token",
+                client,
+                "POST",
+                "/api/auth/token",
+                data={"username": student.username, "password": PASSWORD},
+            )
+            for student in students
+        ),
+        concurrency,
+    )
+
+
+async def phase_morning(client, recorder, data, rng, concurrency):
+    today = date.today().isoformat()
+    requests = [
+        recorder.request(
+            "morning",
+            "GET /api/schedule/today",
+            client,
+            "GET",
+            "/api/schedule/today",
+            headers=_auth(teacher),
+        )
+        for teacher in data["teachers"]
+    ]
+    requests += [
+        recorder.request(
+            "morning",
+            "GET /api/schedule",
+            client,
+            "GET",
+            "/api/schedule",
+            params={"start_date": today, "end_date": today, "group_id": str(student.group_id)},
+            headers=_auth(student),
+        )
+        for student in data["students"]
+    ]
+    rng.shuffle(requests)
+    await _run_all(requests, concurrency)
+
+
+async def phase_lessons(client, recorder, data, rng, concurrency):
+    teachers = {teacher.id: teacher for teacher in data["teachers"]}
+    statuses = ["present"] * 8 + ["absent", "late", "excused"]
+    # Lessons start in waves; every teacher of a wave submits at once
+    waves: Dict[dt_time, List[Any]] = defaultdict(list)
+    for lesson in data["lessons"]:
+        waves[lesson.start_time].append(lesson)
+
+    for start_time in sorted(waves):
+        await _run_all(
+            (
+                recorder.request(
+                    "lessons",
+                    "POST /api/attendance/bulk",
+                    client,
+                    "POST",
+                    "/api/attendance/bulk",
+                    json={
+                        "schedule_id": str(lesson.id),
+                        "attendance_data": {
+                            str(student.id): rng.choice(statuses)
+                            for student in data["students_by_group"][lesson.group_id]
+                        },
+                    },
+                    headers=_auth(teachers[lesson.teacher_id]),
+                )
+                for lesson in waves[start_time]
+            ),
+            concurrency,
+        )
+
+
+async def phase_downloads(client, recorder, data, rng, concurrency, file_kb):
+    teachers = {teacher.id: teacher for teacher in data["teachers"]}
+    # One assignment per group, posted by the teacher of its first lesson
+    first_lessons = {}
+    for lesson in sorted(data["lessons"], key=lambda lesson: lesson.start_time):
+        first_lessons.setdefault(lesson.group_id, lesson)
+
+    async def post_assignment(lesson):
+        teacher = teachers[lesson.teacher_id]
+        headers = _auth(teacher)
+        response = await recorder.request(
+            "downloads",
+            "POST /api/assignments",
+            client,
+            "POST",
+            "/api/assignments",
+            json={
+                "group_id": str(lesson.group_id),
+                "teacher_id": str(teacher.id),
+                "title": f"{lesson.subject} homework",
+                "description": "Solve the problems from the lecture.",
+            },
+            headers=headers,
+        )
+        if response is None or response.status_code >= 400:
+            return lesson.group_id, None
+        assignment_id = response.json()["id"]
+        content = rng.randbytes(file_kb * 1024)
+        response = await recorder.request(
+            "downloads",
+            "POST /api/assignments/{assignment_id}/files",
+            client,
+            "POST",
+            f"/api/assignments/{assignment_id}/files",
+            files={"file": ("task.pdf", content, "application/pdf")},
+            headers=headers,
+        )
+        if response is None or response.status_code >= 400:
+            return lesson.group_id, None
+        return lesson.group_id, response.json()["id"]
+
+    posted = await _run_all(
+        (post_assignment(lesson) for lesson in first_lessons.values()), concurrency
+    )
+    files = {group_id: file_id for group_id, file_id in posted if file_id}
+
+    requests = [
+        recorder.request(
+            "downloads",
+            "GET /api/files/{file_id}",
+            client,
+            "GET",
+            f"/api/files/{files[student.group_id]}",
+            headers=_auth(student),
+        )
+        for student in data["students"]
+        if student.group_id in files
+    ]
+    rng.shuffle(requests)
+    await _run_all(requests, concurrency)
+
+
+async def run(args) -> Dict[str, Any]:
+    from app.main import app
+
+    rng = random.Random(args.seed)
+    recorder = Recorder()
+    await app.router.startup()
+    try:
+        data = await prepare_dataset(
+            args.groups, args.students_per_group, args.teachers, args.lessons
+        )
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://loadday", timeout=None
+        ) as client:
+            phases = {
+                "login": lambda: phase_login(
+                    client, recorder, data, rng, args.logins, args.concurrency
+                ),
+                "morning": lambda: phase_morning(
+                    client, recorder, data, rng, args.concurrency
+                ),
+                "lessons": lambda: phase_lessons(
+                    client, recorder, data, rng, args.concurrency
+                ),
+                "downloads": lambda: phase_downloads(
+                    client, recorder, data, rng, args.concurrency, args.file_kb
+                ),
+            }
+            for name in args.phases.split(","):
+                started = time.perf_counter()
+                await phases[name]()
+                recorder.phase_seconds[name] = time.perf_counter() - started
+    finally:
+        await app.router.shutdown()
+
+    return {
+        "commit": _git_commit(),
+        "started_at": datetime.utcnow().isoformat(),
+        "args": vars(args),
+        "dataset": {
+            "groups": len(data["groups"]),
+            "teachers": len(data["teachers"]),
+            "students": len(data["students"]),
+            "lessons": len(data["lessons"]),
+        },
+        "phases": recorder.summary(),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(result: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None):
+    print(f"Commit {result['commit']}, dataset {result['dataset']}")
+    header = (
+        f"{'phase':<10} {'route':<44} {'reqs':>6} {'err':>4} "
+        f"{'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    )
+    if baseline:
+        header += f" {'Δp95':>8}"
+    print(header)
+    for phase, phase_result in result["phases"].items():
+        for route, stats in phase_result["routes"].items():
+            line = (
+                f"{phase:<10} {route:<44} {stats['requests']:>6} {stats['errors']:>4} "
+                f"{stats['throughput']:>8.1f} {stats['p50_ms']:>8.1f} "
+                f"{stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f}"
+            )
+            if baseline:
+                before = (
+                    baseline["phases"].get(phase, {}).get("routes", {}).get(route)
+                )
+                if before and before["p95_ms"]:
+                    change = (stats["p95_ms"] / before["p95_ms"] - 1) * 100
+                    line += f" {change:>+7.0f}%"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--groups", type=int, default=20)
+    parser.add_argument("--students-per-group", type=int, default=25)
+    parser.add_argument("--teachers", type=int, default=15)
+    parser.add_argument("--lessons", type=int, default=4, help="lessons per group today")
+    parser.add_argument("--logins", type=int, default=100, help="students in the login storm")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--file-kb", type=int, default=256)
+    parser.add_argument("--phases", default="login,morning,lessons,downloads")
+    parser.add_argument("--seed", type=int, default=2024)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="earlier results to compare p95 latency with")
+    args = parser.parse_args()
+    if not 1 <= args.lessons <= 7:
+        parser.error("--lessons must be between 1 and 7 (two-hour slots from 8:00)")
+
+    result = asyncio.run(run(args))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
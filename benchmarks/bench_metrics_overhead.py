@@ -0,0 +1,138 @@
+"""Measure what recording metrics costs per operation and per request.
+
+Run with: python -m benchmarks.bench_metrics_overhead [--ops 200000] [--requests 20000]
+
+Primitive operations are timed in a tight loop. Request overhead compares
+one small JSON endpoint called directly through ASGI, with no server or
+network, with and without the route class and middleware that record the
+HTTP metrics.
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Callable, Dict
+
+from fastapi import APIRouter, FastAPI
+from fastapi.routing import APIRoute
+
+from app.services.metrics import Counter, Histogram, MetricsMiddleware, Registry
+from app.services.request_timing import TimedRoute
+
+
+def time_op(op: Callable[[], None], count: int) -> float:
+    """Nanoseconds per call of `op`."""
+    started = time.perf_counter()
+    for _ in range(count):
+        op()
+    return (time.perf_counter() - started) / count * 1e9
+
+
+def bench_primitives(count: int) -> Dict[str, float]:
+    registry = Registry()
+    counter = Counter("bench_total", "Bench counter.", registry=registry)
+    labelled = Counter("bench_labelled_total", "Bench counter.", ("route",), registry=registry)
+    histogram = Histogram("bench_seconds", "Bench histogram.", registry=registry)
+    labelled_histogram = Histogram(
+        "bench_labelled_seconds", "Bench histogram.", ("method", "route"), registry=registry
+    )
+    for route in range(50):
+        labelled_histogram.labels("GET", f"/api/route/{route}").observe(0.01)
+
+    results = {
+        "noop": time_op(lambda: None, count),
+        "counter.inc": time_op(counter.inc, count),
+        "counter.labels().inc": time_op(lambda: labelled.labels("/api/schedule").inc(), count),
+        "histogram.observe": time_op(lambda: histogram.observe(0.042), count),
+        "histogram.labels().observe": time_op(
+            lambda: labelled_histogram.labels("GET", "/api/route/7").observe(0.042), count
+        ),
+    }
+    started = time.perf_counter()
+    registry.render()
+    results["render (50 series) us"] = (time.perf_counter() - started) * 1e6
+    return results
+
+
+def create_app(route_class, with_middleware: bool) -> FastAPI:
+    router = APIRouter(route_class=route_class)
+
+    @router.get("/api/schedule/{schedule_id}")
+    async def get_schedule(schedule_id: int):
+        return {"id": schedule_id, "subject": "Algebra", "room": "101"}
+
+    app = FastAPI()
+    app.include_router(router)
+    if with_middleware:
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+
+async def call_app(app, count: int) -> float:
+    """Microseconds per request through the ASGI interface."""
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    for number in range(count):
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": f"/api/schedule/{number}",
+            "raw_path": f"/api/schedule/{number}".encode(),
+            "root_path": "",
+            "query_string": b"",
+            "headers": [(b"host", b"bench")],
+            "client": ("127.0.0.1", 1234),
+            "server": ("bench", 80),
+        }
+        await app(scope, receive, send)
+    return (time.perf_counter() - started) / count * 1e6
+
+
+def bench_requests(count: int) -> Dict[str, float]:
+    variants = {
+        "plain route": create_app(APIRoute, False),
+        "timed route": create_app(TimedRoute, False),
+        "timed route + metrics middleware": create_app(TimedRoute, True),
+    }
+    results = {}
+    for name, app in variants.items():
+        # Warm up so route compilation and caches are excluded
+        asyncio.run(call_app(app, 500))
+        results[name] = asyncio.run(call_app(app, count))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ops", type=int, default=200_000)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    primitives = bench_primitives(args.ops)
+    print(f"{'operation':<32} {'ns/op':>8}")
+    for name, value in primitives.items():
+        print(f"{name:<32} {value:>8.0f}")
+
+    requests = bench_requests(args.requests)
+    baseline = requests["plain route"]
+    print(f"\n{'variant':<34} {'us/req':>7} {'overhead':>9}")
+    for name, value in requests.items():
+        print(f"{name:<34} {value:>7.1f} {value - baseline:>+8.1f}us")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"primitives_ns": primitives, "requests_us": requests}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Benchmark the notification worker against the in-memory broker.
+
+Run with: python -m benchmarks.bench_notification_consumer [--messages 50000] [--prefetch 50,200,1000]
+
+The message mix mimics a teaching day: attendance updates (often corrected
+several times for the same lesson), individual notifications and
+new-assignment fan-outs to whole groups. Reported rates are messages
+settled per second by a single worker process.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from typing import Any, Dict, List
+
+from app.database.rabbitmq import NOTIFICATION_QUEUE, NOTIFICATION_DEAD_LETTER_QUEUE
+from app.workers.broker import InMemoryBroker
+from app.workers.notifications import NotificationWorker
+
+
+def generate_messages(count: int, poison_rate: float, seed: int) -> List[Dict[str, Any]]:
+    """Generate notification messages the way the API publishes them."""
+    rng = random.Random(seed)
+    students = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(2000)]
+    lessons = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(200)]
+
+    messages = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < poison_rate:
+            messages.append({"message": "no recipient"})
+        elif roll < 0.7:
+            status = rng.choice(["present", "absent", "late", "excused"])
+            messages.append(
+                {
+                    "user_id": rng.choice(students[:300]),
+                    "message": f"Your attendance status has been updated to '{status}'.",
+                    "type": "attendance",
+                    "data": {"schedule_id": rng.choice(lessons[:20]), "status": status},
+                }
+            )
+        elif roll < 0.95:
+            messages.append(
+                {
+                    "user_id": rng.choice(students),
+                    "message": "Your group schedule has changed.",
+                    "type": "general",
+                    "data": {},
+                }
+            )
+        else:
+            messages.append(
+                {
+                    "user_ids": rng.sample(students, 30),
+                    "message": "New assignment 'Homework' has been posted.",
+                    "type": "assignment",
+                    "data": {"group_id": rng.choice(lessons)},
+                }
+            )
+    return messages
+
+
+async def run(messages: List[Dict[str, Any]], prefetch: int, batch_size: int, window: float) -> Dict[str, float]:
+    """Drain the queue with one worker and measure its throughput."""
+    broker = InMemoryBroker()
+    for message in messages:
+        await broker.publish(NOTIFICATION_QUEUE, message)
+
+    delivered_users = 0
+
+    async def sink(notifications):
+        nonlocal delivered_users
+        delivered_users += len(notifications)
+
+    worker = NotificationWorker(
+        broker,
+        sink,
+        prefetch=prefetch,
+        batch_size=batch_size,
+        window_seconds=window,
+    )
+    started = time.perf_counter()
+    task = asyncio.create_task(worker.run())
+    while worker.settled < len(messages) + worker.retried:
+        await asyncio.sleep(0.001)
+    elapsed = time.perf_counter() - started
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+    stats = worker.stats()
+    return {
+        "prefetch": prefetch,
+        "batch_size": batch_size,
+        "messages": len(messages),
+        "seconds": elapsed,
+        "messages_per_second": len(messages) / elapsed,
+        "delivered": stats["delivered"],
+        "collapsed": stats["collapsed"],
+        "dead_lettered": broker.pending(NOTIFICATION_DEAD_LETTER_QUEUE),
+        "batches": stats["batches"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=50_000)
+    parser.add_argument("--prefetch", default="50,200,1000", help="comma-separated prefetch values")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--window", type=float, default=0.05, help="batch window in seconds")
+    parser.add_argument("--poison-rate", type=float, default=0.001)
+    parser.add_argument("--seed", type=int, default=2024)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    messages = generate_messages(args.messages, args.poison_rate, args.seed)
+
+    print(
+        f"{'prefetch':>8} {'batch':>6} {'msgs/s':>10} {'delivered':>10} "
+        f"{'collapsed':>10} {'dead':>6} {'batches':>8}"
+    )
+    results = []
+    for prefetch in (int(value) for value in args.prefetch.split(",")):
+        result = asyncio.run(run(messages, prefetch, args.batch_size, args.window))
+        results.append(result)
+        print(
+            f"{result['prefetch']:>8} {result['batch_size']:>6} "
+            f"{result['messages_per_second']:>10.0f} {result['delivered']:>10} "
+            f"{result['collapsed']:>10} {result['dead_lettered']:>6} {result['batches']:>8}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
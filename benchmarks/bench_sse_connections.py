@@ -0,0 +1,170 @@
+"""Load test: how many idle notification streams one API worker can hold.
+
+Run with: python -m benchmarks.bench_sse_connections [--connections 10000] [--step 2000]
+
+Starts a uvicorn worker serving the real /api/notifications/stream route
+(authentication replaced by a user id in the `token` query), opens idle
+SSE connections in steps and reports the worker's resident memory per
+connection. At the end one event is published to every user and the time
+until all clients received it is measured.
+"""
+import argparse
+import asyncio
+import json
+import resource
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+from typing import List
+
+PORT = 8765
+
+
+def _raise_fd_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return hard
+
+
+def create_app():
+    """App with the stream route and a few benchmark-only helpers."""
+    from fastapi import FastAPI
+
+    from app.api import notifications
+    from app.dependencies.auth import get_stream_user
+    from app.services.notification_hub import notification_hub
+
+    app = FastAPI()
+    app.include_router(notifications.router, prefix="/api")
+
+    async def fake_stream_user(token: str):
+        return SimpleNamespace(id=token)
+
+    app.dependency_overrides[get_stream_user] = fake_stream_user
+
+    @app.post("/bench/publish")
+    async def publish():
+        event_id = int(time.time() * 1000)
+        users = list(notification_hub._subscribers)
+        for user_id in users:
+            notification_hub.publish(
+                user_id, {"id": event_id, "type": "general", "message": "ping", "data": {}}
+            )
+        return {"users": len(users)}
+
+    @app.get("/bench/stats")
+    async def stats():
+        with open("/proc/self/status") as f:
+            rss_kb = next(int(line.split()[1]) for line in f if line.startswith("VmRSS"))
+        return {"connections": notification_hub.connections(), "rss_kb": rss_kb}
+
+    return app
+
+
+def serve():
+    import uvicorn
+
+    _raise_fd_limit()
+    uvicorn.run(create_app(), host="127.0.0.1", port=PORT, log_level="warning", backlog=4096)
+
+
+async def _request(method: str, path: str) -> dict:
+    reader, writer = await asyncio.open_connection("127.0.0.1", PORT)
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: bench\r\nContent-Length: 0\r\nConnection: close\r\n\r\n".encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return json.loads(response.split(b"\r\n\r\n", 1)[1])
+
+
+async def _open_stream(user_id: int, received: asyncio.Event, ready: asyncio.Event, streams: List):
+    reader, writer = await asyncio.open_connection("127.0.0.1", PORT)
+    writer.write(
+        f"GET /api/notifications/stream?token=user-{user_id} HTTP/1.1\r\n"
+        f"Host: bench\r\nAccept: text/event-stream\r\n\r\n".encode()
+    )
+    await writer.drain()
+    streams.append(writer)
+
+    buffer = b""
+    while b"retry:" not in buffer:
+        buffer += await reader.read(4096)
+    ready.set()
+    while b"data:" not in buffer:
+        chunk = await reader.read(4096)
+        if not chunk:
+            return
+        buffer += chunk
+    received.set()
+
+
+async def run(connections: int, step: int):
+    _raise_fd_limit()
+    server = subprocess.Popen([sys.executable, "-m", "benchmarks.bench_sse_connections", "--serve"])
+    try:
+        for _ in range(100):
+            try:
+                await _request("GET", "/bench/stats")
+                break
+            except OSError:
+                await asyncio.sleep(0.1)
+
+        baseline = await _request("GET", "/bench/stats")
+        print(f"Baseline RSS: {baseline['rss_kb'] / 1024:.1f} MB")
+        print(f"{'connections':>11} {'RSS MB':>8} {'KB/conn':>8} {'open s':>7}")
+
+        streams, readers, received = [], [], []
+        opened = 0
+        while opened < connections:
+            started = time.perf_counter()
+            batch = []
+            for user_id in range(opened, min(opened + step, connections)):
+                ready, got = asyncio.Event(), asyncio.Event()
+                readers.append(asyncio.create_task(_open_stream(user_id, got, ready, streams)))
+                received.append(got)
+                batch.append(ready)
+                # Stay under the listen backlog
+                if len(batch) % 500 == 0:
+                    await asyncio.gather(*(event.wait() for event in batch[-500:]))
+            await asyncio.gather(*(event.wait() for event in batch))
+            opened += len(batch)
+            elapsed = time.perf_counter() - started
+
+            stats = await _request("GET", "/bench/stats")
+            per_connection = (stats["rss_kb"] - baseline["rss_kb"]) / stats["connections"]
+            print(
+                f"{stats['connections']:>11} {stats['rss_kb'] / 1024:>8.1f} "
+                f"{per_connection:>8.1f} {elapsed:>7.2f}"
+            )
+
+        started = time.perf_counter()
+        await _request("POST", "/bench/publish")
+        await asyncio.gather(*(event.wait() for event in received))
+        print(f"Fan-out of one event to {connections} streams: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+        for writer in streams:
+            writer.close()
+        for task in readers:
+            task.cancel()
+    finally:
+        # Open streams would keep a graceful shutdown waiting forever
+        server.kill()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--connections", type=int, default=10_000)
+    parser.add_argument("--step", type=int, default=2000)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve()
+    else:
+        asyncio.run(run(args.connections, args.step))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,452 @@
+"""Generate a whole university of synthetic data for load testing.
+
+Run with: python -m benchmarks.seed_university [--students 30000] [--teachers 2000] [--years 5] [--streams 8] [--today 2026-10-19]
+
+Creates groups, users, every lesson of the last `--years` academic years,
+attendance for all lessons before `--today` (the current date by default),
+weekly assignments and a pool of GridFS files the assignments point to.
+The same `--seed` and `--today` always produce the same rows and ids; only
+the salted password hash differs between runs.
+
+Postgres is loaded with COPY. Groups are split into partitions that are
+generated and copied by `--streams` processes in parallel, each over its
+own connection. Ids are derived from the seed, so partitions need no
+coordination. Every user gets the same password (`--password`), hashed
+once.
+
+Ids repeat between runs with the same seed, so load into an empty
+database or pass `--reset`, which TRUNCATES the app's tables first.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import random
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import Any, Dict, Iterator, List, Tuple
+
+import asyncpg
+from bson.objectid import ObjectId
+
+SUBJECTS = [
+    "Algebra",
+    "Calculus",
+    "Physics",
+    "Databases",
+    "Networks",
+    "History",
+    "English",
+    "Philosophy",
+]
+FIRST_NAMES = [
+    "Alex", "Anna", "Boris", "Daria", "Egor", "Elena", "Ivan", "Irina",
+    "Kirill", "Maria", "Nikita", "Olga", "Pavel", "Sofia", "Timur", "Yana",
+]
+LAST_NAMES = [
+    "Smirnov", "Ivanova", "Kuznetsov", "Popova", "Sokolov", "Lebedeva",
+    "Kozlov", "Novikova", "Morozov", "Petrova", "Volkov", "Orlova",
+]
+# Enum columns store member names
+ATTENDANCE_STATUSES = [
+    ("PRESENT", 0.85),
+    ("LATE", 0.06),
+    ("ABSENT", 0.07),
+    ("EXCUSED", 0.02),
+]
+SEEDED_TABLES = [
+    "notification_counters",
+    "notifications",
+    "outbox_messages",
+    "attendances",
+    "assignments",
+    "schedules",
+    "users",
+    "groups",
+]
+
+
+def make_id(seed: int, kind: str, key: Any) -> uuid.UUID:
+    """A version 4 UUID derived from the seed, the same in every process."""
+    digest = hashlib.blake2b(f"{seed}:{kind}:{key}".encode(), digest_size=16).digest()
+    return uuid.UUID(bytes=digest, version=4)
+
+
+def file_object_id(seed: int, index: int) -> ObjectId:
+    return ObjectId(make_id(seed, "file", index).bytes[:12])
+
+
+def teaching_days(years: int, today: date) -> List[date]:
+    """Weekdays of the autumn and spring terms of the last academic years."""
+    current = today.year if today.month >= 9 else today.year - 1
+    days = []
+    for year in range(current - years + 1, current + 1):
+        for start, end in (
+            (date(year, 9, 1), date(year, 12, 24)),
+            (date(year + 1, 2, 9), date(year + 1, 5, 31)),
+        ):
+            day = start
+            while day <= end:
+                if day.weekday() < 5:
+                    days.append(day)
+                day += timedelta(days=1)
+    return days
+
+
+def database_dsn() -> str:
+    from app.database.postgres import DATABASE_URL
+
+    return DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+
+def _teacher_index(config: Dict[str, Any], group: int, subject: int) -> int:
+    return (group * len(SUBJECTS) + subject) % config["teachers"]
+
+
+def _group_students(config: Dict[str, Any], group: int) -> range:
+    size = config["group_size"]
+    return range(group * size, min((group + 1) * size, config["students"]))
+
+
+def _name(rng: random.Random) -> str:
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def _user_row(config, kind: str, index: int, role: str, group_id, rng) -> Tuple:
+    username = f"seed_{kind}_{index}"
+    return (
+        make_id(config["seed"], kind, index),
+        username,
+        config["password_hash"],
+        role,
+        group_id,
+        _name(rng),
+        f"{username}@example.com",
+        True,
+    )
+
+
+USER_COLUMNS = (
+    "id",
+    "username",
+    "password_hash",
+    "role",
+    "group_id",
+    "full_name",
+    "email",
+    "is_active",
+)
+
+
+def student_rows(config: Dict[str, Any], groups: range) -> Iterator[Tuple]:
+    for group in groups:
+        rng = random.Random(f"{config['seed']}:students:{group}")
+        group_id = make_id(config["seed"], "group", group)
+        for index in _group_students(config, group):
+            yield _user_row(config, "student", index, "STUDENT", group_id, rng)
+
+
+def schedule_rows(config: Dict[str, Any], groups: range, days: List[date]) -> Iterator[Tuple]:
+    seed = config["seed"]
+    for group in groups:
+        group_id = make_id(seed, "group", group)
+        for day_index, day in enumerate(days):
+            for slot in range(config["lessons_per_day"]):
+                subject = (day_index + slot) % len(SUBJECTS)
+                start = datetime.combine(day, dt_time(8, 30)) + timedelta(minutes=105 * slot)
+                yield (
+                    make_id(seed, "schedule", f"{group}:{day_index}:{slot}"),
+                    group_id,
+                    make_id(seed, "teacher", _teacher_index(config, group, subject)),
+                    SUBJECTS[subject],
+                    day,
+                    start.time(),
+                    (start + timedelta(minutes=90)).time(),
+                    str(100 + (group * 3 + slot) % 400),
+                )
+
+
+def attendance_rows(config: Dict[str, Any], groups: range, days: List[date]) -> Iterator[Tuple]:
+    seed = config["seed"]
+    today = date.fromisoformat(config["today"])
+    statuses = [status for status, _ in ATTENDANCE_STATUSES]
+    weights = [weight for _, weight in ATTENDANCE_STATUSES]
+    for group in groups:
+        rng = random.Random(f"{seed}:attendance:{group}")
+        students = [make_id(seed, "student", index) for index in _group_students(config, group)]
+        for day_index, day in enumerate(days):
+            if day >= today:
+                break
+            for slot in range(config["lessons_per_day"]):
+                if rng.random() >= config["attendance_rate"]:
+                    continue
+                schedule_id = make_id(seed, "schedule", f"{group}:{day_index}:{slot}")
+                for student_id, status in zip(
+                    students, rng.choices(statuses, weights, k=len(students))
+                ):
+                    yield (
+                        uuid.UUID(int=rng.getrandbits(128), version=4),
+                        schedule_id,
+                        student_id,
+                        status,
+                    )
+
+
+def assignment_rows(config: Dict[str, Any], groups: range, days: List[date]) -> Iterator[Tuple]:
+    seed = config["seed"]
+    mondays = [day for day in days if day.weekday() == 0]
+    for group in groups:
+        rng = random.Random(f"{seed}:assignments:{group}")
+        group_id = make_id(seed, "group", group)
+        for week, monday in enumerate(mondays):
+            for number in range(config["assignments_per_week"]):
+                subject = (week + number) % len(SUBJECTS)
+                created_at = datetime.combine(monday, dt_time(9, 0))
+                file_ids = []
+                if config["files"]:
+                    file_ids.append(str(file_object_id(seed, rng.randrange(config["files"]))))
+                yield (
+                    make_id(seed, "assignment", f"{group}:{week}:{number}"),
+                    group_id,
+                    make_id(seed, "teacher", _teacher_index(config, group, subject)),
+                    f"{SUBJECTS[subject]}: problem set {week + 1}.{number + 1}",
+                    "Generated assignment for load testing.",
+                    file_ids,
+                    created_at,
+                    created_at + timedelta(days=7),
+                )
+
+
+async def _copy_partition(config: Dict[str, Any], groups: range) -> Dict[str, int]:
+    days = [date.fromisoformat(day) for day in config["days"]]
+    connection = await asyncpg.connect(config["dsn"])
+    counts = {}
+    try:
+        # Parents before children so foreign keys hold at every step
+        for table, columns, rows in (
+            ("users", USER_COLUMNS, student_rows(config, groups)),
+            (
+                "schedules",
+                ("id", "group_id", "teacher_id", "subject", "date", "start_time", "end_time", "room"),
+                schedule_rows(config, groups, days),
+            ),
+            (
+                "attendances",
+                ("id", "schedule_id", "student_id", "status"),
+                attendance_rows(config, groups, days),
+            ),
+            (
+                "assignments",
+                ("id", "group_id", "teacher_id", "title", "description", "file_ids", "created_at", "deadline"),
+                assignment_rows(config, groups, days),
+            ),
+        ):
+            counted = _Counted(rows)
+            await connection.copy_records_to_table(table, records=counted, columns=columns)
+            counts[table] = counted.count
+    finally:
+        await connection.close()
+    return counts
+
+
+class _Counted:
+    """Iterable that counts the rows COPY pulled from it."""
+
+    def __init__(self, rows: Iterator[Tuple]):
+        self.rows = rows
+        self.count = 0
+
+    def __iter__(self):
+        for row in self.rows:
+            self.count += 1
+            yield row
+
+
+def seed_partition(config: Dict[str, Any], start: int, stop: int) -> Dict[str, int]:
+    """Generate and copy the rows of groups `start` to `stop`; runs in a pool process."""
+    return asyncio.run(_copy_partition(config, range(start, stop)))
+
+
+async def prepare(config: Dict[str, Any], reset: bool):
+    """Create the schema, optionally empty it, and load groups and staff."""
+    import app.main  # noqa: F401  registers every model
+    from app.database.postgres import Base, engine
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        if reset:
+            tables = ", ".join(SEEDED_TABLES)
+            await conn.exec_driver_sql(f"TRUNCATE {tables} CASCADE")
+    await engine.dispose()
+
+    seed = config["seed"]
+    connection = await asyncpg.connect(config["dsn"])
+    try:
+        await connection.copy_records_to_table(
+            "groups",
+            records=(
+                (make_id(seed, "group", group), f"SEED-{group // 100 + 1:02d}-{group % 100:02d}")
+                for group in range(config["groups"])
+            ),
+            columns=("id", "name"),
+        )
+        rng = random.Random(f"{seed}:staff")
+        staff = [
+            _user_row(config, "teacher", index, "TEACHER", None, rng)
+            for index in range(config["teachers"])
+        ]
+        staff.append(_user_row(config, "admin", 0, "ADMIN", None, rng))
+        await connection.copy_records_to_table("users", records=staff, columns=USER_COLUMNS)
+    finally:
+        await connection.close()
+
+
+def upload_files(config: Dict[str, Any], reset: bool) -> int:
+    """Store the pool of assignment files in GridFS."""
+    from gridfs import GridFS
+    from pymongo import MongoClient
+
+    from app.database.mongodb import MONGO_DB_NAME, MONGO_URI
+
+    client = MongoClient(MONGO_URI)
+    database = client[MONGO_DB_NAME]
+    fs = GridFS(database)
+    if reset:
+        seeded = [doc["_id"] for doc in database.fs.files.find({"metadata.seeded": True}, {"_id": 1})]
+        for file_id in seeded:
+            fs.delete(file_id)
+
+    def put(index: int) -> int:
+        rng = random.Random(f"{config['seed']}:file:{index}")
+        content = rng.randbytes(config["file_kb"] * 1024)
+        filename = f"seed-{index}.pdf"
+        fs.put(
+            content,
+            _id=file_object_id(config["seed"], index),
+            filename=filename,
+            content_type="application/pdf",
+            metadata={
+                "assignment_id": None,
+                "filename": filename,
+                "content_type": "application/pdf",
+                "upload_date": datetime.combine(
+                    date.fromisoformat(config["today"]), dt_time(0, 0)
+                ),
+                "seeded": True,
+            },
+        )
+        return len(content)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        total = sum(pool.map(put, range(config["files"])))
+    client.close()
+    return total
+
+
+async def analyze(config: Dict[str, Any]):
+    connection = await asyncpg.connect(config["dsn"])
+    try:
+        for table in ("groups", "users", "schedules", "attendances", "assignments"):
+            await connection.execute(f"ANALYZE {table}")
+    finally:
+        await connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=30_000)
+    parser.add_argument("--teachers", type=int, default=2_000)
+    parser.add_argument("--group-size", type=int, default=25)
+    parser.add_argument("--years", type=int, default=1, help="academic years of lessons, ending with the current one")
+    parser.add_argument("--lessons-per-day", type=int, default=3)
+    parser.add_argument("--attendance-rate", type=float, default=1.0, help="share of past lessons with attendance")
+    parser.add_argument("--assignments-per-week", type=int, default=2)
+    parser.add_argument("--files", type=int, default=500, help="GridFS files shared by the assignments")
+    parser.add_argument("--file-kb", type=int, default=256)
+    parser.add_argument("--password", default="seed-password")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--today", type=date.fromisoformat, help="generate data as of this date (YYYY-MM-DD) instead of the current date")
+    parser.add_argument("--streams", type=int, default=os.cpu_count() or 1, help="parallel COPY processes")
+    parser.add_argument("--reset", action="store_true", help="TRUNCATE the app's tables and remove seeded files first")
+    parser.add_argument("--json", help="write a summary to this file")
+    args = parser.parse_args()
+
+    from app.services.auth import get_password_hash
+
+    started = time.perf_counter()
+    today = args.today or date.today()
+    days = teaching_days(args.years, today)
+    config = {
+        "seed": args.seed,
+        "dsn": database_dsn(),
+        "students": args.students,
+        "teachers": args.teachers,
+        "group_size": args.group_size,
+        "groups": math.ceil(args.students / args.group_size),
+        "lessons_per_day": args.lessons_per_day,
+        "attendance_rate": args.attendance_rate,
+        "assignments_per_week": args.assignments_per_week,
+        "files": args.files,
+        "file_kb": args.file_kb,
+        "today": today.isoformat(),
+        "days": [day.isoformat() for day in days],
+        # bcrypt costs a third of a second; everyone shares this one hash
+        "password_hash": get_password_hash(args.password),
+    }
+
+    asyncio.run(prepare(config, args.reset))
+    file_bytes = upload_files(config, args.reset)
+    print(f"Stored {args.files} files ({file_bytes / 2**20:.0f} MB) in GridFS")
+
+    # A few partitions per stream keeps every process busy until the end
+    partition_size = max(1, config["groups"] // (args.streams * 4))
+    partitions = [
+        (start, min(start + partition_size, config["groups"]))
+        for start in range(0, config["groups"], partition_size)
+    ]
+    totals = {"groups": config["groups"], "users": args.teachers + 1}
+    copy_started = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=args.streams, mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        futures = [pool.submit(seed_partition, config, start, stop) for start, stop in partitions]
+        for done, future in enumerate(futures, start=1):
+            for table, count in future.result().items():
+                totals[table] = totals.get(table, 0) + count
+            print(f"\rPartitions {done}/{len(partitions)}", end="", flush=True)
+    print()
+    copy_seconds = time.perf_counter() - copy_started
+
+    asyncio.run(analyze(config))
+    elapsed = time.perf_counter() - started
+
+    rows = sum(totals.values())
+    for table, count in totals.items():
+        print(f"{table:<12} {count:>12,}")
+    print(
+        f"{rows:,} rows in {elapsed:.0f} s "
+        f"({rows / copy_seconds:,.0f} rows/s over {args.streams} COPY streams)"
+    )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(
+                {
+                    "args": {**vars(args), "today": config["today"]},
+                    "rows": totals,
+                    "seconds": elapsed,
+                    "copy_seconds": copy_seconds,
+                    "file_bytes": file_bytes,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
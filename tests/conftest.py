@@ -0,0 +1,15 @@
+import os
+
+import pytest
+
+# The app's test plugins, and pytester for testing them
+pytest_plugins = ["pytester", "app.testing.query_budget"]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def app_pytester(pytester, monkeypatch):
+    """Pytester whose subprocess sessions can import the app package."""
+    monkeypatch.setenv("PYTHONPATH", ROOT)
+    return pytester
@@ -0,0 +1,149 @@
+"""The download disk cache and the response that serves from it."""
+import asyncio
+import os
+import subprocess
+import sys
+
+from app.services import file_cache, file_storage
+from app.services.file_cache import (
+    ZEROCOPY_EXTENSION,
+    CachedFileResponse,
+    FileCache,
+    init_file_cache,
+)
+
+
+class FakeGridOut:
+    """The parts of a GridFS GridOut the cache reads."""
+
+    def __init__(self, data: bytes, chunk_size: int = 4):
+        self.data = data
+        self.length = len(data)
+        self.chunk_size = chunk_size
+        self.position = 0
+
+    def readchunk(self) -> bytes:
+        chunk = self.data[self.position : self.position + self.chunk_size]
+        self.position += len(chunk)
+        return chunk
+
+    def seek(self, position: int):
+        self.position = position
+
+
+def file_info(data: bytes):
+    return {
+        "file": FakeGridOut(data),
+        "filename": "notes.txt",
+        "content_type": "text/plain",
+        "metadata": {"content_encoding": None},
+    }
+
+
+def make_cache(tmp_path, max_bytes=1024, max_file_bytes=1024):
+    return FileCache(str(tmp_path / "cache"), max_bytes, max_file_bytes)
+
+
+def send_response(response, scope):
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(response(scope, None, send))
+    return messages
+
+
+def test_store_then_open_hits(tmp_path):
+    cache = make_cache(tmp_path)
+    assert cache.open("a") is None
+
+    stored = cache.store("a", file_info(b"hello world"))
+    assert stored.file.read() == b"hello world"
+    stored.file.close()
+
+    cached = cache.open("a")
+    assert cached.size == 11 and cached.filename == "notes.txt"
+    assert cached.file.read() == b"hello world"
+    cached.file.close()
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = make_cache(tmp_path, max_bytes=10)
+    cache.store("a", file_info(b"123456")).file.close()
+    cache.store("b", file_info(b"abcdef")).file.close()
+
+    assert cache.open("a") is None
+    assert cache.stats()["evictions"] == 1
+    assert cache.total_bytes == 6
+
+
+def test_too_large_files_are_not_cached(tmp_path):
+    cache = make_cache(tmp_path, max_file_bytes=4)
+    assert cache.store("a", file_info(b"too large")) is None
+
+
+def test_open_cached_file_returns_uncached_file_info(tmp_path, monkeypatch):
+    cache = make_cache(tmp_path, max_file_bytes=4)
+    opened = []
+
+    def get_file(file_id):
+        opened.append(file_id)
+        return file_info(b"too large")
+
+    monkeypatch.setattr(file_storage, "get_file_cache", lambda: cache)
+    monkeypatch.setattr(file_storage, "get_file", get_file)
+
+    cached, info = file_storage.open_cached_file("a")
+    assert cached is None
+    assert info["filename"] == "notes.txt"
+    assert opened == ["a"]
+
+
+def test_response_uses_zero_copy_when_the_server_offers_it(tmp_path):
+    cache = make_cache(tmp_path)
+    cached = cache.store("a", file_info(b"hello world"))
+
+    messages = send_response(
+        CachedFileResponse(cached),
+        {"type": "http", "extensions": {ZEROCOPY_EXTENSION: {}}},
+    )
+
+    assert (b"content-length", b"11") in messages[0]["headers"]
+    assert messages[1] == {
+        "type": ZEROCOPY_EXTENSION,
+        "file": cached.file,
+        "count": 11,
+    }
+    assert len(messages) == 2
+    assert cached.file.closed
+
+
+def test_response_streams_without_zero_copy(tmp_path):
+    cache = make_cache(tmp_path, max_bytes=200_000, max_file_bytes=200_000)
+    cached = cache.store("a", file_info(b"x" * 100_000))
+
+    messages = send_response(CachedFileResponse(cached), {"type": "http"})
+
+    bodies = messages[1:]
+    assert b"".join(message["body"] for message in bodies) == b"x" * 100_000
+    assert not bodies[-1]["more_body"]
+    assert cached.file.closed
+
+
+def test_each_process_gets_its_own_directory(tmp_path, monkeypatch):
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+    stale = tmp_path / f"worker-{exited.pid}"
+    running = tmp_path / f"worker-{os.getppid()}"
+    stale.mkdir()
+    running.mkdir()
+
+    monkeypatch.setattr(file_cache, "FILE_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(file_cache, "file_cache", None)
+    init_file_cache()
+
+    assert file_cache.file_cache.directory == str(tmp_path / f"worker-{os.getpid()}")
+    assert not stale.exists()
+    assert running.exists()
@@ -0,0 +1,171 @@
+"""The file processing worker, fed through the in-memory broker."""
+import asyncio
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+from bson.objectid import ObjectId
+from PIL import Image
+from pymongo import MongoClient
+
+from app.database.rabbitmq import FILE_PROCESSING_QUEUE
+from app.workers.broker import InMemoryBroker
+from app.workers.file_processing import FileProcessingWorker
+
+
+class FakeGridOut:
+    def __init__(self, _id, data, filename, content_type, metadata):
+        self._id = _id
+        self.data = data
+        self.length = len(data)
+        self.filename = filename
+        self.content_type = content_type
+        self.metadata = metadata
+        self._chunks = iter([data])
+
+    def readchunk(self) -> bytes:
+        return next(self._chunks, b"")
+
+
+class FakeGridFS:
+    """The parts of GridFS the worker uses, kept in a dict."""
+
+    def __init__(self):
+        self.files = {}
+
+    def put(self, data, filename, content_type, metadata):
+        _id = ObjectId()
+        self.files[_id] = (data, filename, content_type, metadata)
+        return _id
+
+    def get(self, _id):
+        return FakeGridOut(_id, *self.files[_id])
+
+    def find(self, query):
+        derived_from = query["metadata.derived_from"]
+        excluded = query.get("_id", {}).get("$nin", [])
+        return [
+            self.get(_id)
+            for _id, (_, _, _, metadata) in list(self.files.items())
+            if metadata.get("derived_from") == derived_from and _id not in excluded
+        ]
+
+    def delete(self, _id):
+        del self.files[_id]
+
+    def derived_from(self, file_id):
+        return self.find({"metadata.derived_from": file_id})
+
+
+class FakeFilesCollection:
+    def __init__(self, fs):
+        self.fs = fs
+
+    def update_one(self, query, update):
+        metadata = self.fs.files[query["_id"]][3]
+        for key, value in update["$set"].items():
+            kind = key.rsplit(".", 1)[1]
+            metadata.setdefault("derivatives", {})[kind] = value
+
+
+def png(size=(640, 480)) -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", size, "white").save(out, format="PNG")
+    return out.getvalue()
+
+
+def make_worker(broker=None, max_bytes=10 * 1024 * 1024):
+    # Never connects; its GridFS and collections are replaced by fakes
+    db = MongoClient("mongodb://127.0.0.1:1", connect=False)["test"]
+    worker = FileProcessingWorker(
+        broker or InMemoryBroker(),
+        db,
+        ThreadPoolExecutor(1),
+        prefetch=2,
+        processes=1,
+        max_bytes=max_bytes,
+    )
+    worker.fs = FakeGridFS()
+    worker.db = type("FakeDB", (), {})()
+    worker.db.fs = type("FakeBucket", (), {})()
+    worker.db.fs.files = FakeFilesCollection(worker.fs)
+    return worker
+
+
+def upload(worker, data: bytes) -> str:
+    return str(worker.fs.put(data, "photo.png", "image/png", {"assignment_id": "a"}))
+
+
+def test_processing_again_replaces_derivatives():
+    worker = make_worker()
+    file_id = upload(worker, png())
+
+    first = asyncio.run(worker.process_file(file_id))
+    second = asyncio.run(worker.process_file(file_id))
+
+    derived = worker.fs.derived_from(file_id)
+    assert [str(grid_out._id) for grid_out in derived] == [second["thumbnail"]]
+    assert second["thumbnail"] != first["thumbnail"]
+    links = worker.fs.files[ObjectId(file_id)][3]["derivatives"]
+    assert str(links["thumbnail"]) == second["thumbnail"]
+    with Image.open(io.BytesIO(derived[0].data)) as thumbnail:
+        assert max(thumbnail.size) <= 320
+
+
+def test_files_above_the_limit_are_skipped():
+    worker = make_worker(max_bytes=100)
+    file_id = upload(worker, png())
+
+    assert asyncio.run(worker.process_file(file_id)) == {}
+    assert worker.fs.derived_from(file_id) == []
+    assert worker.stats()["skipped"] == 1
+
+
+def test_worker_acks_tasks_from_the_broker():
+    broker = InMemoryBroker()
+    worker = make_worker(broker)
+    file_id = upload(worker, png())
+
+    async def run():
+        await broker.publish(FILE_PROCESSING_QUEUE, {"operation": "unknown"})
+        await broker.publish(
+            FILE_PROCESSING_QUEUE,
+            {"operation": "process_new_upload", "file_id": file_id},
+        )
+        consumer = asyncio.create_task(worker.run())
+        while worker.processed < 1:
+            await asyncio.sleep(0.01)
+        consumer.cancel()
+
+    asyncio.run(run())
+
+    assert broker.pending(FILE_PROCESSING_QUEUE) == 0
+    assert worker.processed == 1 and worker.failed == 0
+    assert len(worker.fs.derived_from(file_id)) == 1
+
+
+def test_non_object_tasks_are_settled():
+    broker = InMemoryBroker()
+    worker = make_worker(broker)
+    file_id = upload(worker, png())
+
+    async def run():
+        for body in ([], "x", 1):
+            await broker.publish(FILE_PROCESSING_QUEUE, body)
+        await broker.publish(
+            FILE_PROCESSING_QUEUE,
+            {"operation": "process_new_upload", "file_id": file_id},
+        )
+        consumer = asyncio.create_task(worker.run())
+        # With two prefetch slots, an unsettled message would stall the rest
+        await asyncio.wait_for(_until_processed(worker, 1), 5)
+        consumer.cancel()
+
+    asyncio.run(run())
+
+    assert broker.pending(FILE_PROCESSING_QUEUE) == 0
+    assert worker.processed == 1 and worker.failed == 0
+
+
+async def _until_processed(worker, count: int):
+    while worker.processed < count:
+        await asyncio.sleep(0.01)
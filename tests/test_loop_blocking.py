@@ -0,0 +1,60 @@
+"""The loop blocking plugin fails tests whose requests block the event loop."""
+
+INNER_TEST = '''
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.services.loop_watchdog import LoopWatchdogMiddleware
+
+app = FastAPI()
+app.add_middleware(LoopWatchdogMiddleware)
+
+
+@app.get("/report")
+async def build_report():
+    {body}
+    return {{}}
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.mark.anyio
+async def test_report():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/report")
+    assert response.status_code == 200
+'''
+
+
+def run_inner(pytester, body: str):
+    pytester.makepyfile(INNER_TEST.format(body=body))
+    return pytester.runpytest_subprocess(
+        "-p", "app.testing.loop_blocking", "--max-loop-block-ms", "100"
+    )
+
+
+def test_sync_sleep_in_async_route_fails_the_test(app_pytester):
+    result = run_inner(app_pytester, "time.sleep(0.3)")
+
+    result.assert_outcomes(passed=1, errors=1)
+    result.stdout.fnmatch_lines(
+        [
+            "*Event loop blocked:*",
+            "*GET /report: blocked * ms*",
+            "*in build_report*",
+        ]
+    )
+
+
+def test_awaited_sleep_passes(app_pytester):
+    result = run_inner(app_pytester, "await asyncio.sleep(0.3)")
+
+    result.assert_outcomes(passed=1)
@@ -0,0 +1,84 @@
+"""Single-request profiles, including work handed to the threadpool."""
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+
+from app.models.user import UserRole
+from app.services.auth import create_access_token
+from app.services.profiler import (
+    PROFILE_ID_HEADER,
+    RequestProfilerMiddleware,
+    get_request_profile,
+)
+
+app = FastAPI()
+app.add_middleware(RequestProfilerMiddleware)
+
+
+def crunch_numbers():
+    deadline = time.perf_counter() + 0.2
+    while time.perf_counter() < deadline:
+        pass
+
+
+@app.get("/profile-test/report")
+def build_report():
+    # Sync routes run in the threadpool, away from the event loop
+    crunch_numbers()
+    return {}
+
+
+@app.get("/profile-test/demoted")
+async def demoted(request: Request):
+    # What the auth dependency stores for a user who is no admin any more
+    request.state.user = SimpleNamespace(is_active=True, role=UserRole.TEACHER)
+    return {}
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+def headers(role=None):
+    headers = {"X-Profile": "1"}
+    if role:
+        token = create_access_token({"sub": "someone", "role": role})
+        headers["Authorization"] = f"Bearer {token}"
+    return headers
+
+
+async def get(path: str, role=None):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.get(path, headers=headers(role))
+
+
+@pytest.mark.anyio
+async def test_threadpool_work_of_the_request_is_sampled():
+    response = await get("/profile-test/report", UserRole.ADMIN)
+
+    profile = get_request_profile(response.headers[PROFILE_ID_HEADER])
+    threadpool = [stack for stack in profile.stacks if stack[0] == "threadpool"]
+    assert any("crunch_numbers" in stack[-1] for stack in threadpool)
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("role", [None, UserRole.STUDENT])
+async def test_requests_without_an_admin_token_are_not_profiled(role):
+    # Decided from the token alone; no database is reachable here
+    response = await get("/profile-test/report", role)
+
+    assert response.status_code == 200
+    assert PROFILE_ID_HEADER not in response.headers
+
+
+@pytest.mark.anyio
+async def test_profile_is_dropped_when_the_route_finds_no_admin():
+    response = await get("/profile-test/demoted", UserRole.ADMIN)
+
+    assert response.status_code == 200
+    assert PROFILE_ID_HEADER not in response.headers
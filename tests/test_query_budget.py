@@ -0,0 +1,68 @@
+"""The query budget plugin fails tests whose requests break a budget."""
+from app.services.query_counter import record_statement
+
+INNER_TEST = '''
+import httpx
+import pytest
+from fastapi import APIRouter, FastAPI
+
+from app.services.query_counter import (
+    QueryLogMiddleware,
+    query_budget,
+    record_statement,
+)
+
+router = APIRouter()
+
+
+@router.get("/groups")
+@query_budget(2)
+async def get_groups():
+    for group_id in range({queries}):
+        record_statement(f"SELECT * FROM groups WHERE id = ${{group_id + 1}}")
+    return []
+
+
+app = FastAPI()
+app.include_router(router)
+app.add_middleware(QueryLogMiddleware)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.mark.anyio
+async def test_groups():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/groups")
+    assert response.status_code == 200
+'''
+
+
+def run_inner(pytester, queries: int):
+    pytester.makepyfile(INNER_TEST.format(queries=queries))
+    return pytester.runpytest_subprocess("-p", "app.testing.query_budget")
+
+
+def test_request_over_budget_fails_the_test(app_pytester):
+    result = run_inner(app_pytester, queries=3)
+
+    result.assert_outcomes(passed=1, errors=1)
+    result.stdout.fnmatch_lines(
+        ["*Query budget exceeded*", "*/groups: 3 queries, budget 2*"]
+    )
+
+
+def test_request_within_budget_passes(app_pytester):
+    result = run_inner(app_pytester, queries=2)
+
+    result.assert_outcomes(passed=1)
+
+
+def test_count_queries_fixture(count_queries):
+    record_statement("SELECT 1")
+
+    assert count_queries.count == 1
@@ -0,0 +1,53 @@
+"""Event streams stay out of the slow request log and latency histogram."""
+import asyncio
+import logging
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+from app.services import request_timing
+from app.services.metrics import MetricsMiddleware, http_request_duration_seconds
+from app.services.request_timing import ServerTimingMiddleware
+
+app = FastAPI()
+app.add_middleware(ServerTimingMiddleware)
+app.add_middleware(MetricsMiddleware)
+
+
+async def _events():
+    await asyncio.sleep(0.05)
+    yield "data: {}\n\n"
+
+
+@app.get("/timing-test/events")
+async def events():
+    return StreamingResponse(_events(), media_type="text/event-stream")
+
+
+@app.get("/timing-test/report")
+async def report():
+    await asyncio.sleep(0.05)
+    return {}
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.mark.anyio
+async def test_event_streams_are_not_slow_requests(caplog, monkeypatch):
+    monkeypatch.setattr(request_timing, "SLOW_REQUEST_MS", 10)
+    transport = httpx.ASGITransport(app=app)
+    with caplog.at_level(logging.WARNING, logger="app.services.request_timing"):
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            assert (await client.get("/timing-test/events")).status_code == 200
+            assert (await client.get("/timing-test/report")).status_code == 200
+
+    logged = [record.fields["path"] for record in caplog.records]
+    assert logged == ["/timing-test/report"]
+    series = dict(http_request_duration_seconds._series())
+    assert ("GET", "/timing-test/events") not in series
+    assert ("GET", "/timing-test/report") in series